@@ -1,3 +1,5 @@
+import 'comentario.dart';
+
 class Publicacion {
   final int id;
   final int usuario;
@@ -7,10 +9,15 @@ class Publicacion {
   final String lugarNombre;
   final String tipo;
   final String? archivoMedia;
+  // Versiones reducidas de archivoMedia: {"thumb"|"card"|"full": {"webp": url, "jpeg": url, ...}}
+  final Map<String, dynamic> variantes;
   final String? descripcion;
   final String fecha;
   final bool esVisible;
   final bool esPropietario;
+  // Solo vienen en /publicaciones/feed/
+  final int numComentarios;
+  final List<Comentario> ultimosComentarios;
 
   Publicacion({
     required this.id,
@@ -21,10 +28,13 @@ class Publicacion {
     required this.lugarNombre,
     required this.tipo,
     this.archivoMedia,
+    this.variantes = const {},
     this.descripcion,
     required this.fecha,
     required this.esVisible,
     this.esPropietario = false,
+    this.numComentarios = 0,
+    this.ultimosComentarios = const [],
   });
 
   factory Publicacion.fromJson(Map<String, dynamic> json) {
@@ -37,10 +47,21 @@ class Publicacion {
       lugarNombre: json['lugar_nombre'],
       tipo: json['tipo'],
       archivoMedia: json['archivo_media'],
+      variantes: json['variantes'] ?? {},
       descripcion: json['descripcion'],
       fecha: json['fecha'],
       esVisible: json['es_visible'] ?? true,
       esPropietario: json['es_propietario'] ?? false,
+      numComentarios: json['num_comentarios'] ?? 0,
+      ultimosComentarios: (json['ultimos_comentarios'] as List<dynamic>? ?? [])
+          .map((item) => Comentario.fromJson(item))
+          .toList(),
     );
   }
+
+  // Imagen del tamaño pedido ('thumb', 'card', 'full'); mientras el servidor
+  // genera las variantes, el archivo original.
+  String? imagen(String tamano) {
+    return variantes[tamano]?['webp'] ?? archivoMedia;
+  }
 }
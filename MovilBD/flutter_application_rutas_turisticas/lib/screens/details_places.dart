@@ -525,7 +525,7 @@ class _DetalleLugarScreenState extends State<DetalleLugarScreen> {
                                       if (post.archivoMedia != null)
                                         Positioned.fill(
                                           child: Image.network(
-                                            _apiService.getImageUrl(post.archivoMedia)!, 
+                                            _apiService.getImageUrl(post.imagen('card'))!, 
                                             fit: BoxFit.cover,
                                             errorBuilder: (c,e,s) => Container(color: Colors.grey[300]),
                                           ),
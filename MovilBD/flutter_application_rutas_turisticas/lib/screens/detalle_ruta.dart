@@ -18,6 +18,7 @@ class DetalleRutaScreen extends StatefulWidget {
 
 class _DetalleRutaScreenState extends State<DetalleRutaScreen> {
   late Future<List<RutaLugar>> _futureRutaLugares;
+  Map<int, Lugar> _lugaresParada = {};
   final ApiService _apiService = ApiService();
   bool _isSaved = false;
   bool _isCheckingStatus = true;
@@ -30,9 +31,28 @@ class _DetalleRutaScreenState extends State<DetalleRutaScreen> {
   @override
   void initState() {
     super.initState();
-    _futureRutaLugares = _apiService.fetchRutaLugares(widget.ruta.id);
+    _cargarDetalle();
     _checkStatus();
-    _loadReviews();
+  }
+
+  // Paradas, lugares y reseñas llegan en una sola petición (?expand=)
+  void _cargarDetalle() {
+    final detalle = _apiService.fetchRutaDetalle(widget.ruta.id);
+    _futureRutaLugares = detalle.then((data) {
+      _lugaresParada = data['lugares'] as Map<int, Lugar>;
+      return data['paradas'] as List<RutaLugar>;
+    });
+    detalle.then((data) {
+      if (mounted) {
+        setState(() {
+          _reviews = data['resenas'];
+          _loadingReviews = false;
+        });
+      }
+    }).catchError((e) {
+      print("Error loading reviews: $e");
+      if (mounted) setState(() => _loadingReviews = false);
+    });
   }
 
   Future<void> _loadReviews() async {
@@ -177,8 +197,7 @@ class _DetalleRutaScreenState extends State<DetalleRutaScreen> {
       ),
     ).then((_) {
       setState(() {
-        _futureRutaLugares = _apiService.fetchRutaLugares(widget.ruta.id);
-        _loadReviews();
+        _cargarDetalle();
       });
     });
   }
@@ -496,7 +515,8 @@ class _DetalleRutaScreenState extends State<DetalleRutaScreen> {
   ) {
     return InkWell(
       onTap: () {
-        Lugar partialLugar = Lugar(
+        // El lugar completo ya vino con la ruta; si no, la pantalla lo carga
+        Lugar partialLugar = _lugaresParada[rutaLugar.lugar] ?? Lugar(
           id: rutaLugar.lugar,
           nombre: rutaLugar.lugarNombre,
           descripcion: "Cargando detalles...",
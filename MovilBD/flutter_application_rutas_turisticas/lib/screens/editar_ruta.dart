@@ -121,8 +121,8 @@ class _EditarRutaPageState extends State<EditarRutaPage> {
         'descripcion': _descripcionController.text,
         'visibilidadRuta': _isPublic ? 'publica' : 'privada',
         'usuario': ApiService.currentUserId,
-        'duracionEstimadaSeg': 3600, // Valor por defecto o calculado
-        'distanciaEstimadaKm': 5.0, // Valor por defecto o calculado
+        // duracionEstimadaSeg y distanciaEstimadaKm los calcula el backend
+        // a partir de las paradas de la ruta.
         // Categorías: enviamos una lista con el ID de la seleccionada
         'categorias': _selectedCategory != null ? [_selectedCategory!.id] : [],
       };
@@ -78,7 +78,7 @@ class _VivenciasTabState extends State<_VivenciasTab> {
 
   void _refreshFeed() {
     setState(() {
-      _feedFuture = _apiService.fetchPublicaciones(); // Fetch global feed
+      _feedFuture = _apiService.fetchFeed(); // Fetch global feed
     });
   }
 
@@ -122,7 +122,7 @@ class _VivenciasTabState extends State<_VivenciasTab> {
     final roleColor = isOwner ? Colors.purple : Colors.blue;
 
     // Construct Image URL
-    String? imageUrl = _apiService.getImageUrl(post.archivoMedia);
+    String? imageUrl = _apiService.getImageUrl(post.imagen('card'));
 
     return GestureDetector( 
       onTap: () {
@@ -234,11 +234,31 @@ class _VivenciasTabState extends State<_VivenciasTab> {
                 ),
               ),
               
-            // Footer: Ver comentarios
+            // Footer: últimos comentarios y total
+            for (final comentario in post.ultimosComentarios)
+              Padding(
+                padding: const EdgeInsets.symmetric(horizontal: 12, vertical: 2),
+                child: RichText(
+                  maxLines: 2,
+                  overflow: TextOverflow.ellipsis,
+                  text: TextSpan(
+                    style: const TextStyle(color: Colors.black),
+                    children: [
+                      TextSpan(
+                          text: comentario.usuarioUsername,
+                          style: const TextStyle(fontWeight: FontWeight.bold)),
+                      const TextSpan(text: " "),
+                      TextSpan(text: comentario.texto),
+                    ],
+                  ),
+                ),
+              ),
             Padding(
               padding: const EdgeInsets.symmetric(horizontal: 12, vertical: 8),
               child: Text(
-                "Ver los comentarios...",
+                post.numComentarios == 0
+                    ? "Sé el primero en comentar"
+                    : "Ver los ${post.numComentarios} comentarios",
                 style: TextStyle(color: Colors.grey[600]),
               ),
             ),
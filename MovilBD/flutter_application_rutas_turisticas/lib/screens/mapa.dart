@@ -258,34 +258,31 @@ class _MapaState extends State<Mapa> {
   }
 
   Future<void> _getRoutePolyline(List<LatLng> waypoints) async {
-    if (waypoints.length < 2) return;
-
-    // OSRM uses lon,lat
-    String coordinates = waypoints.map((p) => "${p.longitude},${p.latitude}").join(';');
-    final url = Uri.parse("http://router.project-osrm.org/route/v1/driving/$coordinates?overview=full&geometries=geojson");
+    if (waypoints.length < 2 || widget.ruta == null) return;
 
+    // El backend traza la ruta sobre la red vial local y cachea el resultado
     try {
-      final response = await http.get(url);
-      if (response.statusCode == 200) {
-        final data = jsonDecode(response.body);
-        if (data['routes'].isNotEmpty) {
-          final geometry = data['routes'][0]['geometry']['coordinates'] as List;
-          List<LatLng> polylinePoints = geometry.map((p) => LatLng(p[1].toDouble(), p[0].toDouble())).toList();
+      final geometria = await ApiService().fetchGeometriaRuta(widget.ruta!.id);
+      final String? encoded = geometria['polyline'];
+      if (encoded != null && encoded.isNotEmpty) {
+        List<LatLng> polylinePoints = PolylinePoints()
+            .decodePolyline(encoded)
+            .map((p) => LatLng(p.latitude, p.longitude))
+            .toList();
 
-          setState(() {
-            _polylines.add(
-              Polyline(
-                polylineId: const PolylineId("route"),
-                points: polylinePoints,
-                color: const Color(0xFF8667F2),
-                width: 5,
-              ),
-            );
-          });
-        }
+        setState(() {
+          _polylines.add(
+            Polyline(
+              polylineId: const PolylineId("route"),
+              points: polylinePoints,
+              color: const Color(0xFF8667F2),
+              width: 5,
+            ),
+          );
+        });
       }
     } catch (e) {
-      print("Error fetching OSRM: $e");
+      print("Error fetching route geometry: $e");
     }
   }
 
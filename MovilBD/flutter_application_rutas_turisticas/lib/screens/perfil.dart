@@ -205,8 +205,9 @@ class _PerfilState extends State<Perfil> {
                         icon: Icons.logout,
                         title: "Cerrar Sesión",
                         color: Colors.red,
-                        onTap: () {
-                          ApiService.currentUserId = null;
+                        onTap: () async {
+                          await _apiService.cerrarSesion();
+                          if (!mounted) return;
                           Navigator.of(context).pushReplacementNamed('/login');
                         },
                       ),
@@ -286,7 +287,7 @@ class _UserPostsScreenState extends State<UserPostsScreen> {
                  final post = _posts[index];
                  return ListTile(
                    leading: post.archivoMedia != null 
-                     ? Image.network(_apiService.getImageUrl(post.archivoMedia)!, width: 50, height: 50, fit: BoxFit.cover, errorBuilder: (c,e,s)=>const Icon(Icons.image)) 
+                     ? Image.network(_apiService.getImageUrl(post.imagen('thumb'))!, width: 50, height: 50, fit: BoxFit.cover, errorBuilder: (c,e,s)=>const Icon(Icons.image)) 
                      : const Icon(Icons.article),
                    title: Text(post.descripcion ?? "Sin descripción", maxLines: 1, overflow: TextOverflow.ellipsis),
                    subtitle: Text("En: ${post.lugarNombre}"),
@@ -139,7 +139,7 @@ class _PostDetailScreenState extends State<PostDetailScreen> {
                       width: double.infinity,
                       constraints: const BoxConstraints(maxHeight: 400),
                       child: Image.network(
-                        _apiService.getImageUrl(widget.post.archivoMedia)!,
+                        _apiService.getImageUrl(widget.post.imagen('full'))!,
                         fit: BoxFit.cover,
                         errorBuilder: (ctx, err, stack) => Container(
                           height: 200,
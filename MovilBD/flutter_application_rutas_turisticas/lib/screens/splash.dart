@@ -1,5 +1,6 @@
 import 'package:flutter/material.dart';
 import 'package:flutter_application_rutas_turisticas/screens/login.dart';
+import 'package:flutter_application_rutas_turisticas/services/api_service.dart';
 
 class Splash extends StatefulWidget {
   const Splash({super.key});
@@ -16,8 +17,15 @@ class _SplashState extends State<Splash> {
   }
 
   _navigatetoHome() async {
-    await Future.delayed(const Duration(milliseconds: 4000), () {});
-    if (mounted) {
+    // Mientras se muestra el splash se intenta restaurar la sesión guardada
+    final resultados = await Future.wait([
+      ApiService().restaurarSesion(),
+      Future.delayed(const Duration(milliseconds: 4000), () => true),
+    ]);
+    if (!mounted) return;
+    if (resultados[0]) {
+      Navigator.pushReplacementNamed(context, '/main');
+    } else {
       Navigator.pushReplacement(
         context,
         MaterialPageRoute(builder: (context) => const LoginScreen()),
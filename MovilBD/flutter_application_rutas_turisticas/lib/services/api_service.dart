@@ -2,6 +2,7 @@ import 'dart:convert';
 import 'dart:io'; // Para File
 import 'package:flutter/foundation.dart'; // Para kIsWeb
 import 'package:http/http.dart' as http;
+import 'package:shared_preferences/shared_preferences.dart';
 import '../models/ruta.dart';
 import '../models/lugar.dart';
 import '../models/ruta_lugar.dart';
@@ -27,40 +28,223 @@ class ApiService {
     return 'http://192.168.1.113:8000/api';
   }
 
-  // Almacenamiento simple del ID de usuario en memoria (se pierde al reiniciar app)
-  // En producción usar SharedPreferences o SecureStorage
+  // Sesión: el login devuelve un token de acceso (corto) y uno de refresco
+  // (largo). Las escrituras envían el de acceso en Authorization; cuando
+  // está por caducar se renueva con el de refresco, sin volver a enviar la
+  // contraseña. El de refresco se guarda en SharedPreferences para
+  // restaurar la sesión al abrir la app.
   static int? currentUserId;
+  static String? _accessToken;
+  static String? _refreshToken;
+  static DateTime? _accessExpira;
+  static Future<bool>? _refrescoEnCurso;
+  static const String _claveSesion = 'sesion';
+
+  Future<void> _guardarSesion(Map<String, dynamic> data) async {
+    currentUserId = data['user']['id'];
+    _accessToken = data['access'];
+    _refreshToken = data['refresh'];
+    // Margen para no enviar un token que caduque en el camino
+    _accessExpira = DateTime.now()
+        .add(Duration(seconds: (data['expires_in'] as int) - 30));
+    final prefs = await SharedPreferences.getInstance();
+    await prefs.setString(
+      _claveSesion,
+      jsonEncode({'user': currentUserId, 'refresh': _refreshToken}),
+    );
+  }
 
-  Future<List<Ruta>> fetchRutas() async {
-    final response = await http.get(Uri.parse('$baseUrl/rutas/'));
+  Future<void> cerrarSesion() async {
+    currentUserId = null;
+    _accessToken = null;
+    _refreshToken = null;
+    _accessExpira = null;
+    final prefs = await SharedPreferences.getInstance();
+    await prefs.remove(_claveSesion);
+  }
 
-    if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
-      List<Ruta> rutas = body
-          .map((dynamic item) => Ruta.fromJson(item))
-          .toList();
-      return rutas;
-    } else {
-      throw Exception('Failed to load rutas: ${response.statusCode}');
+  // Al abrir la app: renueva la sesión guardada. false si hay que hacer login.
+  Future<bool> restaurarSesion() async {
+    if (_refreshToken == null) {
+      final prefs = await SharedPreferences.getInstance();
+      final guardada = prefs.getString(_claveSesion);
+      if (guardada == null) return false;
+      _refreshToken = jsonDecode(guardada)['refresh'];
     }
+    return _refrescar();
   }
 
-  Future<List<Lugar>> fetchLugares() async {
-    final response = await http.get(Uri.parse('$baseUrl/lugares/'));
+  // Una sola renovación a la vez aunque varias peticiones la necesiten
+  Future<bool> _refrescar() {
+    return _refrescoEnCurso ??=
+        _ejecutarRefresco().whenComplete(() => _refrescoEnCurso = null);
+  }
 
-    if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
-      List<Lugar> lugares = body
-          .map((dynamic item) => Lugar.fromJson(item))
-          .toList();
-      return lugares;
-    } else {
-      throw Exception('Failed to load lugares: ${response.statusCode}');
+  Future<bool> _ejecutarRefresco() async {
+    try {
+      final response = await http
+          .post(
+            Uri.parse('$baseUrl/usuarios/refresh/'),
+            headers: {'Content-Type': 'application/json'},
+            body: jsonEncode({'refresh': _refreshToken}),
+          )
+          .timeout(const Duration(seconds: 10));
+      if (response.statusCode == 200) {
+        await _guardarSesion(jsonDecode(response.body));
+        return true;
+      }
+      if (response.statusCode == 401) {
+        // Caducado o contraseña cambiada: hay que volver a entrar
+        await cerrarSesion();
+      }
+    } catch (e) {
+      print("ApiService: Error al renovar la sesión $e");
+    }
+    return false;
+  }
+
+  Future<Map<String, String>> _headers({bool json = false}) async {
+    if (_refreshToken != null &&
+        (_accessToken == null || DateTime.now().isAfter(_accessExpira!))) {
+      await _refrescar();
     }
+    return {
+      if (json) 'Content-Type': 'application/json',
+      if (_accessToken != null) 'Authorization': 'Bearer $_accessToken',
+    };
+  }
+
+  // Catálogo (categorías, lugares, rutas, eventos): última respuesta por URL.
+  // Se vuelve a pedir con If-None-Match y, si el servidor responde 304,
+  // se reutiliza sin descargar de nuevo.
+  static final Map<String, http.Response> _respuestasConEtag = {};
+
+  Future<http.Response> _getCondicional(Uri uri) async {
+    final key = uri.toString();
+    final guardada = _respuestasConEtag[key];
+    final etag = guardada?.headers['etag'];
+    final response = await http.get(uri,
+        headers: etag != null ? {'If-None-Match': etag} : null);
+    if (response.statusCode == 304 && guardada != null) {
+      return guardada;
+    }
+    if (response.statusCode == 200 && response.headers['etag'] != null) {
+      _respuestasConEtag[key] = response;
+    }
+    return response;
+  }
+
+  // Réplica local del catálogo (categorías, lugares, rutas, paradas, eventos)
+  // mantenida con /api/sync/: cada sincronización descarga solo lo creado,
+  // modificado o borrado desde el último token. Se guarda en
+  // SharedPreferences para poder mostrar el catálogo sin conexión.
+  static const String _claveCatalogo = 'catalogo_sync';
+  static int _syncToken = 0;
+  static bool _catalogoCargado = false;
+  static final Map<String, Map<int, dynamic>> _catalogo = {};
+  static Future<void>? _syncEnCurso;
+
+  // Las pantallas piden lugares y rutas a la vez: comparten la misma sincronización.
+  Future<void> _sincronizar() {
+    return _syncEnCurso ??= _ejecutarSync().whenComplete(() => _syncEnCurso = null);
+  }
+
+  Future<void> _ejecutarSync() async {
+    final prefs = await SharedPreferences.getInstance();
+    if (!_catalogoCargado) {
+      _catalogoCargado = true;
+      final guardado = prefs.getString(_claveCatalogo);
+      if (guardado != null) {
+        final data = jsonDecode(guardado);
+        _syncToken = data['token'];
+        (data['recursos'] as Map<String, dynamic>).forEach((recurso, filas) {
+          _catalogo[recurso] = {for (final fila in filas) fila['id'] as int: fila};
+        });
+      }
+    }
+
+    try {
+      final tokenInicial = _syncToken;
+      bool mas = true;
+      while (mas) {
+        final response = await http.get(Uri.parse('$baseUrl/sync/?since=$_syncToken'));
+        if (response.statusCode != 200) {
+          throw Exception('Failed to sync: ${response.statusCode}');
+        }
+        final data = jsonDecode(response.body);
+        (data['cambios'] as Map<String, dynamic>).forEach((recurso, filas) {
+          final tabla = _catalogo.putIfAbsent(recurso, () => {});
+          for (final fila in filas) {
+            tabla[fila['id'] as int] = fila;
+          }
+        });
+        (data['borrados'] as Map<String, dynamic>).forEach((recurso, ids) {
+          for (final id in ids) {
+            _catalogo[recurso]?.remove(id);
+          }
+        });
+        _syncToken = data['token'];
+        mas = data['mas'];
+      }
+      if (_syncToken != tokenInicial) {
+        await prefs.setString(_claveCatalogo, jsonEncode({
+          'token': _syncToken,
+          'recursos': _catalogo.map((recurso, filas) => MapEntry(recurso, filas.values.toList())),
+        }));
+      }
+    } catch (e) {
+      // Sin conexión: se sigue con la réplica local si ya hay una
+      if (_syncToken == 0) rethrow;
+    }
+  }
+
+  // Filas de la réplica ordenadas por id.
+  List<dynamic> _filas(String recurso) {
+    final tabla = _catalogo[recurso] ?? {};
+    final ids = tabla.keys.toList()..sort();
+    return [for (final id in ids) tabla[id]];
+  }
+
+  // Los listados de la API vienen paginados por cursor:
+  // {"next": url|null, "previous": url|null, "results": [...]}
+  // Sigue los enlaces "next" y devuelve todos los resultados.
+  Future<List<dynamic>> _allPages(http.Response response) async {
+    Map<String, dynamic> page = jsonDecode(response.body);
+    List<dynamic> results = List.of(page['results']);
+    while (page['next'] != null) {
+      final next = await _getCondicional(Uri.parse(page['next']));
+      if (next.statusCode != 200) {
+        throw Exception('Failed to load page: ${next.statusCode}');
+      }
+      page = jsonDecode(next.body);
+      results.addAll(page['results']);
+    }
+    return results;
+  }
+
+  // Solo la primera página (búsquedas filtradas y feed).
+  List<dynamic> _firstPage(http.Response response) {
+    return jsonDecode(response.body)['results'];
+  }
+
+  Future<List<Ruta>> fetchRutas() async {
+    await _sincronizar();
+    // Mismo orden que /api/rutas/: más recientes primero
+    final filas = _filas('rutas')
+      ..sort((a, b) {
+        final porFecha = (b['fechaCreacion'] as String).compareTo(a['fechaCreacion']);
+        return porFecha != 0 ? porFecha : (b['id'] as int).compareTo(a['id']);
+      });
+    return filas.map((dynamic item) => Ruta.fromJson(item)).toList();
+  }
+
+  Future<List<Lugar>> fetchLugares() async {
+    await _sincronizar();
+    return _filas('lugares').map((dynamic item) => Lugar.fromJson(item)).toList();
   }
 
   Future<Lugar> getLugar(int id) async {
-    final response = await http.get(Uri.parse('$baseUrl/lugares/$id/'));
+    final response = await _getCondicional(Uri.parse('$baseUrl/lugares/$id/'));
 
     if (response.statusCode == 200) {
       return Lugar.fromJson(jsonDecode(response.body));
@@ -70,32 +254,40 @@ class ApiService {
   }
 
   Future<List<Categoria>> fetchCategorias() async {
-    final response = await http.get(Uri.parse('$baseUrl/categorias/'));
-
-    if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
-      List<Categoria> categorias = body
-          .map((dynamic item) => Categoria.fromJson(item))
-          .toList();
-      return categorias;
-    } else {
-      throw Exception('Failed to load categorias: ${response.statusCode}');
-    }
+    await _sincronizar();
+    return _filas('categorias').map((dynamic item) => Categoria.fromJson(item)).toList();
   }
 
   Future<List<RutaLugar>> fetchRutaLugares(int rutaId) async {
-    final response = await http.get(
-      Uri.parse('$baseUrl/ruta-lugares/?ruta=$rutaId'),
+    await _sincronizar();
+    // Mismo orden que /api/ruta-lugares/?ruta=: por orden de visita
+    final filas = _filas('ruta-lugares').where((item) => item['ruta'] == rutaId).toList()
+      ..sort((a, b) {
+        final porOrden = (a['orden'] as int).compareTo(b['orden']);
+        return porOrden != 0 ? porOrden : (a['id'] as int).compareTo(b['id']);
+      });
+    return filas.map((dynamic item) => RutaLugar.fromJson(item)).toList();
+  }
+
+  // Pantalla de detalle de una ruta en una sola petición (?expand=):
+  // paradas en orden, el lugar completo de cada una y las reseñas.
+  Future<Map<String, dynamic>> fetchRutaDetalle(int rutaId) async {
+    final response = await _getCondicional(
+      Uri.parse('$baseUrl/rutas/$rutaId/?expand=lugares,resenas'),
     );
 
     if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
-      List<RutaLugar> rutaLugares = body
-          .map((dynamic item) => RutaLugar.fromJson(item))
-          .toList();
-      return rutaLugares;
+      final data = jsonDecode(response.body);
+      final List<dynamic> paradas = data['lugares'];
+      return {
+        'paradas': paradas.map((dynamic item) => RutaLugar.fromJson(item)).toList(),
+        'lugares': <int, Lugar>{
+          for (final item in paradas) item['lugar'] as int: Lugar.fromJson(item['lugar_detalle']),
+        },
+        'resenas': data['resenas'],
+      };
     } else {
-      throw Exception('Failed to load ruta lugares: ${response.statusCode}');
+      throw Exception('Failed to load ruta: ${response.statusCode}');
     }
   }
 
@@ -124,7 +316,7 @@ class ApiService {
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
         if (data['status'] == 'success') {
-          currentUserId = data['user']['id']; // Guardamos el ID
+          await _guardarSesion(data);
         }
         return data;
       } else {
@@ -174,7 +366,7 @@ class ApiService {
       if (existing == null) {
         final response = await http.post(
           Uri.parse('$baseUrl/favoritos/'),
-          headers: {'Content-Type': 'application/json'},
+          headers: await _headers(json: true),
           body: jsonEncode({
             'usuario': currentUserId,
             'lugar': lugarId,
@@ -193,6 +385,7 @@ class ApiService {
       if (existing != null) {
         final response = await http.delete(
           Uri.parse('$baseUrl/favoritos/${existing['id']}/'),
+          headers: await _headers(),
         );
         if (response.statusCode != 204) {
           throw Exception("Error deleting favorite: ${response.body}");
@@ -212,7 +405,7 @@ class ApiService {
     );
 
     if (response.statusCode == 200) {
-      List<dynamic> data = jsonDecode(response.body);
+      List<dynamic> data = _firstPage(response);
       if (data.isNotEmpty) {
         return data.first;
       }
@@ -232,7 +425,7 @@ class ApiService {
     Map<String, bool> status = {'FAV': false, 'PEND': false, 'VISIT': false};
 
     if (response.statusCode == 200) {
-      List<dynamic> data = jsonDecode(response.body);
+      List<dynamic> data = _firstPage(response);
       for (var item in data) {
         String tipo = item['tipo'];
         if (status.containsKey(tipo)) {
@@ -247,37 +440,17 @@ class ApiService {
     if (currentUserId == null) return [];
 
     try {
-      // 1. Obtener la lista de IDs de favoritos
-      final responseFavs = await http.get(
-        Uri.parse('$baseUrl/favoritos/?usuario=$currentUserId&tipo=$tipo'),
+      // El backend une Favorito con Lugar y devuelve los lugares completos
+      final response = await http.get(
+        Uri.parse('$baseUrl/usuarios/$currentUserId/favoritos/?tipo=$tipo'),
       );
 
-      if (responseFavs.statusCode != 200) {
-        throw Exception('Error fetching favorites ids');
+      if (response.statusCode != 200) {
+        throw Exception('Error fetching favorites');
       }
 
-      List<dynamic> favsData = jsonDecode(responseFavs.body);
-      Set<int> lugarIds = favsData
-          .map((f) {
-            // Manejar si 'lugar' es un objeto o un ID
-            if (f['lugar'] is int) {
-              return f['lugar'] as int;
-            } else if (f['lugar'] is Map) {
-              return f['lugar']['id'] as int;
-            }
-            return -1; // Fallback
-          })
-          .where((id) => id != -1)
-          .toSet();
-
-      if (lugarIds.isEmpty) return [];
-
-      // 2. Obtener todos los lugares (o filtrar si el backend lo permitiera)
-      // Por ahora traemos todos y filtramos en memoria.
-      // Optimización futura: Endpoint que reciba lista de IDs o filtro en backend.
-      final allLugares = await fetchLugares();
-
-      return allLugares.where((l) => lugarIds.contains(l.id)).toList();
+      List<dynamic> body = jsonDecode(response.body);
+      return body.map((dynamic item) => Lugar.fromJson(item)).toList();
     } catch (e) {
       print("Error fetching user favorites: $e");
       return [];
@@ -297,6 +470,7 @@ class ApiService {
       if (existing == null) {
         await http.post(
           Uri.parse('$baseUrl/rutas-guardadas/'),
+          headers: await _headers(),
           body: {
             'usuario': currentUserId.toString(),
             'ruta': rutaId.toString(),
@@ -309,6 +483,7 @@ class ApiService {
       if (existing != null) {
         await http.delete(
           Uri.parse('$baseUrl/rutas-guardadas/${existing['id']}/'),
+          headers: await _headers(),
         );
       }
     }
@@ -324,7 +499,7 @@ class ApiService {
     );
 
     if (response.statusCode == 200) {
-      List<dynamic> data = jsonDecode(response.body);
+      List<dynamic> data = _firstPage(response);
       if (data.isNotEmpty) {
         return data.first;
       }
@@ -342,24 +517,17 @@ class ApiService {
     if (currentUserId == null) return [];
 
     try {
-      // 1. Obtener IDs de rutas guardadas
+      // El backend une Ruta_Guardada con Ruta y devuelve las rutas completas
       final response = await http.get(
-        Uri.parse('$baseUrl/rutas-guardadas/?usuario=$currentUserId'),
+        Uri.parse('$baseUrl/usuarios/$currentUserId/rutas_guardadas/'),
       );
 
       if (response.statusCode != 200) {
         throw Exception('Error fetching saved routes');
       }
 
-      List<dynamic> data = jsonDecode(response.body);
-      Set<int> rutaIds = data.map((item) => item['ruta'] as int).toSet();
-
-      if (rutaIds.isEmpty) return [];
-
-      // 2. Obtener todas las rutas y filtrar
-      // (Igual que con favoritos, idealmente el backend filtraría)
-      final allRutas = await fetchRutas();
-      return allRutas.where((r) => rutaIds.contains(r.id)).toList();
+      List<dynamic> body = jsonDecode(response.body);
+      return body.map((dynamic item) => Ruta.fromJson(item)).toList();
     } catch (e) {
       print("Error fetching saved routes: $e");
       return [];
@@ -371,7 +539,7 @@ class ApiService {
   Future<Ruta> createRuta(Map<String, dynamic> data) async {
     final response = await http.post(
       Uri.parse('$baseUrl/rutas/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(data),
     );
 
@@ -385,7 +553,7 @@ class ApiService {
   Future<Ruta> updateRuta(int id, Map<String, dynamic> data) async {
     final response = await http.patch(
       Uri.parse('$baseUrl/rutas/$id/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(data),
     );
 
@@ -397,13 +565,33 @@ class ApiService {
   }
 
   Future<void> deleteRuta(int id) async {
-    final response = await http.delete(Uri.parse('$baseUrl/rutas/$id/'));
+    final response = await http.delete(
+      Uri.parse('$baseUrl/rutas/$id/'),
+      headers: await _headers(),
+    );
 
     if (response.statusCode != 204) {
       throw Exception('Failed to delete ruta: ${response.body}');
     }
   }
 
+  // Trazado de la ruta sobre la red vial (polyline codificada + tramos).
+  // perfil: 'walking' o 'driving'
+  Future<Map<String, dynamic>> fetchGeometriaRuta(
+    int rutaId, {
+    String perfil = 'walking',
+  }) async {
+    final response = await http.get(
+      Uri.parse('$baseUrl/rutas/$rutaId/geometria/?perfil=$perfil'),
+    );
+
+    if (response.statusCode == 200) {
+      return jsonDecode(response.body);
+    } else {
+      throw Exception('Failed to load route geometry: ${response.statusCode}');
+    }
+  }
+
   // --- GESTIÓN DE LUGARES EN RUTA ---
 
   Future<RutaLugar> addLugarToRuta(
@@ -415,7 +603,7 @@ class ApiService {
   }) async {
     final response = await http.post(
       Uri.parse('$baseUrl/ruta-lugares/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode({
         'ruta': rutaId,
         'lugar': lugarId,
@@ -436,6 +624,7 @@ class ApiService {
   Future<void> removeLugarFromRuta(int rutaLugarId) async {
     final response = await http.delete(
       Uri.parse('$baseUrl/ruta-lugares/$rutaLugarId/'),
+      headers: await _headers(),
     );
 
     if (response.statusCode != 204) {
@@ -457,7 +646,7 @@ class ApiService {
   Future<Usuario> updateProfile(int userId, Map<String, dynamic> data) async {
     final response = await http.patch(
       Uri.parse('$baseUrl/usuarios/$userId/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(data),
     );
 
@@ -475,7 +664,7 @@ class ApiService {
       Uri.parse('$baseUrl/resenas/?$type=$targetId'),
     );
     if (response.statusCode == 200) {
-      return jsonDecode(response.body);
+      return _allPages(response);
     } else {
       throw Exception('Failed to load reviews');
     }
@@ -498,7 +687,7 @@ class ApiService {
 
     final response = await http.post(
       Uri.parse('$baseUrl/resenas/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(body),
     );
 
@@ -512,7 +701,7 @@ class ApiService {
 
     final response = await http.patch(
       Uri.parse('$baseUrl/resenas/$reviewId/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(body),
     );
 
@@ -524,7 +713,7 @@ class ApiService {
   Future<void> deleteReview(int reviewId) async {
     final response = await http.delete(
       Uri.parse('$baseUrl/resenas/$reviewId/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
     );
 
     if (response.statusCode != 204) {
@@ -554,13 +743,27 @@ class ApiService {
     final response = await http.get(Uri.parse('$baseUrl/publicaciones/?$query'));
 
     if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
+      List<dynamic> body = _firstPage(response);
       return body.map((item) => Publicacion.fromJson(item)).toList();
     } else {
       throw Exception('Failed to load publicaciones');
     }
   }
 
+  // Feed social: cada publicación trae num_comentarios y los últimos
+  // comentarios, sin pedir /comentarios/ por tarjeta.
+  Future<List<Publicacion>> fetchFeed({int comentarios = 2}) async {
+    final response = await http.get(
+        Uri.parse('$baseUrl/publicaciones/feed/?comentarios=$comentarios'));
+
+    if (response.statusCode == 200) {
+      List<dynamic> body = _firstPage(response);
+      return body.map((item) => Publicacion.fromJson(item)).toList();
+    } else {
+      throw Exception('Failed to load feed');
+    }
+  }
+
   Future<void> createPublicacion({
     required int usuarioId,
     required int lugarId,
@@ -570,6 +773,7 @@ class ApiService {
   }) async {
     var uri = Uri.parse('$baseUrl/publicaciones/');
     var request = http.MultipartRequest('POST', uri);
+    request.headers.addAll(await _headers());
 
     request.fields['usuario'] = usuarioId.toString();
     request.fields['lugar'] = lugarId.toString();
@@ -601,7 +805,7 @@ class ApiService {
   Future<void> updatePublicacion(int id, Map<String, dynamic> data) async {
     final response = await http.patch(
       Uri.parse('$baseUrl/publicaciones/$id/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode(data),
     );
 
@@ -611,7 +815,10 @@ class ApiService {
   }
 
   Future<void> deletePublicacion(int id) async {
-    final response = await http.delete(Uri.parse('$baseUrl/publicaciones/$id/'));
+    final response = await http.delete(
+      Uri.parse('$baseUrl/publicaciones/$id/'),
+      headers: await _headers(),
+    );
 
     if (response.statusCode != 204) {
       throw Exception('Failed to delete publicacion: ${response.body}');
@@ -621,7 +828,7 @@ class ApiService {
   Future<List<Comentario>> fetchComentarios(int publicacionId) async {
     final response = await http.get(Uri.parse('$baseUrl/comentarios/?publicacion=$publicacionId'));
     if (response.statusCode == 200) {
-      List<dynamic> body = jsonDecode(response.body);
+      List<dynamic> body = await _allPages(response);
       return body.map((item) => Comentario.fromJson(item)).toList();
     } else {
       throw Exception('Failed to load comentarios');
@@ -631,7 +838,7 @@ class ApiService {
   Future<void> createComentario(int usuarioId, int publicacionId, String texto) async {
     final response = await http.post(
       Uri.parse('$baseUrl/comentarios/'),
-      headers: {'Content-Type': 'application/json'},
+      headers: await _headers(json: true),
       body: jsonEncode({
         'usuario': usuarioId,
         'publicacion': publicacionId,
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django import forms
+from django.utils import timezone
+from . import busqueda
 from .models import (
     Usuario, Resena, Categoria, Lugar, Favorito,
     Evento, Ruta, Ruta_Guardada, Ruta_Lugar,
     Provincia, Canton, Parroquia,
-    AdministradorLugar, Publicacion
+    AdministradorLugar, Publicacion, Tarea
 )
 
 # --- INLINES ---
@@ -90,6 +92,15 @@ class LugarAdmin(admin.ModelAdmin):
     class Media:
         js = ('admin/js/location_dropdowns.js',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Usa el índice de texto completo (app1/busqueda.py) en lugar de
+        # icontains; sin índice o si el término solo tiene palabras vacías,
+        # la búsqueda normal del admin
+        ids = busqueda.ids_coincidentes(search_term, 'lugar') if search_term and busqueda.disponible() else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=ids), False
+
     def get_provincia(self, obj):
         return obj.ubicacion.canton.provincia.nombre if obj.ubicacion else "-"
     get_provincia.short_description = 'Provincia'
@@ -104,11 +115,21 @@ class LugarAdmin(admin.ModelAdmin):
 
 @admin.register(Ruta)
 class RutaAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'usuario', 'visibilidadRuta', 'tiempo_total_estimado', 'distanciaEstimadaKm')
+    list_display = ('nombre', 'usuario', 'visibilidadRuta', 'get_tiempo_total', 'distanciaEstimadaKm')
     list_filter = ('visibilidadRuta', 'categorias')
     search_fields = ('nombre', 'descripcion')
+    list_select_related = ('usuario',)
     inlines = [RutaLugarInline]
 
+    def get_queryset(self, request):
+        # Misma anotación que RutaViewSet: sin una consulta por fila
+        return super().get_queryset(request).con_tiempo_total()
+
+    def get_tiempo_total(self, obj):
+        return obj.tiempo_total_estimado
+    get_tiempo_total.short_description = 'Tiempo total estimado'
+    get_tiempo_total.admin_order_field = 'tiempo_total_estimado'
+
 @admin.register(Resena)
 class ResenaAdmin(admin.ModelAdmin):
     list_display = ('usuario', 'get_target', 'calificacion', 'fechaCreacion')
@@ -151,4 +172,19 @@ class PublicacionAdmin(admin.ModelAdmin):
 
     def get_summary(self, obj):
         return f"{obj.tipo} - {obj.lugar.nombre}"
-    get_summary.short_description = 'Resumen'
\ No newline at end of file
+    get_summary.short_description = 'Resumen'
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'argumentos', 'estado', 'prioridad', 'intentos', 'disponible_en', 'trabajador')
+    list_filter = ('estado', 'nombre')
+    readonly_fields = ('creada', 'terminada', 'error')
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar las tareas seleccionadas')
+    def reintentar(self, request, queryset):
+        total = queryset.exclude(estado=Tarea.EN_CURSO).update(
+            estado=Tarea.PENDIENTE, disponible_en=timezone.now(), intentos=0,
+            bloqueada_hasta=None, terminada=None,
+        )
+        self.message_user(request, f'{total} tareas reprogramadas.')
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class App1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app1'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Registra la comprobación app1.E001 (caché compartida con réplicas)
+        from . import replicas  # noqa: F401
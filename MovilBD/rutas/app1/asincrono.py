@@ -0,0 +1,224 @@
+"""
+Versión async (ASGI) de los GET más usados: /api/async/...
+
+    /api/async/lugares/            /api/async/lugares/<id>/
+    /api/async/rutas/              /api/async/rutas/<id>/
+    /api/async/eventos/            /api/async/publicaciones/feed/
+    /api/async/comentarios/
+
+Con un servidor ASGI (`uvicorn rutas.asgi:application`) una petición que
+espera a la base de datos no ocupa un worker. Las respuestas son las mismas
+que las de los ViewSets: cada vista usa el ViewSet para autenticar, filtrar
+(?fields=, ?expand=, ?near=...), paginar con cursor, serializar, cachear y
+responder 304 con ETag / Last-Modified (app1/versiones.py); solo las
+consultas salen del bucle de eventos.
+
+El ORM async de Django ejecuta las consultas de una petición una detrás de
+otra en el mismo hilo. En el detalle, el objeto y cada expansión con
+Prefetch (?expand=lugares,resenas) son consultas independientes: se lanzan
+a la vez con en_paralelo(), cada una con su propia conexión. La
+serialización corre en el bucle de eventos, donde una consulta perezosa
+falla (SynchronousOnlyOperation) en lugar de colar consultas por fila.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from .cache_respuestas import CacheRespuestaMixin, datos_cacheados
+from .expansion import ExpansionViewMixin
+from .versiones import GetCondicionalMixin, Validadores
+from .views import ComentarioViewSet, EventoViewSet, LugarViewSet, PublicacionViewSet, RutaViewSet
+
+
+def _aislada(funcion):
+    def ejecutar():
+        try:
+            return funcion()
+        finally:
+            # El hilo es del pool y sobrevive a la petición: su conexión se
+            # reutiliza o se cierra según CONN_MAX_AGE, como al final de una petición
+            close_old_connections()
+    return ejecutar
+
+
+async def en_paralelo(*funciones):
+    """
+    Ejecuta a la vez funciones síncronas que consultan la base de datos y
+    devuelve sus resultados en orden. Cada una corre en un hilo con su
+    conexión (y la réplica de la petición, ver app1/replicas.py): solo para
+    lecturas independientes, fuera de transacciones.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_aislada(funcion), thread_sensitive=False)() for funcion in funciones
+    ))
+
+
+def _vista(viewset_class, request, accion, **kwargs):
+    vista = viewset_class(action=accion, format_kwarg=None, args=(), kwargs=kwargs, headers={})
+    vista.request = Request(
+        request,
+        parsers=vista.get_parsers(),
+        authenticators=vista.get_authenticators(),
+        negotiator=vista.get_content_negotiator(),
+    )
+    return vista
+
+
+def _json(data, cache=None):
+    response = JsonResponse(data, safe=False, json_dumps_params={'ensure_ascii': False})
+    if cache:
+        response['X-Cache'] = cache
+    return response
+
+
+def _api(vista_async):
+    """
+    Errores como en la API síncrona: el exception_handler de DRF.
+    """
+    @functools.wraps(vista_async)
+    async def envoltura(request, *args, **kwargs):
+        try:
+            return await vista_async(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {})
+            return JsonResponse(response.data, status=response.status_code, json_dumps_params={'ensure_ascii': False})
+    return require_GET(envoltura)
+
+
+async def _responder(vista, generar):
+    # Autenticación (la sesión lee la base de datos), permisos y throttling
+    await sync_to_async(vista.initial)(vista.request)
+    validadores = None
+    if isinstance(vista, GetCondicionalMixin):
+        # Como GetCondicionalMixin: con la versión vigente, 304 sin generar nada
+        validadores = Validadores(await sync_to_async(vista.version_actual)(), vista.request)
+        if validadores.vigente:
+            response = HttpResponseNotModified()
+            validadores.aplicar(response)
+            return response
+    if isinstance(vista, CacheRespuestaMixin):
+        data, resultado = await datos_cacheados(vista, generar)
+        response = _json(data, resultado)
+    else:
+        response = _json(await generar())
+    if validadores is not None:
+        validadores.aplicar(response)
+    return response
+
+
+async def _listar(request, viewset_class):
+    vista = _vista(viewset_class, request, 'list')
+
+    async def generar():
+        queryset = vista.filter_queryset(vista.get_queryset())
+        pagina = await sync_to_async(vista.paginate_queryset)(queryset)
+        serializer = vista.get_serializer(pagina, many=True)
+        return vista.get_paginated_response(serializer.data).data
+
+    return await _responder(vista, generar)
+
+
+def _accesor(modelo, nombre):
+    # Relación inversa por su nombre de acceso ('resenas', 'ruta_lugar_set')
+    for relacion in modelo._meta.related_objects:
+        if relacion.get_accessor_name() == nombre and relacion.one_to_many:
+            return relacion
+    return None
+
+
+async def _detalle(request, viewset_class, pk):
+    vista = _vista(viewset_class, request, 'retrieve', pk=pk)
+
+    async def generar():
+        # Lo que ExpansionViewMixin.get_queryset() haría, pero cada Prefetch
+        # de una relación inversa se consulta aparte y a la vez que el objeto
+        queryset = super(ExpansionViewMixin, vista).get_queryset()
+        aparte = []
+        for nombre in vista.expansiones_pedidas():
+            expansion = vista.expansiones[nombre]
+            if expansion.select_related:
+                queryset = queryset.select_related(*expansion.select_related)
+            for prefetch in expansion.prefetch:
+                relacion = isinstance(prefetch, Prefetch) and prefetch.to_attr and _accesor(
+                    queryset.model, prefetch.prefetch_through
+                )
+                if relacion:
+                    aparte.append((prefetch, relacion.field))
+                else:
+                    queryset = queryset.prefetch_related(prefetch)
+
+        obj, *relacionados = await en_paralelo(
+            lambda: get_object_or_404(queryset, pk=pk),
+            *(
+                functools.partial(lambda p, campo: list(p.queryset.filter(**{campo.name: pk})), prefetch, campo)
+                for prefetch, campo in aparte
+            ),
+        )
+        vista.check_object_permissions(vista.request, obj)
+        for (prefetch, campo), filas in zip(aparte, relacionados):
+            # Como el Prefetch: cada fila ya conoce su objeto padre
+            for fila in filas:
+                campo.set_cached_value(fila, obj)
+            setattr(obj, prefetch.to_attr, filas)
+        return vista.get_serializer(obj).data
+
+    return await _responder(vista, generar)
+
+
+@_api
+async def lugares(request):
+    return await _listar(request, LugarViewSet)
+
+
+@_api
+async def lugar(request, pk):
+    """
+    ?expand=resenas,eventos: el lugar, sus reseñas y sus eventos a la vez.
+    """
+    return await _detalle(request, LugarViewSet, pk)
+
+
+@_api
+async def rutas(request):
+    return await _listar(request, RutaViewSet)
+
+
+@_api
+async def ruta(request, pk):
+    """
+    ?expand=lugares,resenas,usuario: la ruta (con su autor), sus paradas y
+    sus reseñas a la vez.
+    """
+    return await _detalle(request, RutaViewSet, pk)
+
+
+@_api
+async def eventos(request):
+    return await _listar(request, EventoViewSet)
+
+
+@_api
+async def comentarios(request):
+    return await _listar(request, ComentarioViewSet)
+
+
+@_api
+async def feed(request):
+    vista = _vista(PublicacionViewSet, request, 'feed')
+
+    async def generar():
+        # Las dos consultas del feed dependen una de otra (comentarios de
+        # las publicaciones de la página): van seguidas en un hilo
+        response = await sync_to_async(vista._generar_feed)(vista.request)
+        return response.data
+
+    return await _responder(vista, generar)
@@ -0,0 +1,197 @@
+"""
+Tokens de sesión firmados para Usuario.
+
+El login (check_password, PBKDF2: lento a propósito) entrega dos tokens
+firmados con SECRET_KEY (django.core.signing, HMAC):
+
+- acceso (TOKEN_ACCESO_SEG, corto): {'u': id, 'r': rol}. Se envía en cada
+  petición como `Authorization: Bearer <token>` y TokenFirmadoAuthentication
+  lo verifica sin consultar la base de datos: request.user es un
+  UsuarioToken con el id y el rol.
+- refresco (TOKEN_REFRESCO_SEG, largo): {'u': id, 'h': huella}. POST
+  /api/usuarios/refresh/ lo cambia por un par nuevo con una sola consulta
+  y sin hashear contraseñas. `huella` sale del hash de la contraseña
+  guardado: cambiar la contraseña invalida los tokens de refresco emitidos.
+
+Un token de acceso no se puede revocar antes de que caduque; por eso dura poco.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticatedOrReadOnly
+
+SAL_ACCESO = 'app1.autenticacion.acceso'
+SAL_REFRESCO = 'app1.autenticacion.refresco'
+
+
+def _acceso_seg():
+    return getattr(settings, 'TOKEN_ACCESO_SEG', 15 * 60)
+
+
+def _refresco_seg():
+    return getattr(settings, 'TOKEN_REFRESCO_SEG', 30 * 24 * 3600)
+
+
+class UsuarioToken:
+    """
+    Usuario autenticado por token: solo lo que lleva el token, sin tocar la base de datos.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, rol):
+        self.id = self.pk = id
+        self.rol = rol
+
+    def __str__(self):
+        return f'Usuario {self.id}'
+
+
+def _huella(usuario):
+    return salted_hmac(SAL_REFRESCO, usuario.password).hexdigest()[:16]
+
+
+def emitir_tokens(usuario):
+    return {
+        'access': signing.dumps({'u': usuario.id, 'r': usuario.rol}, salt=SAL_ACCESO),
+        'refresh': signing.dumps({'u': usuario.id, 'h': _huella(usuario)}, salt=SAL_REFRESCO),
+        'expires_in': _acceso_seg(),
+    }
+
+
+def verificar_acceso(token):
+    """
+    UsuarioToken del token de acceso; AuthenticationFailed si es inválido o caducó.
+    """
+    try:
+        datos = signing.loads(token, salt=SAL_ACCESO, max_age=_acceso_seg())
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('El token ha caducado.', code='token_caducado')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Token inválido.', code='token_invalido')
+    return UsuarioToken(datos['u'], datos.get('r'))
+
+
+def verificar_refresco(token):
+    """
+    Usuario del token de refresco; AuthenticationFailed si es inválido, caducó
+    o la contraseña cambió desde que se emitió.
+    """
+    from .models import Usuario
+
+    try:
+        datos = signing.loads(token, salt=SAL_REFRESCO, max_age=_refresco_seg())
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Token de refresco inválido.', code='token_invalido')
+    usuario = Usuario.objects.filter(pk=datos['u']).first()
+    if usuario is None or not constant_time_compare(datos['h'], _huella(usuario)):
+        raise exceptions.AuthenticationFailed('Token de refresco inválido.', code='token_invalido')
+    return usuario
+
+
+class TokenFirmadoAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <token de acceso>`. Sin cabecera la petición
+    sigue siendo anónima; con un token inválido o caducado responde 401.
+    """
+    palabra = b'bearer'
+
+    def authenticate(self, request):
+        partes = get_authorization_header(request).split()
+        if not partes or partes[0].lower() != self.palabra:
+            return None
+        if len(partes) != 2:
+            raise exceptions.AuthenticationFailed('Cabecera Authorization inválida.')
+        token = partes[1].decode('latin-1')
+        return verificar_acceso(token), token
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+def usuario_del_token(request):
+    """
+    Id del usuario del token de la petición, o None si es anónima.
+    """
+    usuario = getattr(request, 'user', None)
+    return usuario.id if isinstance(usuario, UsuarioToken) else None
+
+
+def parametro_usuario(request):
+    """
+    Valor de ?usuario=, donde ?usuario=me es el usuario del token.
+    """
+    valor = request.query_params.get('usuario')
+    if valor == 'me':
+        usuario_id = usuario_del_token(request)
+        if usuario_id is None:
+            raise exceptions.NotAuthenticated()
+        return usuario_id
+    return valor
+
+
+class EsElMismoUsuario(BasePermission):
+    """
+    Un Usuario solo lo edita o lo borra el propio usuario, con su token.
+    Leer y registrarse (POST /api/usuarios/) siguen abiertos; sin token la
+    respuesta es 401 y con el token de otro, 403.
+    """
+    message = 'Solo puedes modificar tu propio usuario.'
+
+    def has_object_permission(self, request, view, obj):
+        return request.method in SAFE_METHODS or usuario_del_token(request) == obj.pk
+
+
+class AutorDelTokenMixin:
+    """
+    Las filas que se crean, editan o borran deben ser del usuario del token:
+    no se puede escribir en nombre de otro. Leer sigue abierto; escribir sin
+    token responde 401 y con el token de otro (o sin token de Usuario), 403.
+    """
+    campo_autor = 'usuario'
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def autor_de(self, instance):
+        """
+        Id del autor de una fila ya guardada.
+        """
+        return getattr(instance, f'{self.campo_autor}_id')
+
+    def autor_de_datos(self, datos):
+        """
+        Id del autor que indican los datos validados, o None si no lo cambian.
+        """
+        autor = datos.get(self.campo_autor)
+        return autor.pk if autor is not None else None
+
+    def comprobar_autor(self, serializer):
+        usuario_id = usuario_del_token(self.request)
+        autores = []
+        if serializer.instance is not None:
+            autores.append(self.autor_de(serializer.instance))
+        nuevo = self.autor_de_datos(serializer.validated_data)
+        if nuevo is not None:
+            autores.append(nuevo)
+        if any(autor != usuario_id for autor in autores):
+            raise exceptions.PermissionDenied('No puedes escribir en nombre de otro usuario.')
+
+    def perform_create(self, serializer):
+        self.comprobar_autor(serializer)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.comprobar_autor(serializer)
+        super().perform_update(serializer)
+
+    def comprobar_propietario(self, instance, mensaje='No puedes modificar filas de otro usuario.'):
+        """
+        Para las acciones propias que escriben sobre una fila ya existente.
+        """
+        if self.autor_de(instance) != usuario_del_token(self.request):
+            raise exceptions.PermissionDenied(mensaje)
+
+    def perform_destroy(self, instance):
+        self.comprobar_propietario(instance, 'No puedes borrar filas de otro usuario.')
+        super().perform_destroy(instance)
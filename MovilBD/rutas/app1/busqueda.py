@@ -0,0 +1,174 @@
+"""
+Búsqueda de texto completo sobre Lugar, Ruta y Evento (/api/buscar/?q=).
+
+Índice invertido en una tabla virtual FTS5 de SQLite (`app1_busqueda`,
+creada en la migración 0011). Cada documento tiene dos columnas: `titulo`
+(nombre) y `cuerpo` (descripción, dirección, categorías), guardadas ya
+normalizadas: minúsculas, sin tildes, sin palabras vacías y con un
+stemming ligero del español, así "jardin" encuentra "Jardín Botánico" y
+"iglesias" encuentra "Iglesia". Los resultados se ordenan con BM25.
+
+El rowid codifica tipo e id (id * 8 + código del tipo), así actualizar o
+borrar un documento desde app1/signals.py es una operación por clave.
+
+Con otro motor de base de datos la tabla no existe: las señales y el
+comando `reindexar_busqueda` comprueban disponible() antes de escribir y
+/api/buscar/ responde 503.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+TABLA = 'app1_busqueda'
+
+# Código del tipo dentro del rowid
+TIPOS = {'lugar': 1, 'ruta': 2, 'evento': 3}
+TIPOS_POR_CODIGO = {codigo: tipo for tipo, codigo in TIPOS.items()}
+
+# Peso de cada columna en bm25(): coincidir en el nombre pesa más
+PESO_TITULO = 10.0
+PESO_CUERPO = 1.0
+
+PALABRAS_VACIAS = frozenset('''
+a al algo ante como con contra cual de del desde donde e el ella ellas ellos
+en entre era es esa ese eso esta este esto estos estas fue ha hay la las le
+les lo los mas me mi mis muy no nos o para pero por que se sin sobre son su
+sus tambien te tu u un una uno unos unas y ya
+'''.split())
+
+_PALABRA = re.compile(r'\w+')
+
+
+def disponible():
+    """
+    El índice FTS5 solo se crea en SQLite (migración 0011).
+    """
+    return connection.vendor == 'sqlite'
+
+
+def _sin_tildes(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+
+def raiz(palabra):
+    """
+    Stemming ligero del español: quita plurales y la vocal final.
+    luces -> luz, ciudades -> ciudad, iglesias -> iglesi, botanico -> botanic.
+    """
+    if len(palabra) > 4 and palabra.endswith('ces'):
+        return palabra[:-3] + 'z'
+    if len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def normalizar(texto):
+    """
+    Lista de raíces de `texto` tal como se guardan en el índice.
+    """
+    palabras = _PALABRA.findall(_sin_tildes(texto or '').lower())
+    return [raiz(p) for p in palabras if len(p) > 1 and p not in PALABRAS_VACIAS]
+
+
+def documento(tipo, objeto):
+    """
+    (titulo, cuerpo) indexables de un Lugar, Ruta o Evento.
+    """
+    if tipo == 'evento':
+        partes = [objeto.descripcion, objeto.categoriaEvento, objeto.direccionAlternativa]
+    else:
+        partes = [objeto.descripcion]
+        if tipo == 'lugar':
+            partes.append(objeto.direccionCompleta)
+        partes.extend(c.nombre for c in objeto.categorias.all())
+    cuerpo = ' '.join(normalizar(' '.join(p for p in partes if p)))
+    return ' '.join(normalizar(objeto.nombre)), cuerpo
+
+
+def _rowid(tipo, pk):
+    return pk * 8 + TIPOS[tipo]
+
+
+def indexar(tipo, objeto):
+    titulo, cuerpo = documento(tipo, objeto)
+    rowid = _rowid(tipo, objeto.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLA} (rowid, titulo, cuerpo) VALUES (%s, %s, %s)',
+            [rowid, titulo, cuerpo],
+        )
+
+
+def desindexar(tipo, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [_rowid(tipo, pk)])
+
+
+def reconstruir(modelos):
+    """
+    Vacía y vuelve a llenar el índice. `modelos` mapea tipo -> modelo.
+    Devuelve el número de documentos indexados.
+    """
+    filas = []
+    for tipo, modelo in modelos.items():
+        queryset = modelo.objects.all()
+        if tipo != 'evento':
+            queryset = queryset.prefetch_related('categorias')
+        for objeto in queryset:
+            filas.append((_rowid(tipo, objeto.pk), *documento(tipo, objeto)))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+        cursor.executemany(f'INSERT INTO {TABLA} (rowid, titulo, cuerpo) VALUES (%s, %s, %s)', filas)
+    return len(filas)
+
+
+def _consulta_fts(raices):
+    # Todas las palabras; la última vale como prefijo
+    terminos = [f'"{r}"' for r in raices]
+    terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+def buscar(texto, tipos=None, limite=20):
+    """
+    [(tipo, id, score), ...] ordenados por relevancia (BM25; mayor es mejor).
+    Todas las palabras deben aparecer; la última vale como prefijo para
+    poder buscar mientras se escribe. limite=None devuelve todos.
+    """
+    raices = normalizar(texto)
+    if not raices:
+        return []
+    sql = f'SELECT rowid, bm25({TABLA}, %s, %s) AS rango FROM {TABLA} WHERE {TABLA} MATCH %s'
+    params = [PESO_TITULO, PESO_CUERPO, _consulta_fts(raices)]
+    if tipos:
+        sql += ' AND rowid %% 8 IN (' + ', '.join(['%s'] * len(tipos)) + ')'
+        params.extend(TIPOS[t] for t in tipos)
+    sql += ' ORDER BY rango'
+    if limite is not None:
+        sql += ' LIMIT %s'
+        params.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+    return [(TIPOS_POR_CODIGO[rowid % 8], rowid // 8, -rango) for rowid, rango in filas]
+
+
+def ids_coincidentes(texto, tipo):
+    """
+    Subconsulta con los ids de `tipo` que coinciden con `texto`, para
+    filtrar un queryset (id__in=...) sin traer los ids a Python: una lista
+    de ids como parámetros supera el límite de variables de SQLite con un
+    término frecuente. None si el texto solo tiene palabras vacías.
+    """
+    raices = normalizar(texto)
+    if not raices:
+        return None
+    return RawSQL(
+        f'SELECT rowid / 8 FROM {TABLA} WHERE {TABLA} MATCH %s AND rowid %% 8 = %s',
+        [_consulta_fts(raices), TIPOS[tipo]],
+    )
@@ -0,0 +1,118 @@
+"""
+Caché de respuestas GET de la API.
+
+Guarda `response.data` ya serializado en la caché 'respuestas' (backend
+configurable en settings.CACHES: memoria local, archivos o Redis). La clave
+lleva la versión del recurso (ver app1/versiones.py): cuando una señal
+post_save/post_delete incrementa esa versión, las entradas anteriores dejan
+de consultarse y expiran solas. La invalidación es exacta por recurso y
+funciona igual con varios procesos, aunque la caché sea local a cada uno.
+
+La clave usa la URL absoluta (esquema y host incluidos) porque los datos
+guardados llevan URLs absolutas: enlaces de paginación y de medios.
+Lo que depende del usuario llega como parámetro (?usuario=) y ya forma
+parte de la clave; con ?usuario=me (usuario del token, ver
+app1/autenticacion.py) se añade el id del token.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from rest_framework.response import Response
+
+from .autenticacion import usuario_del_token
+from .versiones import DEPENDENCIAS, RecursoVersionadoMixin
+
+ALIAS = 'respuestas'
+
+
+def _clave(version, request):
+    firma = f'{request.build_absolute_uri()}:{request.META.get("HTTP_ACCEPT", "")}'
+    if request.query_params.get('usuario') == 'me':
+        firma += f':{usuario_del_token(request)}'
+    return f'{version.recurso}:{version.version}:{hashlib.sha1(firma.encode()).hexdigest()}'
+
+
+def _contar(recurso, resultado):
+    # Las estadísticas van en la caché 'default' para que no las desalojen
+    # las propias respuestas.
+    clave = f'cache-respuestas-stats:{recurso}:{resultado}'
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # Expulsada entre add() e incr()
+        cache.set(clave, 1, timeout=None)
+
+
+def estadisticas():
+    """
+    Aciertos y fallos por recurso desde el último reinicio de la caché.
+    """
+    claves = {
+        (recurso, resultado): f'cache-respuestas-stats:{recurso}:{resultado}'
+        for recurso in DEPENDENCIAS for resultado in ('hits', 'misses')
+    }
+    valores = cache.get_many(claves.values())
+    datos = {}
+    for recurso in DEPENDENCIAS:
+        hits = valores.get(claves[(recurso, 'hits')], 0)
+        misses = valores.get(claves[(recurso, 'misses')], 0)
+        total = hits + misses
+        datos[recurso] = {
+            'hits': hits,
+            'misses': misses,
+            'ratio': round(hits / total, 3) if total else None,
+        }
+    return datos
+
+
+class CacheRespuestaMixin(RecursoVersionadoMixin):
+    """
+    Sirve list/retrieve desde la caché de respuestas. El ViewSet declara
+    `recurso_version`; las acciones extra pueden usar respuesta_cacheada().
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(super().retrieve, request, *args, **kwargs)
+
+    def respuesta_cacheada(self, handler, request, *args, **kwargs):
+        respuestas = caches[ALIAS]
+        version = self.version_actual()
+        clave = _clave(version, request)
+        data = respuestas.get(clave)
+        if data is not None:
+            _contar(self.recurso_version, 'hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _contar(self.recurso_version, 'misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            respuestas.set(clave, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+async def datos_cacheados(vista, generar):
+    """
+    respuesta_cacheada() para las vistas async (app1/asincrono.py), con las
+    mismas claves y estadísticas. `generar` es una corrutina que devuelve
+    los datos. Devuelve (datos, 'HIT' o 'MISS').
+    """
+    respuestas = caches[ALIAS]
+    version = await sync_to_async(vista.version_actual)()
+    clave = _clave(version, vista.request)
+    data = await respuestas.aget(clave)
+    if data is not None:
+        await sync_to_async(_contar)(vista.recurso_version, 'hits')
+        return data, 'HIT'
+
+    await sync_to_async(_contar)(vista.recurso_version, 'misses')
+    data = await generar()
+    await respuestas.aset(clave, data)
+    return data, 'MISS'
@@ -0,0 +1,174 @@
+"""
+Respuestas con campos a elección (sparse fieldsets).
+
+- ?fields=id,nombre   solo esos campos
+- ?omit=descripcion   todos menos esos
+- ?vista=compacta     representación reducida de los listados que la tienen
+                      (`serializer_compacto_class` del ViewSet)
+
+Solo aplica en GET y al serializador raíz; los anidados se devuelven
+completos. El ViewSet difiere (.defer()) las columnas del modelo que ningún
+campo pedido usa (también en las tablas unidas) y quita los joins y las
+precargas que ya no hacen falta, así esas columnas ni se leen de la base de
+datos ni se hidratan.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+
+def _lista_param(request, nombre):
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+class CamposDinamicosSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer que respeta ?fields= / ?omit= de la petición del contexto.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Los serializadores anidados se declaran sin contexto propio
+        if request is None or 'context' not in kwargs or request.method not in METODOS_LECTURA:
+            return
+        incluir = _lista_param(request, 'fields')
+        omitir = _lista_param(request, 'omit') or set()
+        for nombre in list(self.fields):
+            if (incluir is not None and nombre not in incluir) or nombre in omitir:
+                self.fields.pop(nombre)
+
+
+def _rutas(campos):
+    """
+    `source` de cada campo como lista de tramos (None si usa el objeto entero).
+    Un serializador anidado lee todas las columnas del objeto relacionado: su
+    ruta termina en '*'.
+    """
+    rutas = []
+    for campo in campos.values():
+        source = getattr(campo, 'source', None)
+        if source == '*' or isinstance(campo, serializers.SerializerMethodField):
+            return None
+        if source:
+            ruta = source.split('.')
+            if isinstance(campo, serializers.BaseSerializer):
+                ruta.append('*')
+            rutas.append(ruta)
+    return rutas
+
+
+def _columnas_sin_usar(modelo, usadas, prefijo=''):
+    if '*' in usadas:
+        return []
+    return [
+        prefijo + f.name for f in modelo._meta.concrete_fields
+        if not f.primary_key and not f.is_relation and f.name not in usadas
+    ]
+
+
+def _hojas(arbol, prefijo):
+    """
+    Rutas de select_related de todas las hojas de `arbol` bajo `prefijo`.
+    """
+    hojas = []
+    for relacion, subarbol in arbol.items():
+        hojas += _hojas(subarbol, f'{prefijo}__{relacion}')
+    return hojas or [prefijo]
+
+
+def _podar_joins(modelo, arbol, rutas, prefijo=''):
+    """
+    Recorre el árbol de select_related: quita las ramas que ningún campo
+    atraviesa y devuelve (rutas de join que quedan, columnas a diferir).
+    """
+    joins, diferidas = [], []
+    for relacion, subarbol in arbol.items():
+        subrutas = [r[1:] for r in rutas if r[0] == relacion and len(r) > 1]
+        if not subrutas:
+            continue
+        ruta = f'{prefijo}{relacion}'
+        if ['*'] in subrutas:
+            # Un serializador anidado puede leer todo lo que cuelga de la relación
+            joins += _hojas(subarbol, ruta)
+            continue
+        destino = modelo._meta.get_field(relacion).related_model
+        diferidas += _columnas_sin_usar(destino, {r[0] for r in subrutas}, ruta + '__')
+        subjoins, subdiferidas = _podar_joins(destino, subarbol, subrutas, ruta + '__')
+        joins += subjoins or [ruta]
+        diferidas += subdiferidas
+    return joins, diferidas
+
+
+def optimizar_queryset(queryset, campos, conservar=()):
+    """
+    Difiere las columnas que no usan `campos` (salvo pk, relaciones y
+    `conservar`), también en las tablas unidas con select_related, y quita
+    los joins y las prefetch_related que ningún campo recorre.
+    `conservar` son rutas como los `source` ('nombre', 'usuario.username');
+    '*' conserva todo.
+    """
+    rutas = _rutas(campos)
+    if rutas is None or '*' in conservar:
+        # Un campo que recibe el objeto entero puede leer cualquier columna
+        return queryset
+    rutas += [c.split('.') for c in conservar]
+    fuentes = {r[0] for r in rutas}
+    modelo = queryset.model
+    diferidas = _columnas_sin_usar(modelo, fuentes)
+
+    arbol = queryset.query.select_related
+    if isinstance(arbol, dict):
+        joins, diferidas_join = _podar_joins(modelo, arbol, rutas)
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        diferidas += diferidas_join
+    if diferidas:
+        queryset = queryset.defer(*diferidas)
+
+    precargas = queryset._prefetch_related_lookups
+    necesarias = [
+        p for p in precargas
+        if (p if isinstance(p, str) else p.prefetch_through).split('__')[0] in fuentes
+    ]
+    if len(necesarias) != len(precargas):
+        queryset = queryset.prefetch_related(None).prefetch_related(*necesarias)
+    return queryset
+
+
+class CamposDinamicosViewMixin:
+    """
+    Ajusta serializador y queryset de los GET a ?fields= / ?omit= / ?vista=.
+    """
+    serializer_compacto_class = None
+
+    def get_serializer_class(self):
+        vista = self.request.query_params.get('vista')
+        if vista and self.request.method in METODOS_LECTURA:
+            if vista not in ('compacta', 'completa'):
+                raise ValidationError({'vista': 'Debe ser compacta o completa.'})
+            if vista == 'compacta' and self.action in ('list', 'exportar') and self.serializer_compacto_class:
+                return self.serializer_compacto_class
+        return super().get_serializer_class()
+
+    def columnas_conservadas(self):
+        """
+        Rutas que se leen aunque ningún campo pedido las use.
+        """
+        # La paginación por cursor lee los campos de orden del último objeto
+        orden = getattr(self, 'cursor_ordering', ())
+        if isinstance(orden, str):
+            orden = (orden,)
+        return [o.lstrip('-') for o in orden]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in METODOS_LECTURA:
+            return queryset
+        campos = self.get_serializer().fields
+        return optimizar_queryset(queryset, campos, self.columnas_conservadas())
@@ -0,0 +1,106 @@
+"""
+Contadores de interacción desnormalizados.
+
+Ruta.num_guardados y Lugar.num_favoritos / num_pendientes / num_visitados
+se mantienen desde app1/signals.py con UPDATE ... SET col = col ± 1, que la
+base de datos aplica de forma atómica sin leer la fila. Así ordenar por
+"más guardadas" es una lectura sobre una columna indexada y no un GROUP BY
+sobre la tabla intermedia. `reconciliar_contadores` repara cualquier
+desfase (p. ej. tras bulk_create o borrados con SQL directo).
+
+Con un `trabajador` en marcha (settings.TAREAS_TRABAJADOR), marcar un
+favorito no invalida al momento el ETag ni la caché del catálogo (sería
+invalidarlo en cada toque del botón): se programa una sola tarea por recurso
+que sube su sello pasados RETRASO_VERSION, así los contadores servidos desde
+caché llevan como mucho ese retraso. Sin trabajador nadie ejecutaría esa
+tarea y el sello se sube en la misma transacción que el contador.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .sincronizacion import RECURSO_DE_MODELO, registrar
+from .tareas import encolar_al_confirmar
+from .versiones import tocar
+
+# Favorito.tipo -> columna de Lugar
+CAMPOS_FAVORITO = {
+    'FAV': 'num_favoritos',
+    'PEND': 'num_pendientes',
+    'VISIT': 'num_visitados',
+}
+CONTADORES_LUGAR = tuple(CAMPOS_FAVORITO.values())
+CONTADORES_RUTA = ('num_guardados',)
+
+RETRASO_VERSION = timedelta(seconds=60)
+
+
+def ajustar(modelo, pk, campo, delta):
+    """
+    Suma `delta` al contador `campo` de la fila `pk` (nunca baja de 0).
+    """
+    recurso = RECURSO_DE_MODELO[modelo.__name__]
+    modelo.objects.filter(pk=pk).update(**{campo: Greatest(F(campo) + delta, 0)})
+    registrar(recurso, [pk])
+    if not getattr(settings, 'TAREAS_TRABAJADOR', False):
+        tocar(recurso)
+        return
+    # Mientras haya una pendiente, las marcas siguientes no encolan otra
+    encolar_al_confirmar(
+        'tocar_versiones', recurso, prioridad=-5, retraso=RETRASO_VERSION, clave=f'contadores:{recurso}'
+    )
+
+
+def reconciliar_contadores():
+    """
+    Recalcula todos los contadores a partir de Ruta_Guardada y Favorito y
+    escribe en bloque solo las filas desfasadas.
+    Devuelve (rutas corregidas, lugares corregidos).
+    """
+    from .models import Favorito, Lugar, Ruta, Ruta_Guardada
+
+    guardados = dict(
+        Ruta_Guardada.objects.order_by().values('ruta').annotate(total=Count('id'))
+        .values_list('ruta', 'total')
+    )
+    rutas_modificadas = []
+    for ruta in Ruta.objects.only('id', 'num_guardados'):
+        total = guardados.get(ruta.id, 0)
+        if ruta.num_guardados != total:
+            ruta.num_guardados = total
+            rutas_modificadas.append(ruta)
+
+    por_lugar = defaultdict(dict)
+    for lugar_id, tipo, total in (
+        Favorito.objects.order_by().values('lugar', 'tipo').annotate(total=Count('id'))
+        .values_list('lugar', 'tipo', 'total')
+    ):
+        if tipo in CAMPOS_FAVORITO:
+            por_lugar[lugar_id][CAMPOS_FAVORITO[tipo]] = total
+    lugares_modificados = []
+    for lugar in Lugar.objects.only('id', *CONTADORES_LUGAR):
+        totales = por_lugar.get(lugar.id, {})
+        cambio = False
+        for campo in CONTADORES_LUGAR:
+            total = totales.get(campo, 0)
+            if getattr(lugar, campo) != total:
+                setattr(lugar, campo, total)
+                cambio = True
+        if cambio:
+            lugares_modificados.append(lugar)
+
+    Ruta.objects.bulk_update(rutas_modificadas, list(CONTADORES_RUTA), batch_size=500)
+    Lugar.objects.bulk_update(lugares_modificados, list(CONTADORES_LUGAR), batch_size=500)
+    # bulk_update no dispara señales
+    recursos = []
+    if rutas_modificadas:
+        recursos.append('rutas')
+    if lugares_modificados:
+        recursos.append('lugares')
+    tocar(*recursos)
+    registrar('rutas', [r.id for r in rutas_modificadas])
+    registrar('lugares', [l.id for l in lugares_modificados])
+    return len(rutas_modificadas), len(lugares_modificados)
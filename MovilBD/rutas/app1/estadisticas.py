@@ -0,0 +1,81 @@
+"""
+Estadísticas del perfil de usuario (/api/usuarios/{id}/stats/).
+
+Todos los conteos salen de una sola consulta: las filas del usuario en
+Favorito, Ruta, Ruta_Guardada, Resena y Publicacion se unen con UNION ALL,
+cada una con una etiqueta, y se cuentan con Count(filter=Q(...)) por
+etiqueta. Unir las cinco tablas a Usuario con JOIN multiplicaría las filas.
+
+El resultado se guarda en la caché por usuario. La clave incluye el sello
+del usuario en VersionStats, que app1/signals.py incrementa cuando cambian
+sus Favorito, Ruta, Ruta_Guardada, Resena o Publicacion: al estar en la
+base de datos, la invalidación llega a todos los procesos aunque cada uno
+tenga su propia caché local.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Value
+
+# Las señales invalidan la entrada; el timeout solo acota entradas huérfanas
+TIMEOUT_STATS = 60 * 60
+
+# Conteo -> etiqueta de sus filas (Favorito.tipo o el nombre del modelo)
+ETIQUETAS = {
+    'favoritos': 'FAV',
+    'visitados': 'VISIT',
+    'pendientes': 'PEND',
+    'rutas': 'ruta',
+    'rutas_guardadas': 'ruta_guardada',
+    'resenas': 'resena',
+    'publicaciones': 'publicacion',
+}
+
+
+def clave_stats(usuario_id, version):
+    return f'usuario-stats:{usuario_id}:{version}'
+
+
+def calcular_stats(usuario_id):
+    """
+    Conteos del usuario en una consulta.
+    """
+    from .models import Favorito, Publicacion, Resena, Ruta, Ruta_Guardada
+
+    filas = Favorito.objects.filter(usuario_id=usuario_id).annotate(etiqueta=F('tipo'))
+    filas = filas.values_list('etiqueta').order_by()
+    for modelo in (Ruta, Ruta_Guardada, Resena, Publicacion):
+        otras = modelo.objects.filter(usuario_id=usuario_id).annotate(etiqueta=Value(modelo._meta.model_name))
+        filas = filas.union(otras.values_list('etiqueta').order_by(), all=True)
+    return filas.aggregate(**{
+        nombre: Count('etiqueta', filter=Q(etiqueta=etiqueta)) for nombre, etiqueta in ETIQUETAS.items()
+    })
+
+
+def stats_usuario(usuario_id):
+    """
+    Estadísticas de la caché o recién calculadas; None si el usuario no existe.
+    """
+    from .models import Usuario, VersionStats
+
+    # Existencia del usuario y sello en la misma consulta
+    fila = Usuario.objects.filter(pk=usuario_id).values_list('version_stats__version', flat=True)
+    if not fila:
+        return None
+    version = fila[0]
+    if version is None:
+        # El sello se crea antes de calcular para que una escritura
+        # concurrente ya lo incremente
+        version = VersionStats.objects.get_or_create(usuario_id=usuario_id)[0].version
+    clave = clave_stats(usuario_id, version)
+    stats = cache.get(clave)
+    if stats is None:
+        stats = calcular_stats(usuario_id)
+        cache.set(clave, stats, timeout=TIMEOUT_STATS)
+    return stats
+
+
+def invalidar_stats(*usuario_ids):
+    from .models import VersionStats
+
+    ids = {pk for pk in usuario_ids if pk is not None}
+    if ids:
+        VersionStats.objects.filter(usuario_id__in=ids).update(version=F('version') + 1)
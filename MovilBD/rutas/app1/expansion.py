@@ -0,0 +1,140 @@
+"""
+Inclusión de recursos relacionados en la misma respuesta (?expand=).
+
+/api/rutas/5/?expand=lugares,resenas,usuario devuelve la ruta con sus
+paradas (y el lugar de cada una), sus reseñas y su autor en una sola
+petición, en lugar de encadenar /ruta-lugares/?ruta=, /lugares/{id}/ y
+/resenas/?ruta= desde el cliente.
+
+Cada ViewSet declara sus `expansiones`. Una expansión se carga siempre con
+select_related o con un único Prefetch para toda la página (o para el
+objeto), nunca con consultas por fila. Las claves de caché y los ETag
+incluyen la versión de los recursos expandidos (ver app1/versiones.py).
+"""
+from django.db.models import ForeignObjectRel
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .campos import METODOS_LECTURA
+
+
+class Expansion:
+    """
+    Campo que ?expand=<nombre> añade (o sustituye, si ya existe) en la respuesta.
+
+    - serializer_class: serializador del recurso incluido
+    - source: atributo del objeto (por defecto el nombre de la expansión)
+    - many: lista de objetos
+    - select_related / prefetch: cómo cargarlo junto con el queryset principal
+    - recursos: recursos de DEPENDENCIAS de los que depende su contenido
+    """
+
+    def __init__(self, serializer_class, source=None, many=False,
+                 select_related=(), prefetch=(), recursos=()):
+        self.serializer_class = serializer_class
+        self.source = source
+        self.many = many
+        self.select_related = select_related
+        self.prefetch = prefetch
+        self.recursos = recursos
+
+    def campo(self, nombre):
+        source = self.source if self.source and self.source != nombre else None
+        kwargs = {'source': source} if source else {}
+        return self.serializer_class(many=self.many, read_only=True, **kwargs)
+
+    def rutas_del_padre(self, modelo):
+        """
+        Lo que el serializador incluido lee del objeto principal. Un Prefetch
+        de una relación inversa (ruta.ruta_lugar_set) deja en cada fila el
+        objeto principal ya cargado (parada.ruta), así que 'ruta.nombre' se
+        lee de la fila principal: si ?fields= difiriese esa columna habría
+        una consulta por fila.
+        Devuelve rutas para optimizar_queryset() ('nombre', 'usuario.username',
+        '*' si puede leer cualquier cosa).
+        """
+        inversas = {
+            r.get_accessor_name(): r for r in modelo._meta.related_objects
+            if isinstance(r, ForeignObjectRel) and not r.many_to_many
+        }
+        rutas = []
+        for prefetch in self.prefetch:
+            lookup = prefetch if isinstance(prefetch, str) else prefetch.prefetch_through
+            relacion = inversas.get(lookup.split('__')[0])
+            if relacion is not None:
+                rutas += _rutas_desde(self.serializer_class().fields, relacion.field.name)
+        return rutas
+
+
+def _rutas_desde(campos, relacion):
+    rutas = []
+    for campo in campos.values():
+        source = getattr(campo, 'source', None) or ''
+        if source == '*' or isinstance(campo, serializers.SerializerMethodField):
+            return ['*']
+        tramos = source.split('.')
+        if tramos[0] != relacion:
+            continue
+        if len(tramos) == 1:
+            # El id ya está en la fila incluida; cualquier otra cosa usa el objeto
+            if not isinstance(campo, serializers.PrimaryKeyRelatedField):
+                return ['*']
+            continue
+        if isinstance(campo, serializers.BaseSerializer):
+            tramos.append('*')
+        rutas.append('.'.join(tramos[1:]))
+    return rutas
+
+
+class ExpansionViewMixin:
+    """
+    Aplica ?expand=a,b a los GET del ViewSet según `expansiones`.
+    Va la primera en las bases del ViewSet: así la poda de columnas y
+    precargas de ?fields= (CamposDinamicosViewMixin) no quita las que añade
+    una expansión y la versión de caché/ETag incluye los recursos expandidos.
+    """
+    expansiones = {}
+
+    def expansiones_pedidas(self):
+        if self.request.method not in METODOS_LECTURA:
+            return []
+        valor = self.request.query_params.get('expand')
+        if not valor:
+            return []
+        nombres = [n.strip() for n in valor.split(',') if n.strip()]
+        invalidas = [n for n in nombres if n not in self.expansiones]
+        if invalidas:
+            disponibles = ', '.join(self.expansiones) or 'ninguna'
+            raise ValidationError({'expand': f'Expansiones disponibles: {disponibles}.'})
+        return list(dict.fromkeys(nombres))
+
+    def columnas_conservadas(self):
+        columnas = super().columnas_conservadas()
+        for nombre in self.expansiones_pedidas():
+            columnas += self.expansiones[nombre].rutas_del_padre(self.queryset.model)
+        return columnas
+
+    def recursos_relacionados(self):
+        recursos = super().recursos_relacionados()
+        for nombre in self.expansiones_pedidas():
+            recursos.extend(r for r in self.expansiones[nombre].recursos if r not in recursos)
+        return recursos
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for nombre in self.expansiones_pedidas():
+            expansion = self.expansiones[nombre]
+            if expansion.select_related:
+                queryset = queryset.select_related(*expansion.select_related)
+            if expansion.prefetch:
+                queryset = queryset.prefetch_related(*expansion.prefetch)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        pedidas = self.expansiones_pedidas()
+        if pedidas:
+            base = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+            for nombre in pedidas:
+                base.fields[nombre] = self.expansiones[nombre].campo(nombre)
+        return serializer
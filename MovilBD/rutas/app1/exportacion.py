@@ -0,0 +1,62 @@
+"""
+Exportación completa de un listado en streaming (/api/<recurso>/exportar/).
+
+El listado normal pagina por cursor; para descargar toda la colección de una
+vez DRF construiría la lista entera de dicts y luego el JSON entero en
+memoria antes de enviar el primer byte. Aquí el queryset se recorre con
+.iterator(chunk_size=...) (las prefetch_related se resuelven por bloque) y
+cada bloque se serializa y se envía con StreamingHttpResponse, así la memoria
+del worker no depende del tamaño del resultado.
+
+Acepta los mismos filtros y ?fields= / ?omit= que el listado del ViewSet.
+La respuesta es un array JSON, sin envoltorio de paginación.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.utils.encoders import JSONEncoder
+
+# Filas leídas de la base de datos (y enviadas) por bloque
+TAMANO_BLOQUE = 500
+
+
+def json_en_bloques(filas, serializar, tamano=TAMANO_BLOQUE):
+    """
+    Genera un array JSON por trozos: un trozo de texto cada `tamano` filas.
+    """
+    codificador = JSONEncoder(ensure_ascii=False)
+    yield '['
+    separador = ''
+    bloque = []
+    for fila in filas:
+        bloque.append(codificador.encode(serializar(fila)))
+        if len(bloque) == tamano:
+            yield separador + ','.join(bloque)
+            separador = ','
+            bloque = []
+    if bloque:
+        yield separador + ','.join(bloque)
+    yield ']'
+
+
+class ExportacionMixin:
+    """
+    Añade la acción GET `exportar` con todos los resultados del listado.
+    """
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        orden = getattr(self, 'cursor_ordering', None)
+        if orden:
+            queryset = queryset.order_by(*((orden,) if isinstance(orden, str) else orden))
+        # Un solo serializador para todas las filas: los campos se construyen una vez
+        serializer = self.get_serializer()
+        filas = queryset.iterator(chunk_size=TAMANO_BLOQUE)
+        response = StreamingHttpResponse(
+            json_en_bloques(filas, serializer.to_representation),
+            content_type='application/json; charset=utf-8',
+        )
+        # /api/lugares/exportar/ -> lugares.json
+        nombre = request.path.rstrip('/').split('/')[-2]
+        response['Content-Disposition'] = f'attachment; filename="{nombre}.json"'
+        return response
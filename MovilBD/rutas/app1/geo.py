@@ -0,0 +1,93 @@
+"""
+Utilidades geográficas para búsquedas espaciales de Lugar.
+
+El índice espacial es una rejilla fija: cada lugar guarda en `Lugar.celda`
+el número de la celda de GRID_GRADOS x GRID_GRADOS que contiene sus
+coordenadas. Las celdas se numeran fila por fila, así que las celdas de una
+misma fila dentro de un bbox forman un rango contiguo y se resuelven con un
+rango sobre el índice de `celda`, sin recorrer la tabla.
+"""
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+# 0.01° ~ 1.1 km: una vista de ciudad cubre pocas filas de la rejilla.
+GRID_GRADOS = 0.01
+GRID_COLUMNAS = int(round(360 / GRID_GRADOS))
+
+# Por encima de este número de filas se usa un único rango de celdas
+# (todas las longitudes de esas filas) y se filtra la longitud después.
+MAX_FILAS_BBOX = 64
+
+
+def _fila(lat):
+    return int(math.floor((float(lat) + 90) / GRID_GRADOS))
+
+
+def _columna(lon):
+    return int(math.floor((float(lon) + 180) / GRID_GRADOS)) % GRID_COLUMNAS
+
+
+def celda_para(lat, lon):
+    """
+    Número de celda de la rejilla que contiene (lat, lon).
+    """
+    if lat is None or lon is None:
+        return None
+    return _fila(lat) * GRID_COLUMNAS + _columna(lon)
+
+
+def filtro_bbox(sur, oeste, norte, este):
+    """
+    Q para los lugares dentro del rectángulo (sur, oeste) - (norte, este).
+    Combina rangos sobre el índice de `celda` con el filtro exacto.
+    """
+    fila_min, fila_max = _fila(sur), _fila(norte)
+    col_min, col_max = _columna(oeste), _columna(este)
+
+    if fila_max - fila_min + 1 > MAX_FILAS_BBOX or col_min > col_max:
+        # bbox muy alto o que cruza el antimeridiano: un solo rango por filas
+        celdas = Q(celda__range=(fila_min * GRID_COLUMNAS, (fila_max + 1) * GRID_COLUMNAS - 1))
+    else:
+        celdas = Q()
+        for fila in range(fila_min, fila_max + 1):
+            base = fila * GRID_COLUMNAS
+            celdas |= Q(celda__range=(base + col_min, base + col_max))
+
+    exacto = Q(latitud__gte=sur, latitud__lte=norte)
+    if oeste <= este:
+        exacto &= Q(longitud__gte=oeste, longitud__lte=este)
+    else:
+        exacto &= Q(longitud__gte=oeste) | Q(longitud__lte=este)
+    return celdas & exacto
+
+
+def bbox_radio(lat, lon, radio_km):
+    """
+    Rectángulo (sur, oeste, norte, este) que contiene el círculo de radio_km.
+    """
+    dlat = radio_km / KM_POR_GRADO
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = radio_km / (KM_POR_GRADO * cos_lat)
+    if dlon >= 180:
+        return (max(lat - dlat, -90), -180, min(lat + dlat, 90), 180)
+    oeste = (lon - dlon + 180) % 360 - 180
+    este = (lon + dlon + 180) % 360 - 180
+    return (max(lat - dlat, -90), oeste, min(lat + dlat, 90), este)
+
+
+def distancia_km(lat, lon):
+    """
+    Expresión haversine (en km) desde (lat, lon) hasta cada Lugar.
+    Se evalúa en la base de datos; Django registra estas funciones en SQLite.
+    """
+    lat1 = math.radians(lat)
+    lat2 = Radians(F('latitud'), output_field=FloatField())
+    dlat = lat2 - lat1
+    dlon = Radians(F('longitud'), output_field=FloatField()) - math.radians(lon)
+    a = Power(Sin(dlat / 2), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin(dlon / 2), 2)
+    return 2 * RADIO_TIERRA_KM * ASin(Sqrt(a))
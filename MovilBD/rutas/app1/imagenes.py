@@ -0,0 +1,114 @@
+"""
+Variantes de las imágenes de Publicacion.archivo_media.
+
+El teléfono sube la foto tal cual (varios MB, con EXIF y a veces rotada por
+la etiqueta Orientation). Después del commit, una tarea de la cola
+(app1/tareas.py) genera, por cada tamaño de VARIANTES, una versión WebP y otra JPEG
+(para clientes sin WebP). Las variantes se guardan ya rotadas y sin EXIF
+(ni GPS ni datos de la cámara) en media/publicaciones/variantes/<id>/, con
+el hash del contenido en el nombre (app1/medios.py). El
+resultado se anota en Publicacion.variantes y PublicacionSerializer expone
+sus URLs. La tarjeta del feed descarga así la variante 'card' y no el
+original.
+
+`generar_variantes` es idempotente: si el archivo de origen cambió mientras
+se procesaba, no pisa el resultado de la subida nueva.
+"""
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .versiones import tocar
+
+# nombre -> lado mayor en píxeles (nunca se amplía el original)
+VARIANTES = {
+    'thumb': 320,
+    'card': 800,
+    'full': 1600,
+}
+CALIDAD_WEBP = 80
+CALIDAD_JPEG = 82
+CARPETA = 'publicaciones/variantes'
+
+
+def _carpeta(publicacion_id):
+    return f'{CARPETA}/{publicacion_id}'
+
+
+def _guardar(ruta, imagen, formato, **opciones):
+    buffer = BytesIO()
+    imagen.save(buffer, formato, **opciones)
+    # El almacenamiento añade la huella: devuelve el nombre real
+    return default_storage.save(ruta, ContentFile(buffer.getvalue()))
+
+
+def procesar(archivo, publicacion_id):
+    """
+    Escribe las variantes de la imagen `archivo` y devuelve su descripción:
+    {'origen': nombre, 'thumb': {'webp': ruta, 'jpeg': ruta, 'ancho': .., 'alto': ..}, ...}
+    """
+    with Image.open(archivo) as original:
+        # Aplica la rotación de EXIF antes de descartarlo
+        imagen = ImageOps.exif_transpose(original)
+        icc = original.info.get('icc_profile')
+        con_alfa = imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+        imagen = imagen.convert('RGBA' if con_alfa else 'RGB')
+
+    resultado = {'origen': archivo.name}
+    for nombre, lado in VARIANTES.items():
+        variante = imagen.copy()
+        variante.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        if con_alfa:
+            # JPEG no tiene transparencia: se compone sobre blanco
+            opaca = Image.new('RGB', variante.size, 'white')
+            opaca.paste(variante, mask=variante.getchannel('A'))
+        else:
+            opaca = variante
+        base = f'{_carpeta(publicacion_id)}/{nombre}'
+        # Sin exif=: Pillow no copia los metadatos del original
+        resultado[nombre] = {
+            'webp': _guardar(f'{base}.webp', variante, 'WEBP', quality=CALIDAD_WEBP, method=4, icc_profile=icc),
+            'jpeg': _guardar(
+                f'{base}.jpg', opaca, 'JPEG',
+                quality=CALIDAD_JPEG, optimize=True, progressive=True, icc_profile=icc,
+            ),
+            'ancho': variante.width,
+            'alto': variante.height,
+        }
+    return resultado
+
+
+def generar_variantes(publicacion_id):
+    """
+    Genera y anota las variantes de una publicación. Devuelve True si las escribió.
+    """
+    from .models import Publicacion
+
+    publicacion = Publicacion.objects.filter(pk=publicacion_id).only('id', 'archivo_media').first()
+    if publicacion is None or not publicacion.archivo_media:
+        return False
+    origen = publicacion.archivo_media.name
+    with publicacion.archivo_media.open('rb') as archivo:
+        variantes = procesar(archivo, publicacion_id)
+    # .update() para no disparar las señales de la publicación; solo si el
+    # origen sigue siendo el mismo archivo
+    actualizadas = Publicacion.objects.filter(pk=publicacion_id, archivo_media=origen).update(variantes=variantes)
+    if actualizadas:
+        tocar('publicaciones')
+        # Las variantes de la imagen anterior tienen otra huella
+        vigentes = {ruta for nombre in VARIANTES for ruta in (variantes[nombre]['webp'], variantes[nombre]['jpeg'])}
+        borrar_variantes(publicacion_id, conservar=vigentes)
+    return bool(actualizadas)
+
+
+def borrar_variantes(publicacion_id, conservar=()):
+    carpeta = _carpeta(publicacion_id)
+    if not default_storage.exists(carpeta):
+        return
+    _, archivos = default_storage.listdir(carpeta)
+    for archivo in archivos:
+        ruta = f'{carpeta}/{archivo}'
+        if ruta not in conservar:
+            default_storage.delete(ruta)
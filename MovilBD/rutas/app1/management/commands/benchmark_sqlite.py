@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Lectura típica de un listado: una página de lugares con su parroquia
+LECTURA = (
+    'SELECT l.id, l.nombre, l.latitud, l.longitud, l.num_favoritos, p.nombre '
+    'FROM app1_lugar l LEFT JOIN app1_parroquia p ON p.id = l.ubicacion_id '
+    'ORDER BY l.num_favoritos DESC, l.id LIMIT 50'
+)
+# Escritura de un favorito como la hace el ORM: lee, ajusta el contador y
+# registra el cambio para /api/sync/, en una transacción
+ESCRITURA = (
+    ('SELECT num_favoritos FROM app1_lugar WHERE id = ?', False),
+    ('UPDATE app1_lugar SET num_favoritos = num_favoritos + 1 WHERE id = ?', False),
+    ("DELETE FROM app1_cambiosync WHERE recurso = 'lugares' AND objeto_id = ?", False),
+    ("INSERT INTO app1_cambiosync (recurso, objeto_id, borrado, fecha) VALUES ('lugares', ?, 0, ?)", True),
+)
+
+NOMBRES_PERFILES = ('anterior', 'produccion')
+
+
+def perfiles():
+    """
+    perfil -> (PRAGMA, BEGIN de las escrituras, conexión persistente).
+    'anterior' es la configuración de antes: sin PRAGMA (journal DELETE),
+    transacciones DEFERRED y una conexión por petición (CONN_MAX_AGE=0).
+    """
+    return {
+        'anterior': ({}, 'BEGIN', False),
+        'produccion': (
+            {'journal_mode': settings.SQLITE_JOURNAL_MODE, **settings.SQLITE_PRAGMAS}, 'BEGIN IMMEDIATE', True,
+        ),
+    }
+
+
+def _conectar(ruta, pragmas):
+    # Mismo timeout por defecto que usa Django (el de sqlite3: 5 s)
+    conexion = sqlite3.connect(ruta, isolation_level=None)
+    for nombre, valor in pragmas.items():
+        conexion.execute(f'PRAGMA {nombre}={valor}')
+    return conexion
+
+
+def _trabajar(ruta, configuracion, inicio, segundos, proporcion_escrituras, semilla, resultados):
+    # Proceso aparte (spawn): recibe la configuración ya resuelta, sin settings
+    pragmas, begin, persistente = configuracion
+    azar = random.Random(semilla)
+    conexion = sqlite3.connect(ruta)
+    lugar_ids = [fila[0] for fila in conexion.execute('SELECT id FROM app1_lugar')]
+    conexion.close()
+    conexion = None
+    lecturas = escrituras = errores = 0
+    latencias = []
+
+    time.sleep(max(inicio - time.time(), 0))
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        t0 = time.perf_counter()
+        try:
+            if conexion is None:
+                conexion = _conectar(ruta, pragmas)
+            if azar.random() < proporcion_escrituras:
+                lugar_id = azar.choice(lugar_ids)
+                conexion.execute(begin)
+                for sql, con_fecha in ESCRITURA:
+                    conexion.execute(sql, (lugar_id, time.time()) if con_fecha else (lugar_id,)).fetchall()
+                conexion.execute('COMMIT')
+                escrituras += 1
+            else:
+                conexion.execute(LECTURA).fetchall()
+                lecturas += 1
+        except sqlite3.OperationalError:
+            # "database is locked"
+            errores += 1
+            if conexion is not None and conexion.in_transaction:
+                conexion.execute('ROLLBACK')
+        latencias.append(time.perf_counter() - t0)
+        if not persistente and conexion is not None:
+            conexion.close()
+            conexion = None
+    if conexion is not None:
+        conexion.close()
+    resultados.put((lecturas, escrituras, errores, latencias))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de SQLite con la configuración anterior y con '
+        'WAL, settings.SQLITE_PRAGMAS, IMMEDIATE y conexiones persistentes, usando '
+        'varios procesos que leen y escriben a la vez sobre una copia de la base de datos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=5.0, help='Duración de cada perfil')
+        parser.add_argument('--escrituras', type=float, default=0.2, help='Proporción de escrituras (0-1)')
+        parser.add_argument('--perfil', choices=NOMBRES_PERFILES, action='append', help='Por defecto, todos')
+
+    def handle(self, *args, **options):
+        origen = settings.DATABASES['default']['NAME']
+        configuraciones = perfiles()
+        resumen = {}
+        with tempfile.TemporaryDirectory() as carpeta:
+            for perfil in options['perfil'] or NOMBRES_PERFILES:
+                ruta = os.path.join(carpeta, f'{perfil}.sqlite3')
+                # Copia coherente aunque la original esté en WAL
+                fuente, copia = sqlite3.connect(origen), sqlite3.connect(ruta)
+                fuente.backup(copia)
+                copia.execute(f"PRAGMA journal_mode={configuraciones[perfil][0].get('journal_mode', 'DELETE')}")
+                fuente.close()
+                copia.close()
+                resumen[perfil] = self.medir(ruta, configuraciones[perfil], options)
+
+        self.stdout.write(
+            f"{'perfil':<12}{'ops/s':>10}{'lect/s':>10}{'escr/s':>10}{'bloqueos':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for perfil, (ops, lecturas, escrituras, errores, p50, p99) in resumen.items():
+            self.stdout.write(
+                f'{perfil:<12}{ops:>10.0f}{lecturas:>10.0f}{escrituras:>10.0f}{errores:>10}{p50:>10.2f}{p99:>10.2f}'
+            )
+        if 'anterior' in resumen and 'produccion' in resumen and resumen['anterior'][0]:
+            mejora = resumen['produccion'][0] / resumen['anterior'][0]
+            self.stdout.write(self.style.SUCCESS(f'Rendimiento con el perfil de producción: x{mejora:.1f}'))
+
+    def medir(self, ruta, configuracion, options):
+        contexto = multiprocessing.get_context('spawn')
+        resultados = contexto.Queue()
+        segundos = options['segundos']
+        # Todos empiezan a la vez, cuando ya arrancaron
+        inicio = time.time() + 2
+        procesos = [
+            contexto.Process(
+                target=_trabajar,
+                args=(ruta, configuracion, inicio, segundos, options['escrituras'], semilla, resultados),
+            )
+            for semilla in range(options['procesos'])
+        ]
+        for proceso in procesos:
+            proceso.start()
+        datos = [resultados.get() for _ in procesos]
+        for proceso in procesos:
+            proceso.join()
+
+        lecturas = sum(d[0] for d in datos)
+        escrituras = sum(d[1] for d in datos)
+        errores = sum(d[2] for d in datos)
+        latencias = sorted(latencia for d in datos for latencia in d[3])
+        p50 = statistics.median(latencias) * 1000 if latencias else 0
+        p99 = latencias[int(len(latencias) * 0.99) - 1] * 1000 if latencias else 0
+        return (lecturas + escrituras) / segundos, lecturas / segundos, escrituras / segundos, errores, p50, p99
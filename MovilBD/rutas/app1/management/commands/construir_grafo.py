@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app1.ruteo import PERFILES, construir_grafos
+
+
+class Command(BaseCommand):
+    help = 'Compila la red vial del extracto OSM en grafos de ruteo (uno por perfil)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--osm', default=None, help=f'Extracto OSM XML (por defecto {settings.RUTEO_OSM_PATH})')
+        parser.add_argument('--perfil', choices=list(PERFILES), action='append', help='Perfil a compilar (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        grafos = construir_grafos(options['osm'], options['perfil'])
+        for nombre, grafo in grafos.items():
+            self.stdout.write(f'{nombre}: {grafo.num_nodos} nodos, {len(grafo.destinos)} aristas, '
+                              f'{len(grafo.landmarks_desde)} landmarks')
+        self.stdout.write(self.style.SUCCESS(f'Grafos compilados en {time.monotonic() - inicio:.1f} s.'))
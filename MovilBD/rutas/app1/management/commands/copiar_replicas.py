@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la base de datos principal (SQLite) a las réplicas de lectura de '
+        'RUTAS_DB_REPLICAS. Sirve para probar app1/replicas.py en local; con otros '
+        'motores se usa la replicación del propio motor'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cada', type=float, help='Repite la copia cada N segundos (simula el retraso de una réplica)')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No hay réplicas: define RUTAS_DB_REPLICAS.')
+        for alias in ['default', *settings.DATABASE_REPLICAS]:
+            if settings.DATABASES[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias} no es SQLite.')
+        while True:
+            inicio = time.perf_counter()
+            self.copiar()
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(settings.DATABASE_REPLICAS)} réplicas copiadas en {time.perf_counter() - inicio:.2f} s.'
+            ))
+            if not options['cada']:
+                break
+            time.sleep(options['cada'])
+
+    def copiar(self):
+        fuente = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                # La API de copia de SQLite escribe en una transacción: quien
+                # lee la réplica ve la copia anterior o la nueva, nunca a medias
+                destino = sqlite3.connect(settings.DATABASES[alias]['NAME'], timeout=30)
+                try:
+                    fuente.backup(destino)
+                finally:
+                    destino.close()
+        finally:
+            fuente.close()
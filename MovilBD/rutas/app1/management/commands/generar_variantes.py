@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app1.imagenes import generar_variantes
+from app1.models import Publicacion
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes (thumb/card/full, WebP y JPEG) de las imágenes de publicaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenera también las que ya tienen variantes')
+
+    def handle(self, *args, **options):
+        publicaciones = Publicacion.objects.exclude(archivo_media='').exclude(archivo_media__isnull=True)
+        if not options['todas']:
+            publicaciones = publicaciones.filter(variantes={})
+        total = 0
+        for publicacion_id in publicaciones.values_list('id', flat=True):
+            try:
+                total += generar_variantes(publicacion_id)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Publicación {publicacion_id}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'{total} publicaciones procesadas.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app1.metricas import recalcular_rutas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula distancia y duración (por tramo y total) de las rutas a partir de sus paradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta_ids', nargs='*', type=int, help='IDs de rutas (por defecto, todas)')
+
+    def handle(self, *args, **options):
+        ruta_ids = options['ruta_ids'] or None
+        actualizadas = recalcular_rutas(ruta_ids)
+        self.stdout.write(self.style.SUCCESS(f'{actualizadas} rutas actualizadas.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app1.contadores import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de guardados (Ruta) y favoritos/pendientes/visitados (Lugar)'
+
+    def handle(self, *args, **options):
+        rutas, lugares = reconciliar_contadores()
+        self.stdout.write(self.style.SUCCESS(f'{rutas} rutas y {lugares} lugares corregidos.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app1 import busqueda
+from app1.models import Evento, Lugar, Ruta
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de texto completo de lugares, rutas y eventos (/api/buscar/)'
+
+    def handle(self, *args, **options):
+        if not busqueda.disponible():
+            raise CommandError('La búsqueda de texto completo solo está disponible con SQLite (FTS5).')
+        total = busqueda.reconstruir({'lugar': Lugar, 'ruta': Ruta, 'evento': Evento})
+        self.stdout.write(self.style.SUCCESS(f'{total} documentos indexados.'))
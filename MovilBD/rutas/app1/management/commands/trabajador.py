@@ -0,0 +1,81 @@
+import signal
+import subprocess
+import sys
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app1.tareas import ejecutar, identificador_trabajador, purgar, reclamar
+
+# Espera inicial cuando la cola está vacía; se duplica hasta --espera
+ESPERA_MINIMA = 0.1
+# Cada cuántas tareas se borran las terminadas antiguas
+PURGAR_CADA = 500
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano de la cola (app1/tareas.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help='Número de procesos trabajadores')
+        parser.add_argument(
+            '--espera', type=float, default=2.0,
+            help='Segundos máximos entre consultas con la cola vacía',
+        )
+        parser.add_argument('--una-vez', action='store_true', help='Vacía la cola y termina')
+
+    def handle(self, *args, **options):
+        if options['procesos'] > 1:
+            return self.supervisar(options)
+        self.trabajar(options['espera'], options['una_vez'])
+
+    def supervisar(self, options):
+        # Procesos independientes (no fork): funciona igual en Windows
+        comando = [sys.executable, sys.argv[0], 'trabajador', '--procesos', '1', '--espera', str(options['espera'])]
+        if options['una_vez']:
+            comando.append('--una-vez')
+        hijos = [subprocess.Popen(comando) for _ in range(options['procesos'])]
+        self.stdout.write(f'{len(hijos)} trabajadores iniciados.')
+        try:
+            codigos = [hijo.wait() for hijo in hijos]
+        except KeyboardInterrupt:
+            for hijo in hijos:
+                hijo.terminate()
+            codigos = [hijo.wait() for hijo in hijos]
+        if any(codigos):
+            self.stderr.write(f'Códigos de salida: {codigos}')
+        else:
+            self.stdout.write(self.style.SUCCESS('Trabajadores detenidos.'))
+
+    def trabajar(self, espera_maxima, una_vez):
+        trabajador = identificador_trabajador()
+        parar = threading.Event()
+
+        def detener(*_):
+            # La tarea en curso termina antes de salir
+            parar.set()
+
+        signal.signal(signal.SIGINT, detener)
+        signal.signal(signal.SIGTERM, detener)
+
+        hechas = fallidas = 0
+        espera = ESPERA_MINIMA
+        while not parar.is_set():
+            close_old_connections()
+            tarea = reclamar(trabajador)
+            if tarea is None:
+                if una_vez:
+                    break
+                parar.wait(espera)
+                espera = min(espera * 2, espera_maxima)
+                continue
+            espera = ESPERA_MINIMA
+            if ejecutar(tarea):
+                hechas += 1
+            else:
+                fallidas += 1
+            if (hechas + fallidas) % PURGAR_CADA == 0:
+                purgar()
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f'{trabajador}: {hechas} tareas hechas, {fallidas} con error.'))
@@ -0,0 +1,177 @@
+"""
+Archivos subidos (MEDIA_ROOT) servidos en producción.
+
+- AlmacenamientoConHuella: guarda cada archivo con el hash de su contenido
+  en el nombre (foto.3f2a9c0d1b4e.jpg). Un nombre nunca cambia de
+  contenido, así que se sirve con `Cache-Control: immutable` y el cliente
+  no vuelve a pedirlo; subir otra foto da otro nombre (y otra URL).
+- servir_medio: con MEDIA_SENDFILE = 'x-sendfile' (Apache, lighttpd) o
+  'x-accel-redirect' (nginx) la vista solo comprueba la ruta y pone las
+  cabeceras; el proxy envía los bytes (y atiende los rangos) sin ocupar un
+  worker. Sin proxy (desarrollo, runserver) los envía Django, con
+  peticiones condicionales y Range para que el vídeo de los reels se pueda
+  adelantar.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+LARGO_HUELLA = 12
+# nombre.<huella>.ext
+_CON_HUELLA = re.compile(rf'\.[0-9a-f]{{{LARGO_HUELLA}}}\.[^./]+$')
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+# Archivos subidos antes de usar huellas: su contenido puede cambiar
+CACHE_SIN_HUELLA = 'public, max-age=3600'
+TAMANO_BLOQUE = 64 * 1024
+
+
+def huella(contenido):
+    sha = hashlib.sha256()
+    for bloque in contenido.chunks():
+        sha.update(bloque)
+    return sha.hexdigest()[:LARGO_HUELLA]
+
+
+class AlmacenamientoConHuella(FileSystemStorage):
+    """
+    FileSystemStorage que añade la huella del contenido al nombre. Si ya
+    existe un archivo con ese nombre tiene el mismo contenido y no se
+    vuelve a escribir.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        raiz, extension = posixpath.splitext(name)
+        sufijo = f'.{huella(content)}{extension}'
+        if max_length and len(raiz) + len(sufijo) > max_length:
+            # Se recorta el nombre original, nunca la huella
+            raiz = raiz[:max(max_length - len(sufijo), 0)]
+        name = f'{raiz}{sufijo}'
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def inmutable(ruta):
+    return bool(_CON_HUELLA.search(ruta))
+
+
+def _rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivos de un único rango `bytes=`; None si hay que
+    enviar el archivo entero; ValueError si no se puede satisfacer.
+    """
+    coincidencia = _RANGO.match(cabecera.strip())
+    if not coincidencia:
+        # Varios rangos o unidades desconocidas: se ignora (RFC 9110 14.2)
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio:
+        if not fin:
+            return None
+        # bytes=-N: los últimos N
+        largo = int(fin)
+        if largo == 0:
+            raise ValueError
+        return max(tamano - largo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        raise ValueError
+    return inicio, fin
+
+
+def _leer(archivo, inicio, largo):
+    with archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+@require_safe
+def servir_medio(request, ruta):
+    try:
+        absoluta = safe_join(settings.MEDIA_ROOT, ruta)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(absoluta) or '\r' in ruta or '\n' in ruta:
+        # Un salto de línea no cabe en X-Sendfile / X-Accel-Redirect
+        raise Http404
+
+    estado = os.stat(absoluta)
+    etag = f'"{int(estado.st_mtime)}-{estado.st_size}"'
+    ultima_modificacion = http_date(estado.st_mtime)
+    cabeceras = {
+        'ETag': etag,
+        'Last-Modified': ultima_modificacion,
+        'Cache-Control': CACHE_INMUTABLE if inmutable(ruta) else CACHE_SIN_HUELLA,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if (if_none_match and etag in if_none_match) or (
+        not if_none_match and if_modified_since and int(estado.st_mtime) <= if_modified_since
+    ):
+        respuesta = HttpResponseNotModified()
+        for nombre, valor in cabeceras.items():
+            respuesta[nombre] = valor
+        return respuesta
+
+    tipo = mimetypes.guess_type(absoluta)[0] or 'application/octet-stream'
+    modo = getattr(settings, 'MEDIA_SENDFILE', '')
+    if modo:
+        # El proxy envía el archivo y atiende Range; Content-Type lo fijamos aquí
+        respuesta = HttpResponse(content_type=tipo)
+        if modo == 'x-accel-redirect':
+            # nginx espera una URI: la ruta va codificada
+            respuesta['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(ruta)
+        else:
+            # Apache y lighttpd esperan la ruta del sistema de archivos tal
+            # cual: sus bytes (UTF-8) viajan en la cabecera como latin-1
+            respuesta['X-Sendfile'] = os.fsencode(absoluta).decode('latin-1')
+    else:
+        rango = None
+        cabecera_rango = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if cabecera_rango and (not if_range or if_range in (etag, ultima_modificacion)):
+            try:
+                rango = _rango(cabecera_rango, estado.st_size)
+            except ValueError:
+                respuesta = HttpResponse(status=416)
+                respuesta['Content-Range'] = f'bytes */{estado.st_size}'
+                return respuesta
+        if rango is None:
+            respuesta = FileResponse(open(absoluta, 'rb'), content_type=tipo)
+        else:
+            inicio, fin = rango
+            largo = fin - inicio + 1
+            respuesta = StreamingHttpResponse(
+                _leer(open(absoluta, 'rb'), inicio, largo), status=206, content_type=tipo
+            )
+            respuesta['Content-Length'] = str(largo)
+            respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{estado.st_size}'
+    for nombre, valor in cabeceras.items():
+        respuesta[nombre] = valor
+    return respuesta
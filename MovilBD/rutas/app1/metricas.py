@@ -0,0 +1,170 @@
+"""
+Motor de métricas de Ruta.
+
+Calcula la distancia y la duración de cada tramo (parada anterior -> parada)
+a partir de las coordenadas de los lugares, en el orden de Ruta_Lugar, y
+guarda los tramos en Ruta_Lugar y los totales en Ruta. Así RutaSerializer
+solo lee columnas ya calculadas.
+
+El trazado sobre la red vial (geometria_ruta) se guarda en caché; la cola de
+tareas lo precalcula con calentar_geometria cuando cambian las paradas.
+"""
+import hashlib
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from . import ruteo
+from .geo import RADIO_TIERRA_KM
+from .sincronizacion import registrar
+from .tareas import encolar_al_confirmar
+from .versiones import tocar
+
+# Velocidad media a pie usada para estimar la duración de los tramos.
+VELOCIDAD_KMH = 4.5
+
+
+def haversine_km(origen, destino):
+    lat1, lon1 = math.radians(origen[0]), math.radians(origen[1])
+    lat2, lon2 = math.radians(destino[0]), math.radians(destino[1])
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def distancias_tramos(coordenadas):
+    """
+    Distancias haversine (km) entre puntos consecutivos de
+    [(lat, lon), ...]; el primer tramo (inicio de la ruta) vale 0.
+    """
+    if not coordenadas:
+        return []
+    return [0.0] + [haversine_km(a, b) for a, b in zip(coordenadas, coordenadas[1:])]
+
+
+def duracion_seg(distancia_km, velocidad_kmh=VELOCIDAD_KMH):
+    return int(round(distancia_km / velocidad_kmh * 3600))
+
+
+def recalcular_rutas(ruta_ids=None):
+    """
+    Recalcula tramos y totales de las rutas indicadas (o de todas).
+    Usa una consulta para leer las paradas y escrituras en bloque, sin
+    disparar señales. Devuelve el número de rutas actualizadas.
+    """
+    from .models import Ruta, Ruta_Lugar
+
+    rutas = Ruta.objects.all()
+    paradas = Ruta_Lugar.objects.select_related('lugar').only(
+        'id', 'ruta_id', 'orden', 'distancia_tramo_km', 'duracion_tramo_seg',
+        'lugar__latitud', 'lugar__longitud',
+    ).order_by('ruta_id', 'orden', 'id')
+    if ruta_ids is not None:
+        rutas = rutas.filter(id__in=ruta_ids)
+        paradas = paradas.filter(ruta_id__in=ruta_ids)
+
+    por_ruta = defaultdict(list)
+    for parada in paradas:
+        por_ruta[parada.ruta_id].append(parada)
+
+    tramos_modificados = []
+    rutas_modificadas = []
+    for ruta in rutas.only('id', 'distanciaEstimadaKm', 'duracionEstimadaSeg'):
+        lista = por_ruta.get(ruta.id, [])
+        distancias = distancias_tramos(
+            [(float(p.lugar.latitud), float(p.lugar.longitud)) for p in lista]
+        )
+        total_km = 0.0
+        total_seg = 0
+        for parada, km in zip(lista, distancias):
+            distancia = Decimal(km).quantize(Decimal('0.001'))
+            segundos = duracion_seg(km)
+            if parada.distancia_tramo_km != distancia or parada.duracion_tramo_seg != segundos:
+                parada.distancia_tramo_km = distancia
+                parada.duracion_tramo_seg = segundos
+                tramos_modificados.append(parada)
+            total_km += km
+            total_seg += segundos
+
+        distancia_total = Decimal(total_km).quantize(Decimal('0.01'))
+        if ruta.distanciaEstimadaKm != distancia_total or ruta.duracionEstimadaSeg != total_seg:
+            ruta.distanciaEstimadaKm = distancia_total
+            ruta.duracionEstimadaSeg = total_seg
+            rutas_modificadas.append(ruta)
+
+    Ruta_Lugar.objects.bulk_update(
+        tramos_modificados, ['distancia_tramo_km', 'duracion_tramo_seg'], batch_size=500
+    )
+    Ruta.objects.bulk_update(
+        rutas_modificadas, ['distanciaEstimadaKm', 'duracionEstimadaSeg'], batch_size=500
+    )
+    # bulk_update no dispara señales
+    if tramos_modificados:
+        tocar('ruta-lugares')
+    if rutas_modificadas:
+        tocar('rutas')
+    registrar('ruta-lugares', [p.id for p in tramos_modificados])
+    registrar('rutas', [r.id for r in rutas_modificadas])
+    return len(rutas_modificadas)
+
+
+def geometria_ruta(ruta_id, perfil=ruteo.PERFIL_POR_DEFECTO):
+    """
+    Trazado de la ruta sobre la red vial con el origen y destino de cada
+    tramo. La clave de caché incluye las paradas y la versión de la red, así
+    que cambiar, quitar o reordenar una parada invalida la geometría guardada.
+    Lanza ruteo.RedVialNoDisponible si no hay extracto OSM y
+    ruteo.GrafoEnConstruccion si su grafo aún no está compilado.
+    """
+    from .models import Ruta_Lugar
+
+    paradas = list(
+        Ruta_Lugar.objects.filter(ruta_id=ruta_id).order_by('orden', 'id')
+        .values_list('lugar_id', 'lugar__latitud', 'lugar__longitud')
+    )
+    huella = hashlib.sha1(repr((ruteo.version_red(), paradas)).encode()).hexdigest()
+    clave = f'ruta-geometria:{ruta_id}:{perfil}:{huella}'
+
+    datos = cache.get(clave)
+    if datos is None:
+        puntos = [(float(lat), float(lon)) for _, lat, lon in paradas]
+        datos = ruteo.trazar(puntos, perfil)
+        for tramo, desde, hasta in zip(datos['tramos'], paradas, paradas[1:]):
+            tramo['desde'] = desde[0]
+            tramo['hasta'] = hasta[0]
+        datos = {'ruta': ruta_id, 'perfil': perfil, **datos}
+        cache.set(clave, datos, timeout=None)
+    return datos
+
+
+def calentar_geometria(ruta_id):
+    """
+    Precalcula la geometría de la ruta en todos los perfiles (tarea en
+    segundo plano). Sin red vial no hay nada que calcular; si el grafo se
+    está compilando la tarea falla y la cola la reintenta más tarde.
+    """
+    from .models import Ruta
+
+    if not Ruta.objects.filter(pk=ruta_id).exists():
+        return
+    for perfil in ruteo.PERFILES:
+        try:
+            geometria_ruta(ruta_id, perfil)
+        except ruteo.GrafoEnConstruccion:
+            raise
+        except ruteo.RedVialNoDisponible:
+            return
+
+
+def encolar_geometria(ruta_id):
+    """
+    Programa calentar_geometria tras el commit. Con un pequeño retraso y una
+    clave por ruta, varias ediciones seguidas de las paradas dan una sola tarea.
+    """
+    encolar_al_confirmar(
+        'calentar_geometria', ruta_id, prioridad=-10, retraso=timedelta(seconds=5),
+        clave=f'geometria:{ruta_id}',
+    )
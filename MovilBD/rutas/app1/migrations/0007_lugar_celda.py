@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:18
+
+import math
+
+from django.db import migrations, models
+
+# Copia de la rejilla de app1/geo.py tal como era al crear la columna: la
+# migración no depende del código actual
+GRID_GRADOS = 0.01
+GRID_COLUMNAS = int(round(360 / GRID_GRADOS))
+
+
+def celda_para(lat, lon):
+    if lat is None or lon is None:
+        return None
+    fila = int(math.floor((float(lat) + 90) / GRID_GRADOS))
+    columna = int(math.floor((float(lon) + 180) / GRID_GRADOS)) % GRID_COLUMNAS
+    return fila * GRID_COLUMNAS + columna
+
+
+def calcular_celdas(apps, schema_editor):
+    Lugar = apps.get_model('app1', 'Lugar')
+    lugares = list(Lugar.objects.only('id', 'latitud', 'longitud'))
+    for lugar in lugares:
+        lugar.celda = celda_para(lugar.latitud, lugar.longitud)
+    Lugar.objects.bulk_update(lugares, ['celda'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0006_comentario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lugar',
+            name='celda',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_celdas, migrations.RunPython.noop),
+    ]
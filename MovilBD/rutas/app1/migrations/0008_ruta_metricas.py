@@ -0,0 +1,90 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:20
+
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Copia de app1/metricas.py (distancias_tramos, duracion_seg) tal como era al
+# crear las columnas: la migración no depende del código actual
+RADIO_TIERRA_KM = 6371.0088
+VELOCIDAD_KMH = 4.5
+
+
+def haversine_km(origen, destino):
+    lat1, lon1 = math.radians(origen[0]), math.radians(origen[1])
+    lat2, lon2 = math.radians(destino[0]), math.radians(destino[1])
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def distancias_tramos(coordenadas):
+    if not coordenadas:
+        return []
+    return [0.0] + [haversine_km(a, b) for a, b in zip(coordenadas, coordenadas[1:])]
+
+
+def duracion_seg(distancia_km):
+    return int(round(distancia_km / VELOCIDAD_KMH * 3600))
+
+
+def calcular_metricas(apps, schema_editor):
+    Ruta = apps.get_model('app1', 'Ruta')
+    Ruta_Lugar = apps.get_model('app1', 'Ruta_Lugar')
+    por_ruta = defaultdict(list)
+    paradas = Ruta_Lugar.objects.select_related('lugar').only(
+        'id', 'ruta_id', 'orden', 'lugar__latitud', 'lugar__longitud',
+    ).order_by('ruta_id', 'orden', 'id')
+    for parada in paradas:
+        por_ruta[parada.ruta_id].append(parada)
+
+    tramos = []
+    rutas = list(Ruta.objects.only('id'))
+    for ruta in rutas:
+        lista = por_ruta.get(ruta.id, [])
+        distancias = distancias_tramos([(float(p.lugar.latitud), float(p.lugar.longitud)) for p in lista])
+        total_km = 0.0
+        total_seg = 0
+        for parada, km in zip(lista, distancias):
+            parada.distancia_tramo_km = Decimal(km).quantize(Decimal('0.001'))
+            parada.duracion_tramo_seg = duracion_seg(km)
+            tramos.append(parada)
+            total_km += km
+            total_seg += parada.duracion_tramo_seg
+        ruta.distanciaEstimadaKm = Decimal(total_km).quantize(Decimal('0.01'))
+        ruta.duracionEstimadaSeg = total_seg
+    Ruta_Lugar.objects.bulk_update(tramos, ['distancia_tramo_km', 'duracion_tramo_seg'], batch_size=500)
+    Ruta.objects.bulk_update(rutas, ['distanciaEstimadaKm', 'duracionEstimadaSeg'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0007_lugar_celda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruta_lugar',
+            name='distancia_tramo_km',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='ruta_lugar',
+            name='duracion_tramo_seg',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='ruta',
+            name='distanciaEstimadaKm',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='ruta',
+            name='duracionEstimadaSeg',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_metricas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Copia de app1.contadores.CAMPOS_FAVORITO al crear las columnas
+CAMPOS_FAVORITO = {
+    'FAV': 'num_favoritos',
+    'PEND': 'num_pendientes',
+    'VISIT': 'num_visitados',
+}
+
+
+def calcular_contadores(apps, schema_editor):
+    Ruta = apps.get_model('app1', 'Ruta')
+    Ruta_Guardada = apps.get_model('app1', 'Ruta_Guardada')
+    Lugar = apps.get_model('app1', 'Lugar')
+    Favorito = apps.get_model('app1', 'Favorito')
+
+    def contar(queryset, campo):
+        return Coalesce(Subquery(
+            queryset.filter(**{campo: OuterRef('pk')}).order_by().values(campo)
+            .annotate(total=Count('id')).values('total')
+        ), 0)
+
+    Ruta.objects.update(num_guardados=contar(Ruta_Guardada.objects.all(), 'ruta'))
+    Lugar.objects.update(**{
+        columna: contar(Favorito.objects.filter(tipo=tipo), 'lugar')
+        for tipo, columna in CAMPOS_FAVORITO.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0008_ruta_metricas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lugar',
+            name='num_favoritos',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lugar',
+            name='num_pendientes',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lugar',
+            name='num_visitados',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='num_guardados',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Copia de app1/busqueda.py al crear el índice: la migración no depende del
+# código actual (tabla, rowid, normalización y documentos)
+TABLA = 'app1_busqueda'
+TIPOS = {'lugar': 1, 'ruta': 2, 'evento': 3}
+
+PALABRAS_VACIAS = frozenset('''
+a al algo ante como con contra cual de del desde donde e el ella ellas ellos
+en entre era es esa ese eso esta este esto estos estas fue ha hay la las le
+les lo los mas me mi mis muy no nos o para pero por que se sin sobre son su
+sus tambien te tu u un una uno unos unas y ya
+'''.split())
+
+_PALABRA = re.compile(r'\w+')
+
+
+def raiz(palabra):
+    if len(palabra) > 4 and palabra.endswith('ces'):
+        return palabra[:-3] + 'z'
+    if len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) > 3 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def normalizar(texto):
+    texto = ''.join(c for c in unicodedata.normalize('NFKD', texto or '') if not unicodedata.combining(c))
+    palabras = _PALABRA.findall(texto.lower())
+    return ' '.join(raiz(p) for p in palabras if len(p) > 1 and p not in PALABRAS_VACIAS)
+
+
+def documento(tipo, objeto):
+    if tipo == 'evento':
+        partes = [objeto.descripcion, objeto.categoriaEvento, objeto.direccionAlternativa]
+    else:
+        partes = [objeto.descripcion]
+        if tipo == 'lugar':
+            partes.append(objeto.direccionCompleta)
+        partes.extend(c.nombre for c in objeto.categorias.all())
+    return normalizar(objeto.nombre), normalizar(' '.join(p for p in partes if p))
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+        "titulo, cuerpo, tokenize='unicode61 remove_diacritics 2')"
+    )
+    filas = []
+    for tipo, modelo in (('lugar', 'Lugar'), ('ruta', 'Ruta'), ('evento', 'Evento')):
+        queryset = apps.get_model('app1', modelo).objects.all()
+        if tipo != 'evento':
+            queryset = queryset.prefetch_related('categorias')
+        for objeto in queryset:
+            filas.append((objeto.pk * 8 + TIPOS[tipo], *documento(tipo, objeto)))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {TABLA} (rowid, titulo, cuerpo) VALUES (%s, %s, %s)', filas)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0010_versionrecurso'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Recursos de app1.sincronizacion.RECURSOS al crear el registro
+RECURSOS = {
+    'categorias': 'Categoria',
+    'lugares': 'Lugar',
+    'rutas': 'Ruta',
+    'ruta-lugares': 'Ruta_Lugar',
+    'eventos': 'Evento',
+}
+
+
+def registrar_catalogo(apps, schema_editor):
+    # Las filas existentes entran en el registro para que since=0 devuelva todo
+    CambioSync = apps.get_model('app1', 'CambioSync')
+    for recurso, modelo in RECURSOS.items():
+        ids = apps.get_model('app1', modelo).objects.order_by('id').values_list('id', flat=True)
+        CambioSync.objects.bulk_create(
+            [CambioSync(recurso=recurso, objeto_id=pk) for pk in ids], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0011_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recurso', models.CharField(max_length=30)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('borrado', models.BooleanField(default=False)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('recurso', 'objeto_id')},
+            },
+        ),
+        migrations.RunPython(registrar_catalogo, migrations.RunPython.noop),
+    ]
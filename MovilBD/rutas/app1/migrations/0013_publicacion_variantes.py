@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_cambiosync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicacion',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def _journal_mode(schema_editor, modo):
+    # Persistente en el archivo: basta con cambiarlo una vez
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'PRAGMA journal_mode={modo}')
+
+
+def activar_wal(apps, schema_editor):
+    _journal_mode(schema_editor, getattr(settings, 'SQLITE_JOURNAL_MODE', 'WAL'))
+
+
+def desactivar_wal(apps, schema_editor):
+    _journal_mode(schema_editor, 'DELETE')
+
+
+class Migration(migrations.Migration):
+    # SQLite no cambia journal_mode dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('app1', '0014_tarea'),
+    ]
+
+    operations = [
+        migrations.RunPython(activar_wal, desactivar_wal),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0015_sqlite_wal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStats',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='version_stats', serialize=False, to='app1.usuario')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
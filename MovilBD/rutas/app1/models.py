@@ -1,4 +1,10 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .contadores import CONTADORES_LUGAR, CONTADORES_RUTA
+from .geo import celda_para
 
 DECIMAL_PRECISION = 10
 DECIMAL_PLACES = 6 
@@ -53,6 +59,18 @@ class Parroquia(models.Model):
         return f"{self.nombre} ({self.canton.nombre})"
 
 
+def _sin_contadores(instancia, kwargs, contadores):
+    """
+    En un save() completo de una fila existente deja fuera los contadores
+    desnormalizados: los mantiene app1/contadores.py con UPDATE atómicos y
+    el valor en memoria puede estar desfasado.
+    """
+    if kwargs.get('update_fields') is None and not instancia._state.adding:
+        kwargs['update_fields'] = [
+            f.name for f in instancia._meta.concrete_fields
+            if not f.primary_key and f.name not in contadores
+        ]
+
 class Lugar(models.Model):
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField()
@@ -75,9 +93,25 @@ class Lugar(models.Model):
 
     categorias = models.ManyToManyField(Categoria, related_name='lugares')
 
+    # Celda de la rejilla espacial (ver app1/geo.py); se recalcula al guardar.
+    celda = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+
+    # Contadores por Favorito.tipo (ver app1/contadores.py)
+    num_favoritos = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    num_pendientes = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    num_visitados = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        _sin_contadores(self, kwargs, CONTADORES_LUGAR)
+        self.celda = celda_para(self.latitud, self.longitud)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'celda'}
+        super().save(*args, **kwargs)
+
 # --- NUEVO: Administrador de Lugar ---
 class AdministradorLugar(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='lugares_administrados')
@@ -92,27 +126,58 @@ class AdministradorLugar(models.Model):
     def __str__(self):
         return f"{self.usuario.username} administra {self.lugar.nombre}"
 
+class RutaQuerySet(models.QuerySet):
+    def con_tiempo_total(self):
+        """
+        Anota tiempo_total_estimado (minutos de trayecto + tiempo sugerido en
+        cada parada) en la misma consulta. La suma de paradas va en una
+        subconsulta para no multiplicar otros agregados del queryset.
+        """
+        tiempo_paradas = Ruta_Lugar.objects.filter(ruta=OuterRef('pk')).order_by().values('ruta').annotate(
+            total=Sum('tiempo_sugerido_minutos')
+        ).values('total')
+        return self.annotate(tiempo_total_estimado=ExpressionWrapper(
+            F('duracionEstimadaSeg') / 60 + Coalesce(Subquery(tiempo_paradas), 0),
+            output_field=models.IntegerField(),
+        ))
+
 class Ruta(models.Model):
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField()
     visibilidadRuta = models.CharField(max_length=50)
     urlImagenPortada = models.CharField(max_length=255, blank=True, null=True)
     fechaCreacion = models.DateTimeField(auto_now_add=True)
-    duracionEstimadaSeg = models.IntegerField()
-    distanciaEstimadaKm = models.DecimalField(max_digits=DECIMAL_PRECISION, decimal_places=2)
+    # Calculados a partir de las paradas por app1/metricas.py
+    duracionEstimadaSeg = models.IntegerField(default=0)
+    distanciaEstimadaKm = models.DecimalField(max_digits=DECIMAL_PRECISION, decimal_places=2, default=0)
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    # Veces que se guardó la ruta (ver app1/contadores.py)
+    num_guardados = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     categorias = models.ManyToManyField(Categoria, related_name='rutas')
 
+    objects = RutaQuerySet.as_manager()
+
     def __str__(self):
         return self.nombre
 
-    # Propiedad para calcular tiempo total incluyendo paradas
+    def save(self, *args, **kwargs):
+        _sin_contadores(self, kwargs, CONTADORES_RUTA)
+        super().save(*args, **kwargs)
+
+    # Propiedad para calcular tiempo total incluyendo paradas.
+    # Si el queryset usó con_tiempo_total() se devuelve el valor anotado.
     @property
     def tiempo_total_estimado(self):
+        if hasattr(self, '_tiempo_total_estimado'):
+            return self._tiempo_total_estimado
         tiempo_paradas = sum(rl.tiempo_sugerido_minutos for rl in self.ruta_lugar_set.all())
         return (self.duracionEstimadaSeg // 60) + tiempo_paradas
 
+    @tiempo_total_estimado.setter
+    def tiempo_total_estimado(self, valor):
+        self._tiempo_total_estimado = valor
+
 class Resena(models.Model):
     texto = models.TextField()
     calificacion = models.IntegerField()
@@ -148,6 +213,8 @@ class Publicacion(models.Model):
     # pero cambiaré a ImageField para que funcione con "upload_to" localmente.
     # Necesitas instalar Pillow: pip install Pillow
     archivo_media = models.ImageField(upload_to='publicaciones/', blank=True, null=True)
+    # Versiones reducidas sin EXIF de archivo_media (ver app1/imagenes.py)
+    variantes = models.JSONField(default=dict, blank=True, editable=False)
     
     descripcion = models.TextField(blank=True, null=True)
     fecha = models.DateTimeField(auto_now_add=True)
@@ -211,6 +278,10 @@ class Ruta_Lugar(models.Model):
     # Comentario o nota sobre la parada
     comentario = models.TextField(blank=True, null=True, help_text="Comentario o nota sobre esta parada en la ruta")
 
+    # Tramo desde la parada anterior (calculado por app1/metricas.py)
+    distancia_tramo_km = models.DecimalField(max_digits=DECIMAL_PRECISION, decimal_places=3, default=0, editable=False)
+    duracion_tramo_seg = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         unique_together = ('ruta', 'lugar')
         ordering = ['orden']
@@ -225,4 +296,82 @@ class Comentario(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Comentario de {self.usuario.username} en {self.publicacion.id}"
\ No newline at end of file
+        return f"Comentario de {self.usuario.username} en {self.publicacion.id}"
+
+
+class VersionRecurso(models.Model):
+    """
+    Sello de versión de un recurso de la API para ETag / Last-Modified
+    (ver app1/versiones.py).
+    """
+    recurso = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modificado = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.recurso} v{self.version}"
+
+class VersionStats(models.Model):
+    """
+    Sello de las estadísticas de un usuario (ver app1/estadisticas.py).
+    """
+    usuario = models.OneToOneField(
+        Usuario, on_delete=models.CASCADE, primary_key=True, related_name='version_stats'
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"stats de {self.usuario_id} v{self.version}"
+
+class CambioSync(models.Model):
+    """
+    Último cambio de cada fila del catálogo para /api/sync/; el id es el
+    token de sincronización (ver app1/sincronizacion.py).
+    """
+    recurso = models.CharField(max_length=30)
+    objeto_id = models.PositiveBigIntegerField()
+    borrado = models.BooleanField(default=False)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('recurso', 'objeto_id')
+
+    def __str__(self):
+        return f"{self.recurso} #{self.objeto_id}{' (borrado)' if self.borrado else ''}"
+
+class Tarea(models.Model):
+    """
+    Tarea de la cola en segundo plano (ver app1/tareas.py).
+    """
+    PENDIENTE = 'PENDIENTE'
+    EN_CURSO = 'EN_CURSO'
+    HECHA = 'HECHA'
+    FALLIDA = 'FALLIDA'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (HECHA, 'Hecha'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=list, blank=True)
+    prioridad = models.SmallIntegerField(default=0)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    # Arriendo: si vence con la tarea en curso, otro trabajador puede reclamarla
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    trabajador = models.CharField(max_length=100, blank=True)
+    # Evita duplicar una tarea pendiente equivalente
+    clave = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['estado', 'prioridad', 'disponible_en'], name='tarea_cola_idx')]
+
+    def __str__(self):
+        return f"{self.nombre}{tuple(self.argumentos)} [{self.estado}]"
@@ -0,0 +1,154 @@
+"""
+Optimizador del orden de visita de las paradas de una Ruta.
+
+Trata la ruta como un camino abierto (no vuelve al inicio) sobre la matriz
+de distancias haversine entre paradas. Construye una solución con el vecino
+más cercano y la mejora con 2-opt y Or-opt hasta que ningún movimiento
+reduce la distancia. El inicio y el fin pueden quedar fijos.
+
+Convención: un extremo libre se modela como una arista de coste 0 hacia
+"fuera" del camino (posiciones -1 y n), así los mismos deltas sirven para
+caminos con o sin extremos fijos.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from .metricas import haversine_km
+
+EPSILON = 1e-9
+
+
+def matriz_distancias(coordenadas):
+    """
+    Matriz simétrica de distancias (km) entre [(lat, lon), ...], cacheada
+    por el conjunto de coordenadas.
+    """
+    clave = 'ruta-matriz:' + hashlib.sha1(repr(coordenadas).encode()).hexdigest()
+    matriz = cache.get(clave)
+    if matriz is None:
+        n = len(coordenadas)
+        matriz = [[0.0] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(i + 1, n):
+                matriz[i][j] = matriz[j][i] = haversine_km(coordenadas[i], coordenadas[j])
+        cache.set(clave, matriz, timeout=60 * 60)
+    return matriz
+
+
+def longitud(camino, d):
+    return sum(d[a][b] for a, b in zip(camino, camino[1:]))
+
+
+def _vecino_mas_cercano(d, inicio, fin, nodos):
+    libres = [v for v in nodos if v != inicio and v != fin]
+    camino = [inicio]
+    while libres:
+        ultimo = camino[-1]
+        siguiente = min(libres, key=lambda v: d[ultimo][v])
+        libres.remove(siguiente)
+        camino.append(siguiente)
+    if fin is not None and fin != inicio:
+        camino.append(fin)
+    return camino
+
+
+def _construir(d, inicio, fin):
+    nodos = range(len(d))
+    if inicio is not None:
+        return _vecino_mas_cercano(d, inicio, fin, nodos)
+    # Inicio libre: se prueba el vecino más cercano desde cada parada
+    candidatos = (_vecino_mas_cercano(d, s, fin, nodos) for s in nodos if s != fin)
+    return min(candidatos, key=lambda c: longitud(c, d))
+
+
+def _coste(d, camino, a, b):
+    """
+    Coste de la arista entre las posiciones a y b; 0 si alguna cae fuera.
+    """
+    if a < 0 or b < 0 or a >= len(camino) or b >= len(camino):
+        return 0.0
+    return d[camino[a]][camino[b]]
+
+
+def _dos_opt(d, camino, primero, ultimo):
+    """
+    Invierte tramos camino[i..j] mientras acorten el recorrido.
+    """
+    mejora = False
+    hubo_cambio = True
+    while hubo_cambio:
+        hubo_cambio = False
+        for i in range(primero, ultimo):
+            for j in range(i + 1, ultimo + 1):
+                # Aristas nuevas: camino[i-1] -> camino[j] y camino[i] -> camino[j+1]
+                delta = (_coste(d, camino, i - 1, j) + _coste(d, camino, i, j + 1)
+                         - _coste(d, camino, i - 1, i) - _coste(d, camino, j, j + 1))
+                if delta < -EPSILON:
+                    camino[i:j + 1] = reversed(camino[i:j + 1])
+                    hubo_cambio = mejora = True
+    return mejora
+
+
+def _or_opt(d, camino, primero, ultimo):
+    """
+    Mueve segmentos de 1 a 3 paradas (opcionalmente invertidos) a la
+    posición donde más acortan el recorrido.
+    """
+    mejora = False
+    hubo_cambio = True
+    while hubo_cambio:
+        hubo_cambio = False
+        for largo in (1, 2, 3):
+            for i in range(primero, ultimo - largo + 2):
+                j = i + largo - 1
+                segmento = camino[i:j + 1]
+                resto = camino[:i] + camino[j + 1:]
+                quitado = (_coste(d, camino, i - 1, i) + _coste(d, camino, j, j + 1)
+                           - _coste(d, camino, i - 1, j + 1))
+                mejor = None
+                # Posiciones de inserción dentro de los límites movibles
+                for k in range(primero, ultimo - largo + 2):
+                    if k == i:
+                        continue
+                    for seg in (segmento, segmento[::-1]):
+                        antes = resto[k - 1] if k - 1 >= 0 else None
+                        despues = resto[k] if k < len(resto) else None
+                        agregado = ((d[antes][seg[0]] if antes is not None else 0.0)
+                                    + (d[seg[-1]][despues] if despues is not None else 0.0)
+                                    - (d[antes][despues] if antes is not None and despues is not None else 0.0))
+                        delta = agregado - quitado
+                        if delta < -EPSILON and (mejor is None or delta < mejor[0]):
+                            mejor = (delta, k, seg)
+                if mejor is not None:
+                    _, k, seg = mejor
+                    camino[:] = resto[:k] + seg + resto[k:]
+                    hubo_cambio = mejora = True
+                    break
+            if hubo_cambio:
+                break
+    return mejora
+
+
+def optimizar_orden(d, inicio=None, fin=None):
+    """
+    Devuelve el orden (lista de índices de la matriz d) que minimiza la
+    distancia del camino. `inicio` y `fin` son índices fijos opcionales.
+    """
+    n = len(d)
+    if n <= 2:
+        camino = list(range(n))
+        if n == 2 and (inicio == 1 or fin == 0):
+            camino.reverse()
+        return camino
+
+    camino = _construir(d, inicio, fin)
+    # Rango de posiciones que se pueden mover
+    primero = 1 if inicio is not None else 0
+    ultimo = n - 2 if fin is not None else n - 1
+    while True:
+        mejora = _dos_opt(d, camino, primero, ultimo)
+        mejora = _or_opt(d, camino, primero, ultimo) or mejora
+        if not mejora:
+            break
+    return camino
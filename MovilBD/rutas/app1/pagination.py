@@ -0,0 +1,149 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime, time
+from decimal import Decimal
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _a_json(valor):
+    # Sin perder precisión: DjangoJSONEncoder recorta los microsegundos
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f'No se puede guardar {type(valor).__name__} en el cursor')
+
+
+def _despues_de(orden, posicion):
+    """
+    Filas que van después de `posicion` (valores de los campos de `orden`):
+    (a > x) OR (a = x AND b > y) OR ..., con < en los campos descendentes.
+    """
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, posicion):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+class OrdenCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para todos los listados de la API.
+
+    Cada ViewSet declara su orden en `cursor_ordering`, terminado en id para
+    que sea único. El cursor guarda los valores de todos esos campos en el
+    último elemento y la página siguiente se filtra con
+    (orden > v) OR (orden = v AND id > último_id): pedir la página N cuesta lo
+    mismo que pedir la primera y no se usa OFFSET, aunque el primer campo
+    tenga muchos empates (contadores, orden de parada).
+    Ej: /api/lugares/?page_size=20 -> {"next": ..., "previous": ..., "results": [...]}
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, posicion = (False, None) if self.cursor is None else (self.cursor.reverse, self.cursor.position)
+
+        orden = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*orden)
+        if posicion is not None:
+            queryset = queryset.filter(_despues_de(orden, posicion))
+
+        # Uno de más para saber si hay otra página en ese sentido
+        try:
+            resultados = list(queryset[:self.page_size + 1])
+        except DjangoValidationError:
+            # Valor del cursor que no encaja con el campo (cursor manipulado)
+            raise NotFound(self.invalid_cursor_message)
+        self.page = resultados[:self.page_size]
+        hay_mas = len(resultados) > len(self.page)
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = posicion is not None
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = posicion is not None
+        # Con la página vacía no hay elemento de referencia: el vecino es la
+        # primera (o la última) página, sin posición
+        self.next_position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else None
+        self.previous_position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.next_position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            posicion = tokens.get('p', [None])[0]
+            if posicion is not None:
+                posicion = json.loads(posicion)
+                if not isinstance(posicion, list) or len(posicion) != len(self.ordering):
+                    raise ValueError
+                if not all(isinstance(valor, (str, int, float)) for valor in posicion):
+                    raise ValueError
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=posicion)
+
+    def encode_cursor(self, cursor):
+        tokens = {}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.position is not None:
+            tokens['p'] = json.dumps(cursor.position, default=_a_json, separators=(',', ':'))
+        encoded = b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return [
+            instance[campo.lstrip('-')] if isinstance(instance, dict) else getattr(instance, campo.lstrip('-'))
+            for campo in ordering
+        ]
@@ -0,0 +1,175 @@
+"""
+Réplicas de lectura.
+
+Con settings.DATABASE_REPLICAS (variable RUTAS_DB_REPLICAS) las lecturas de
+las peticiones GET van a una réplica elegida al azar para toda la petición
+(así todas sus consultas ven el mismo estado) y las escrituras a 'default'.
+Añadir réplicas reparte los GET (la mayoría del tráfico: catálogo, rutas,
+feed) entre más bases de datos. Sin réplicas el router no interviene.
+
+Siguen leyendo de 'default':
+- las peticiones que escriben (POST/PUT/PATCH/DELETE);
+- las peticiones de un cliente que escribió hace menos de
+  REPLICA_PEGAJOSO_SEG, para que vea sus propios cambios aunque la réplica
+  vaya con retraso. El cliente se reconoce por una cookie o, con token, por
+  su id (marca en la caché 'default'). La app móvil no guarda la cookie, así
+  que la marca debe verla cualquier worker: con réplicas, la comprobación
+  app1.E001 exige RUTAS_CACHE=file o redis;
+- lo que se lee dentro de una transacción sobre 'default';
+- todo lo que corre fuera de una petición (comandos, `trabajador`, shell):
+  suelen leer para luego escribir.
+
+El middleware funciona igual con WSGI y con ASGI (app1/asincrono.py): la
+réplica elegida pasa a los hilos del ORM con el contexto de la petición.
+
+Para probarlo en local con SQLite: RUTAS_DB_REPLICAS=replica1.sqlite3 y
+`manage.py copiar_replicas --cada 5` copia 'default' a las réplicas.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from .autenticacion import verificar_acceso
+
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+COOKIE = 'rutas_escritura'
+
+# Réplica de la petición en curso; solo ReplicaMiddleware la fija
+_replica = ContextVar('replica', default=None)
+
+# Cachés que no comparten sus entradas entre procesos
+CACHES_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _pegajoso_seg():
+    return getattr(settings, 'REPLICA_PEGAJOSO_SEG', 10)
+
+
+@checks.register(checks.Tags.caches)
+def comprobar_cache_compartida(app_configs, **kwargs):
+    """
+    Con réplicas, la marca de escritura de los clientes con token va en la
+    caché 'default': si cada proceso tiene la suya, el siguiente GET puede
+    caer en otro worker, ir a la réplica y no ver la escritura.
+    """
+    if not getattr(settings, 'DATABASE_REPLICAS', ()):
+        return []
+    if settings.CACHES['default']['BACKEND'] in CACHES_LOCALES:
+        return [checks.Error(
+            "DATABASE_REPLICAS necesita una caché 'default' compartida entre procesos.",
+            hint='Usa RUTAS_CACHE=file o RUTAS_CACHE=redis.',
+            id='app1.E001',
+        )]
+    return []
+
+
+class ReplicasRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas son copias de la misma base de datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas se copian del primario, no se migran
+        return db == DEFAULT_DB_ALIAS
+
+
+def _usuario_id(request):
+    partes = request.headers.get('Authorization', '').split()
+    if len(partes) != 2 or partes[0].lower() != 'bearer':
+        return None
+    try:
+        return verificar_acceso(partes[1]).id
+    except AuthenticationFailed:
+        return None
+
+
+def _clave(usuario_id):
+    return f'replica-escritura:{usuario_id}'
+
+
+class ReplicaMiddleware:
+    """
+    Decide si la petición lee del primario (ver el docstring del módulo) y
+    marca al cliente tras una escritura correcta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if not replicas:
+            return self.get_response(request)
+
+        escritura = request.method not in METODOS_LECTURA
+        usuario_id = _usuario_id(request)
+        marcado = usuario_id is not None and cache.get(_clave(usuario_id)) is not None
+        token = _replica.set(_elegir(request, replicas, escritura, marcado))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        if escritura and response.status_code < 400:
+            segundos = _marcar(response)
+            if usuario_id is not None:
+                cache.set(_clave(usuario_id), True, timeout=segundos)
+        return response
+
+    async def __acall__(self, request):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if not replicas:
+            return await self.get_response(request)
+
+        escritura = request.method not in METODOS_LECTURA
+        usuario_id = _usuario_id(request)
+        marcado = usuario_id is not None and await cache.aget(_clave(usuario_id)) is not None
+        token = _replica.set(_elegir(request, replicas, escritura, marcado))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        if escritura and response.status_code < 400:
+            segundos = _marcar(response)
+            if usuario_id is not None:
+                await cache.aset(_clave(usuario_id), True, timeout=segundos)
+        return response
+
+
+def _elegir(request, replicas, escritura, marcado):
+    # None: la petición lee del primario
+    if escritura or marcado or COOKIE in request.COOKIES:
+        return None
+    return random.choice(replicas)
+
+
+def _marcar(response):
+    segundos = _pegajoso_seg()
+    response.set_cookie(COOKIE, '1', max_age=segundos, httponly=True, samesite='Lax')
+    return segundos
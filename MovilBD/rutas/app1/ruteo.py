@@ -0,0 +1,522 @@
+"""
+Motor de ruteo offline sobre la red vial de OpenStreetMap.
+
+Lee un extracto OSM XML de la provincia (settings.RUTEO_OSM_PATH) y construye
+por cada perfil ('walking', 'driving') un grafo compacto en formato CSR
+(arrays de offsets/destinos/pesos). Las consultas usan A* con landmarks (ALT):
+para unos pocos nodos de referencia se precalculan las distancias desde y
+hacia todos los nodos, lo que da una cota inferior mucho mejor que la línea
+recta y reduce los nodos explorados.
+
+El grafo compilado se guarda con pickle junto al extracto y se reutiliza
+mientras el archivo OSM no cambie (ver `manage.py construir_grafo`). Las
+peticiones web nunca lo compilan: lo hace la tarea `construir_grafo`.
+"""
+import heapq
+import math
+import os
+import pickle
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+
+from django.conf import settings
+
+from .geo import RADIO_TIERRA_KM
+from .tareas import encolar
+
+# Velocidades en km/h por tipo de vía. Las vías que no aparecen no se usan.
+PERFILES = {
+    'walking': {
+        'velocidades': {
+            'trunk': 4.5, 'trunk_link': 4.5, 'primary': 4.5, 'primary_link': 4.5,
+            'secondary': 4.5, 'secondary_link': 4.5, 'tertiary': 4.5, 'tertiary_link': 4.5,
+            'unclassified': 4.5, 'residential': 4.5, 'living_street': 4.5, 'service': 4.5,
+            'pedestrian': 4.5, 'footway': 4.5, 'path': 4, 'track': 4,
+            'steps': 2.5, 'cycleway': 4.5, 'bridleway': 4,
+        },
+        'acceso': ('foot', 'access'),
+        'sentido_unico': False,
+    },
+    'driving': {
+        'velocidades': {
+            'motorway': 90, 'motorway_link': 45, 'trunk': 80, 'trunk_link': 40,
+            'primary': 60, 'primary_link': 30, 'secondary': 50, 'secondary_link': 25,
+            'tertiary': 40, 'tertiary_link': 20, 'unclassified': 30, 'residential': 25,
+            'living_street': 10, 'service': 15, 'track': 15,
+        },
+        'acceso': ('motor_vehicle', 'motorcar', 'vehicle', 'access'),
+        'sentido_unico': True,
+    },
+}
+PERFIL_POR_DEFECTO = 'walking'
+
+NUM_LANDMARKS = 8
+GRID_NODOS = 0.005  # ~550 m, para buscar el nodo más cercano a una parada
+RADIO_SNAP_KM = 2.0
+
+_ACCESO_PROHIBIDO = {'no', 'private'}
+_VERSION_FORMATO = 2
+
+
+class RedVialNoDisponible(Exception):
+    pass
+
+
+class GrafoEnConstruccion(RedVialNoDisponible):
+    """
+    El extracto existe pero su grafo aún no está compilado: la cola de
+    tareas lo está construyendo.
+    """
+    reintentar_en = 30
+
+
+def distancia_m(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * 1000 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def codificar_polyline(puntos, precision=5):
+    """
+    Codifica [(lat, lon), ...] con el algoritmo "Encoded Polyline" de Google.
+    """
+    factor = 10 ** precision
+    salida = []
+    prev_lat = prev_lon = 0
+    for lat, lon in puntos:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            valor = ~(delta << 1) if delta < 0 else delta << 1
+            while valor >= 0x20:
+                salida.append(chr((0x20 | (valor & 0x1f)) + 63))
+                valor >>= 5
+            salida.append(chr(valor + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return ''.join(salida)
+
+
+# --- Lectura del extracto OSM ---
+
+def _leer_vias(ruta_osm):
+    """
+    Primera pasada: vías con etiqueta highway -> [(refs, tags), ...].
+    """
+    vias = []
+    refs, tags = [], {}
+    contexto = ET.iterparse(ruta_osm, events=('start', 'end'))
+    _, raiz = next(contexto)
+    for evento, elem in contexto:
+        if evento == 'start':
+            if elem.tag == 'way':
+                refs, tags = [], {}
+            continue
+        if elem.tag == 'nd':
+            refs.append(int(elem.get('ref')))
+        elif elem.tag == 'tag':
+            tags[elem.get('k')] = elem.get('v')
+        elif elem.tag == 'way':
+            if 'highway' in tags and len(refs) > 1:
+                vias.append((refs, tags))
+            # Vaciar el elemento no basta: la raíz sigue guardando cada hijo
+            raiz.clear()
+        elif elem.tag in ('node', 'relation'):
+            raiz.clear()
+    return vias
+
+
+def _leer_nodos(ruta_osm, necesarios):
+    """
+    Segunda pasada: coordenadas solo de los nodos usados por las vías.
+    """
+    coords = {}
+    contexto = ET.iterparse(ruta_osm, events=('start', 'end'))
+    _, raiz = next(contexto)
+    for evento, elem in contexto:
+        if evento != 'end':
+            continue
+        if elem.tag == 'node':
+            nodo_id = int(elem.get('id'))
+            if nodo_id in necesarios:
+                coords[nodo_id] = (float(elem.get('lat')), float(elem.get('lon')))
+            raiz.clear()
+        elif elem.tag in ('way', 'relation'):
+            raiz.clear()
+    return coords
+
+
+def _sentido(tags, perfil):
+    """
+    1 = solo hacia adelante, -1 = solo en reversa, 0 = ambos sentidos.
+    """
+    if not perfil['sentido_unico']:
+        return 0
+    oneway = tags.get('oneway', '')
+    if oneway in ('yes', 'true', '1'):
+        return 1
+    if oneway == '-1':
+        return -1
+    if tags.get('junction') in ('roundabout', 'circular') and oneway != 'no':
+        return 1
+    if tags.get('highway') == 'motorway' and oneway != 'no':
+        return 1
+    return 0
+
+
+def _permitida(tags, perfil):
+    if tags.get('highway') not in perfil['velocidades']:
+        return False
+    for clave in perfil['acceso']:
+        if clave in tags:
+            return tags[clave] not in _ACCESO_PROHIBIDO
+    return tags.get('area') != 'yes'
+
+
+class Grafo:
+    """
+    Grafo dirigido compacto (CSR) de un perfil, con tablas ALT.
+    """
+
+    def __init__(self, lat, lon, offsets, destinos, tiempos, metros):
+        self.lat = lat
+        self.lon = lon
+        self.offsets = offsets
+        self.destinos = destinos
+        self.tiempos = tiempos  # segundos por arista
+        self.metros = metros
+        self.velocidad_max = 1.0
+        self.landmarks_desde = []  # d(L, v)
+        self.landmarks_hacia = []  # d(v, L)
+        self._celdas = None
+
+    @property
+    def num_nodos(self):
+        return len(self.lat)
+
+    @classmethod
+    def construir(cls, vias, coords, perfil):
+        indice = {}
+        lat, lon = array('d'), array('d')
+        aristas = []  # (origen, destino, segundos, metros)
+        velocidad_max = 0.0
+
+        def nodo(osm_id):
+            idx = indice.get(osm_id)
+            if idx is None:
+                idx = indice[osm_id] = len(lat)
+                lat.append(coords[osm_id][0])
+                lon.append(coords[osm_id][1])
+            return idx
+
+        for refs, tags in vias:
+            if not _permitida(tags, perfil):
+                continue
+            refs = [r for r in refs if r in coords]
+            kmh = perfil['velocidades'][tags['highway']]
+            velocidad_max = max(velocidad_max, kmh)
+            mps = kmh / 3.6
+            sentido = _sentido(tags, perfil)
+            for a, b in zip(refs, refs[1:]):
+                u, v = nodo(a), nodo(b)
+                metros = distancia_m(lat[u], lon[u], lat[v], lon[v])
+                segundos = metros / mps
+                if sentido >= 0:
+                    aristas.append((u, v, segundos, metros))
+                if sentido <= 0:
+                    aristas.append((v, u, segundos, metros))
+
+        aristas.sort()
+        offsets = array('l', [0] * (len(lat) + 1))
+        for u, _, _, _ in aristas:
+            offsets[u + 1] += 1
+        for i in range(len(lat)):
+            offsets[i + 1] += offsets[i]
+        grafo = cls(
+            lat, lon, offsets,
+            array('l', (a[1] for a in aristas)),
+            array('f', (a[2] for a in aristas)),
+            array('f', (a[3] for a in aristas)),
+        )
+        grafo.velocidad_max = (velocidad_max or 1.0) / 3.6
+        return grafo
+
+    def invertido(self):
+        """
+        Arrays CSR del grafo con las aristas invertidas (para d(v, L)).
+        """
+        aristas = []
+        for u in range(self.num_nodos):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                aristas.append((self.destinos[i], u, self.tiempos[i]))
+        aristas.sort()
+        offsets = array('l', [0] * (self.num_nodos + 1))
+        for v, _, _ in aristas:
+            offsets[v + 1] += 1
+        for i in range(self.num_nodos):
+            offsets[i + 1] += offsets[i]
+        return offsets, array('l', (a[1] for a in aristas)), array('f', (a[2] for a in aristas))
+
+    # --- Preprocesamiento ALT ---
+
+    def _dijkstra_completo(self, origen, offsets, destinos, pesos):
+        # Doble precisión, como las sumas de A*: con tablas en float32 el
+        # redondeo podía sobrestimar la cota y perder el camino óptimo
+        dist = array('d', [math.inf]) * self.num_nodos
+        dist[origen] = 0.0
+        cola = [(0.0, origen)]
+        while cola:
+            d, u = heapq.heappop(cola)
+            if d > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = destinos[i]
+                nd = d + pesos[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(cola, (nd, v))
+        return dist
+
+    def preparar_landmarks(self, cantidad=NUM_LANDMARKS):
+        """
+        Elige landmarks por el criterio del "más lejano" y precalcula las
+        distancias desde y hacia cada uno.
+        """
+        if not self.num_nodos:
+            return
+        inv = self.invertido()
+        self.landmarks_desde, self.landmarks_hacia = [], []
+        actual = 0
+        minimo = array('d', [math.inf]) * self.num_nodos
+        for _ in range(min(cantidad, self.num_nodos)):
+            desde = self._dijkstra_completo(actual, self.offsets, self.destinos, self.tiempos)
+            hacia = self._dijkstra_completo(actual, *inv)
+            self.landmarks_desde.append(desde)
+            self.landmarks_hacia.append(hacia)
+            # El siguiente landmark es el nodo alcanzable más alejado de los elegidos
+            mejor, actual = -1.0, None
+            for v in range(self.num_nodos):
+                if desde[v] < minimo[v]:
+                    minimo[v] = desde[v]
+                if minimo[v] != math.inf and minimo[v] > mejor:
+                    mejor, actual = minimo[v], v
+            if actual is None or mejor <= 0:
+                break
+
+    # --- Consultas ---
+
+    def _heuristica(self, v, t):
+        h = distancia_m(self.lat[v], self.lon[v], self.lat[t], self.lon[t]) / self.velocidad_max
+        for desde, hacia in zip(self.landmarks_desde, self.landmarks_hacia):
+            # Desigualdad triangular: d(v,t) >= d(L,t) - d(L,v) y d(v,t) >= d(v,L) - d(t,L)
+            if desde[t] != math.inf and desde[v] != math.inf:
+                h = max(h, desde[t] - desde[v])
+            if hacia[v] != math.inf and hacia[t] != math.inf:
+                h = max(h, hacia[v] - hacia[t])
+        return h
+
+    def camino(self, s, t):
+        """
+        A* (ALT) de s a t. Devuelve (nodos, segundos, metros) o None.
+        """
+        if s == t:
+            return [s], 0.0, 0.0
+        g = {s: 0.0}
+        previo = {s: (-1, 0.0)}
+        cola = [(self._heuristica(s, t), 0.0, s)]
+        cerrados = set()
+        while cola:
+            _, d, u = heapq.heappop(cola)
+            if u == t:
+                break
+            if u in cerrados:
+                continue
+            cerrados.add(u)
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.destinos[i]
+                nd = d + self.tiempos[i]
+                if nd < g.get(v, math.inf):
+                    g[v] = nd
+                    previo[v] = (u, self.metros[i])
+                    heapq.heappush(cola, (nd + self._heuristica(v, t), nd, v))
+        else:
+            return None
+        nodos, metros = [t], 0.0
+        while nodos[-1] != s:
+            u, m = previo[nodos[-1]]
+            metros += m
+            nodos.append(u)
+        nodos.reverse()
+        return nodos, g[t], metros
+
+    def nodo_cercano(self, lat, lon, radio_km=RADIO_SNAP_KM):
+        """
+        Nodo más cercano a (lat, lon) dentro de radio_km, usando una rejilla.
+        """
+        if self._celdas is None:
+            celdas = {}
+            for i in range(self.num_nodos):
+                if self.offsets[i] == self.offsets[i + 1]:
+                    continue  # sin aristas de salida: no sirve como origen
+                clave = (int(self.lat[i] // GRID_NODOS), int(self.lon[i] // GRID_NODOS))
+                celdas.setdefault(clave, []).append(i)
+            self._celdas = celdas
+        fila, col = int(lat // GRID_NODOS), int(lon // GRID_NODOS)
+        # Lado más corto de la celda en metros (las columnas se estrechan con la latitud)
+        lado_m = GRID_NODOS * 111320 * max(math.cos(math.radians(lat)), 0.01)
+        anillos = int(math.ceil(radio_km * 1000 / lado_m)) + 1
+        mejor, mejor_d = None, radio_km * 1000
+        for r in range(anillos + 1):
+            for df in range(-r, r + 1):
+                for dc in range(-r, r + 1):
+                    if max(abs(df), abs(dc)) != r:
+                        continue
+                    for i in self._celdas.get((fila + df, col + dc), ()):
+                        d = distancia_m(lat, lon, self.lat[i], self.lon[i])
+                        if d < mejor_d:
+                            mejor, mejor_d = i, d
+            # Los nodos del anillo r + 1 están al menos a r * lado_m
+            if mejor is not None and r * lado_m >= mejor_d:
+                break
+        return mejor
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_celdas'] = None
+        return estado
+
+
+# --- Carga y caché de grafos ---
+
+_grafos = {}
+_lock = threading.Lock()
+
+
+def _ruta_cache(ruta_osm, perfil):
+    return f'{ruta_osm}.{perfil}.grafo'
+
+
+def construir_grafos(ruta_osm=None, perfiles=None):
+    """
+    Construye y guarda en disco los grafos de los perfiles indicados.
+    """
+    ruta_osm = str(ruta_osm or settings.RUTEO_OSM_PATH)
+    perfiles = perfiles or list(PERFILES)
+    vias = _leer_vias(ruta_osm)
+    coords = _leer_nodos(ruta_osm, {r for refs, _ in vias for r in refs})
+    mtime = os.path.getmtime(ruta_osm)
+    grafos = {}
+    for nombre in perfiles:
+        grafo = Grafo.construir(vias, coords, PERFILES[nombre])
+        grafo.preparar_landmarks()
+        with open(_ruta_cache(ruta_osm, nombre), 'wb') as f:
+            pickle.dump((_VERSION_FORMATO, mtime, grafo), f, protocol=pickle.HIGHEST_PROTOCOL)
+        grafos[nombre] = grafo
+    with _lock:
+        for nombre, grafo in grafos.items():
+            _grafos[nombre] = (mtime, grafo)
+    return grafos
+
+
+def _extracto():
+    ruta_osm = str(settings.RUTEO_OSM_PATH)
+    try:
+        return ruta_osm, os.path.getmtime(ruta_osm)
+    except OSError:
+        raise RedVialNoDisponible(f'No existe el extracto OSM {ruta_osm}')
+
+
+def _cargar(ruta_osm, mtime, perfil):
+    """
+    Grafo del perfil ya compilado para esta versión del extracto (en memoria
+    o en disco), o None.
+    """
+    with _lock:
+        cargado = _grafos.get(perfil)
+        if cargado and cargado[0] == mtime:
+            return cargado[1]
+        try:
+            with open(_ruta_cache(ruta_osm, perfil), 'rb') as f:
+                version, mtime_cache, grafo = pickle.load(f)
+            if version == _VERSION_FORMATO and mtime_cache == mtime:
+                _grafos[perfil] = (mtime, grafo)
+                return grafo
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+    return None
+
+
+def obtener_grafo(perfil=PERFIL_POR_DEFECTO):
+    """
+    Grafo del perfil, cargado una vez por proceso. Compilarlo tarda minutos,
+    así que nunca se hace aquí (dentro de una petición): si falta o el
+    extracto OSM cambió se encola `construir_grafo` y se lanza
+    GrafoEnConstruccion.
+    """
+    ruta_osm, mtime = _extracto()
+    grafo = _cargar(ruta_osm, mtime, perfil)
+    if grafo is None:
+        # La clave evita encolar una compilación por cada petición
+        encolar('construir_grafo', perfil, clave=f'grafo:{perfil}')
+        raise GrafoEnConstruccion(f'Compilando la red vial ({perfil}); inténtalo en unos segundos')
+    return grafo
+
+
+def preparar_grafo(perfil=PERFIL_POR_DEFECTO):
+    """
+    Tarea `construir_grafo`: compila el grafo del perfil si el de disco no
+    está al día (otra tarea pudo compilarlo mientras esta esperaba).
+    """
+    ruta_osm, mtime = _extracto()
+    if _cargar(ruta_osm, mtime, perfil) is None:
+        construir_grafos(ruta_osm, [perfil])
+
+
+def version_red():
+    """
+    Identifica la versión del extracto OSM (para claves de caché).
+    """
+    try:
+        return int(os.path.getmtime(settings.RUTEO_OSM_PATH))
+    except OSError:
+        return 0
+
+
+def trazar(puntos, perfil=PERFIL_POR_DEFECTO):
+    """
+    Traza la ruta que pasa por [(lat, lon), ...] en orden.
+    Devuelve la polyline codificada, totales y un resumen por tramo. Si un
+    tramo no tiene camino en la red se dibuja en línea recta y se marca
+    como aproximado.
+    """
+    grafo = obtener_grafo(perfil)
+    velocidad_recta = min(PERFILES[perfil]['velocidades'].values()) / 3.6
+    nodos = [grafo.nodo_cercano(lat, lon) for lat, lon in puntos]
+
+    geometria = list(puntos[:1])
+    tramos = []
+    for i in range(1, len(puntos)):
+        s, t = nodos[i - 1], nodos[i]
+        resultado = grafo.camino(s, t) if s is not None and t is not None else None
+        if resultado is None:
+            metros = distancia_m(*puntos[i - 1], *puntos[i])
+            segundos = metros / velocidad_recta
+            geometria.append(puntos[i])
+            aproximado = True
+        else:
+            camino, segundos, metros = resultado
+            geometria.extend((grafo.lat[n], grafo.lon[n]) for n in camino)
+            geometria.append(puntos[i])
+            aproximado = False
+        tramos.append({
+            'distancia_m': round(metros, 1),
+            'duracion_seg': int(round(segundos)),
+            'aproximado': aproximado,
+        })
+
+    return {
+        'polyline': codificar_polyline(geometria),
+        'distancia_m': round(sum(t['distancia_m'] for t in tramos), 1),
+        'duracion_seg': sum(t['duracion_seg'] for t in tramos),
+        'tramos': tramos,
+    }
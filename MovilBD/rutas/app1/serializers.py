@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from .campos import CamposDinamicosSerializer
+from .imagenes import VARIANTES
 from .models import (
     Usuario, Resena, Categoria, Lugar, 
     Favorito, Evento, Ruta, Ruta_Guardada, Ruta_Lugar,
@@ -8,7 +11,7 @@ from .models import (
 
 # --- Serializadores Base ---
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosSerializer):
     class Meta:
         model = Usuario
         fields = ['id', 'username', 'email', 'nombreDisplay', 'varFoto', 'fechaCreacion', 'password']
@@ -23,14 +26,14 @@ class UsuarioSerializer(serializers.ModelSerializer):
         usuario.save()
         return usuario
 
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(CamposDinamicosSerializer):
     class Meta:
         model = Categoria
         fields = '__all__'
 
 # --- Serializadores con Relaciones ---
 
-class LugarSerializer(serializers.ModelSerializer):
+class LugarSerializer(CamposDinamicosSerializer):
     categorias = CategoriaSerializer(many=True, read_only=True)
     
     # Campos de ubicación jerárquica (solo lectura)
@@ -38,6 +41,9 @@ class LugarSerializer(serializers.ModelSerializer):
     canton_nombre = serializers.CharField(source='ubicacion.canton.nombre', read_only=True, default="-")
     parroquia_nombre = serializers.CharField(source='ubicacion.nombre', read_only=True, default="-")
 
+    # Solo presente en búsquedas ?near= (anotado por LugarViewSet)
+    distancia_km = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Lugar
         fields = [
@@ -45,10 +51,25 @@ class LugarSerializer(serializers.ModelSerializer):
             'direccionCompleta', 'provincia', 'canton', 'parroquia', 
             'provincia_nombre', 'canton_nombre', 'parroquia_nombre',
             'horarios', 'contacto', 'urlImagenPrincipal', 
-            'categorias'
+            'categorias', 'distancia_km',
+            'num_favoritos', 'num_pendientes', 'num_visitados'
         ]
             
-class ResenaSerializer(serializers.ModelSerializer):
+class LugarCompactoSerializer(CamposDinamicosSerializer):
+    """
+    Versión reducida para marcadores del mapa y tarjetas (?vista=compacta).
+    """
+    categorias = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    distancia_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Lugar
+        fields = [
+            'id', 'nombre', 'latitud', 'longitud', 'urlImagenPrincipal',
+            'categorias', 'distancia_km', 'num_favoritos'
+        ]
+
+class ResenaSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
     ruta_nombre = serializers.CharField(source='ruta.nombre', read_only=True)
@@ -61,7 +82,7 @@ class ResenaSerializer(serializers.ModelSerializer):
             'usuario', 'usuario_username'
         ]
 
-class FavoritoSerializer(serializers.ModelSerializer):
+class FavoritoSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
 
@@ -72,7 +93,7 @@ class FavoritoSerializer(serializers.ModelSerializer):
             'lugar', 'lugar_nombre', 'tipo'
         ]
 
-class EventoSerializer(serializers.ModelSerializer):
+class EventoSerializer(CamposDinamicosSerializer):
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
 
     class Meta:
@@ -83,11 +104,19 @@ class EventoSerializer(serializers.ModelSerializer):
             'lugar', 'lugar_nombre'
         ]
 
-class RutaSerializer(serializers.ModelSerializer):
+class EventoCompactoSerializer(CamposDinamicosSerializer):
+    """
+    Versión reducida para listados de eventos (?vista=compacta).
+    """
+    lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
+
+    class Meta:
+        model = Evento
+        fields = ['id', 'nombre', 'urlImagen', 'fechaEvento', 'lugar', 'lugar_nombre']
+
+class RutaSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     categorias = CategoriaSerializer(many=True, read_only=True)
-    num_guardados = serializers.IntegerField(read_only=True)
-    
     # Campo calculado
     tiempo_total_estimado = serializers.IntegerField(read_only=True)
 
@@ -99,111 +128,24 @@ class RutaSerializer(serializers.ModelSerializer):
             'distanciaEstimadaKm', 'usuario', 'usuario_username',
             'categorias', 'num_guardados', 'tiempo_total_estimado'
         ]
+        # Calculados a partir de las paradas (ver app1/metricas.py)
+        read_only_fields = ['duracionEstimadaSeg', 'distanciaEstimadaKm']
 
-class Ruta_GuardadaSerializer(serializers.ModelSerializer):
-    usuario_username = serializers.CharField(source='usuario.username', read_only=True)
-from rest_framework import serializers
-from django.contrib.auth.hashers import make_password
-from .models import (
-    Usuario, Resena, Categoria, Lugar, 
-    Favorito, Evento, Ruta, Ruta_Guardada, Ruta_Lugar
-)
-
-# --- Serializadores Base ---
-
-class UsuarioSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Usuario
-        fields = ['id', 'username', 'email', 'nombreDisplay', 'varFoto', 'fechaCreacion', 'password']
-        extra_kwargs = {
-            'password': {'write_only': True}
-        }
-
-    def create(self, validated_data):
-        password = validated_data.pop('password')
-        usuario = Usuario(**validated_data)
-        usuario.password = make_password(password)
-        usuario.save()
-        return usuario
-
-class CategoriaSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Categoria
-        fields = '__all__'
-
-# --- Serializadores con Relaciones ---
-
-class LugarSerializer(serializers.ModelSerializer):
-    categorias = CategoriaSerializer(many=True, read_only=True)
-    
-    # Campos de ubicación jerárquica (solo lectura)
-    provincia_nombre = serializers.CharField(source='ubicacion.canton.provincia.nombre', read_only=True, default="-")
-    canton_nombre = serializers.CharField(source='ubicacion.canton.nombre', read_only=True, default="-")
-    parroquia_nombre = serializers.CharField(source='ubicacion.nombre', read_only=True, default="-")
-
-    class Meta:
-        model = Lugar
-        fields = [
-            'id', 'nombre', 'descripcion', 'latitud', 'longitud', 
-            'direccionCompleta', 'provincia', 'canton', 'parroquia', 
-            'provincia_nombre', 'canton_nombre', 'parroquia_nombre',
-            'horarios', 'contacto', 'urlImagenPrincipal', 
-            'categorias'
-        ]
-            
-class ResenaSerializer(serializers.ModelSerializer):
-    usuario_username = serializers.CharField(source='usuario.username', read_only=True)
-    lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
-    ruta_nombre = serializers.CharField(source='ruta.nombre', read_only=True)
-    
-    class Meta:
-        model = Resena
-        fields = [
-            'id', 'texto', 'calificacion', 'fechaCreacion', 
-            'lugar', 'lugar_nombre', 'ruta', 'ruta_nombre', 
-            'usuario', 'usuario_username'
-        ]
-
-class FavoritoSerializer(serializers.ModelSerializer):
-    usuario_username = serializers.CharField(source='usuario.username', read_only=True)
-    lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
-
-    class Meta:
-        model = Favorito
-        fields = [
-            'id', 'fechaGuardado', 'usuario', 'usuario_username', 
-            'lugar', 'lugar_nombre', 'tipo'
-        ]
-
-class EventoSerializer(serializers.ModelSerializer):
-    lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
-
-    class Meta:
-        model = Evento
-        fields = [
-            'id', 'nombre', 'descripcion', 'urlImagen', 'fechaEvento', 
-            'categoriaEvento', 'direccionAlternativa', 
-            'lugar', 'lugar_nombre'
-        ]
-
-class RutaSerializer(serializers.ModelSerializer):
+class RutaCompactoSerializer(CamposDinamicosSerializer):
+    """
+    Versión reducida para listados de rutas (?vista=compacta).
+    """
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
-    categorias = CategoriaSerializer(many=True, read_only=True)
-    num_guardados = serializers.IntegerField(read_only=True)
-    
-    # Campo calculado
     tiempo_total_estimado = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ruta
         fields = [
-            'id', 'nombre', 'descripcion', 'visibilidadRuta', 
-            'urlImagenPortada', 'fechaCreacion', 'duracionEstimadaSeg', 
-            'distanciaEstimadaKm', 'usuario', 'usuario_username',
-            'categorias', 'num_guardados', 'tiempo_total_estimado'
+            'id', 'nombre', 'urlImagenPortada', 'distanciaEstimadaKm',
+            'usuario', 'usuario_username', 'num_guardados', 'tiempo_total_estimado'
         ]
 
-class Ruta_GuardadaSerializer(serializers.ModelSerializer):
+class Ruta_GuardadaSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     ruta_nombre = serializers.CharField(source='ruta.nombre', read_only=True)
 
@@ -214,7 +156,7 @@ class Ruta_GuardadaSerializer(serializers.ModelSerializer):
             'ruta', 'ruta_nombre'
         ]
 
-class Ruta_LugarSerializer(serializers.ModelSerializer):
+class Ruta_LugarSerializer(CamposDinamicosSerializer):
     ruta_nombre = serializers.CharField(source='ruta.nombre', read_only=True)
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
     
@@ -222,43 +164,95 @@ class Ruta_LugarSerializer(serializers.ModelSerializer):
         model = Ruta_Lugar
         fields = [
             'id', 'orden', 'fechaGuardado', 'ruta', 'ruta_nombre', 
-            'lugar', 'lugar_nombre', 'tiempo_sugerido_minutos', 'comentario'
+            'lugar', 'lugar_nombre', 'tiempo_sugerido_minutos', 'comentario',
+            'distancia_tramo_km', 'duracion_tramo_seg'
         ]
 
+class ParadaSerializer(Ruta_LugarSerializer):
+    """
+    Parada con el lugar completo (/api/rutas/?expand=lugares).
+    """
+    lugar_detalle = LugarSerializer(source='lugar', read_only=True)
+
+    class Meta(Ruta_LugarSerializer.Meta):
+        fields = Ruta_LugarSerializer.Meta.fields + ['lugar_detalle']
+
 # --- NUEVOS SERIALIZADORES (Social) ---
 
-class PublicacionSerializer(serializers.ModelSerializer):
+class VariantesImagenField(serializers.Field):
+    """
+    URLs de las variantes de una imagen (app1/imagenes.py):
+    {"thumb": {"webp": url, "jpeg": url, "ancho": 320, "alto": 240}, "card": ..., "full": ...}
+    Vacío mientras se generan.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variantes):
+        request = self.context.get('request')
+
+        def url(ruta):
+            url = default_storage.url(ruta)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            nombre: {
+                'webp': url(variantes[nombre]['webp']),
+                'jpeg': url(variantes[nombre]['jpeg']),
+                'ancho': variantes[nombre]['ancho'],
+                'alto': variantes[nombre]['alto'],
+            }
+            for nombre in VARIANTES if nombre in variantes
+        }
+
+class PublicacionSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     usuario_foto = serializers.CharField(source='usuario.varFoto', read_only=True) # Para mostrar avatar
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
     es_propietario = serializers.SerializerMethodField()
+    variantes = VariantesImagenField()
 
     class Meta:
         model = Publicacion
         fields = [
             'id', 'usuario', 'usuario_username', 'usuario_foto',
             'lugar', 'lugar_nombre',
-            'tipo', 'archivo_media', 'descripcion', 'fecha', 'es_visible',
+            'tipo', 'archivo_media', 'variantes', 'descripcion', 'fecha', 'es_visible',
             'es_propietario'
         ]
         read_only_fields = ['fecha', 'es_visible', 'es_propietario'] 
 
     def get_es_propietario(self, obj):
+        # El queryset del ViewSet ya trae la anotación; solo se consulta
+        # para instancias recién creadas o cargadas sin ella.
+        if hasattr(obj, 'es_propietario'):
+            return obj.es_propietario
         # Verifica si el autor de la publicacion administra el lugar
-        from .models import AdministradorLugar
-        return AdministradorLugar.objects.filter(usuario=obj.usuario, lugar=obj.lugar).exists() 
+        return AdministradorLugar.objects.filter(usuario_id=obj.usuario_id, lugar_id=obj.lugar_id).exists()
 
-class AdministradorLugarSerializer(serializers.ModelSerializer):
+class AdministradorLugarSerializer(CamposDinamicosSerializer):
     lugar_nombre = serializers.CharField(source='lugar.nombre', read_only=True)
     
     class Meta:
         model = AdministradorLugar
         fields = ['id', 'usuario', 'lugar', 'lugar_nombre', 'fecha_asignacion']
 
-class ComentarioSerializer(serializers.ModelSerializer):
+class ComentarioSerializer(CamposDinamicosSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
     usuario_foto = serializers.CharField(source='usuario.varFoto', read_only=True)
     
     class Meta:
         model = Comentario
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class FeedPublicacionSerializer(PublicacionSerializer):
+    """
+    Publicación del feed: además del autor (con avatar) y es_propietario,
+    trae el total de comentarios y los últimos comentarios ya cargados.
+    """
+    num_comentarios = serializers.IntegerField(read_only=True)
+    ultimos_comentarios = ComentarioSerializer(many=True, read_only=True)
+
+    class Meta(PublicacionSerializer.Meta):
+        fields = PublicacionSerializer.Meta.fields + ['num_comentarios', 'ultimos_comentarios']
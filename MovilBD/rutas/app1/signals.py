@@ -0,0 +1,267 @@
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import busqueda
+from .contadores import CAMPOS_FAVORITO, ajustar
+from .estadisticas import invalidar_stats
+from .metricas import encolar_geometria, recalcular_rutas
+from .sincronizacion import RECURSO_DE_MODELO, RECURSOS, registrar, registrar_relacionados
+from .tareas import encolar_al_confirmar
+from .versiones import DEPENDENCIAS, recursos_de, tocar
+from .models import Categoria, Evento, Favorito, Lugar, Publicacion, Resena, Ruta, Ruta_Guardada, Ruta_Lugar
+
+
+# --- Métricas de Ruta ---
+
+@receiver(post_save, sender=Ruta_Lugar)
+def recalcular_ruta_de_parada_guardada(sender, instance, **kwargs):
+    recalcular_rutas([instance.ruta_id])
+    # El tramo se escribió en bloque; se refresca para que la respuesta lo incluya
+    instance.refresh_from_db(fields=['distancia_tramo_km', 'duracion_tramo_seg'])
+    encolar_geometria(instance.ruta_id)
+
+
+@receiver(post_delete, sender=Ruta_Lugar)
+def recalcular_ruta_de_parada_borrada(sender, instance, **kwargs):
+    recalcular_rutas([instance.ruta_id])
+    encolar_geometria(instance.ruta_id)
+
+
+def _toca_coordenadas(update_fields):
+    return update_fields is None or bool({'latitud', 'longitud'} & set(update_fields))
+
+
+def _redondeada(lugar, campo):
+    # Como queda guardada: un float (-3.9800000000000004) se redondea a decimal_places
+    decimales = lugar._meta.get_field(campo).decimal_places
+    return Decimal(str(getattr(lugar, campo))).quantize(Decimal(1).scaleb(-decimales))
+
+
+@receiver(pre_save, sender=Lugar)
+def recordar_coordenadas_anteriores(sender, instance, update_fields=None, **kwargs):
+    # Lugar.save() siempre pasa update_fields (ver _sin_contadores): hay que
+    # comparar con lo guardado para saber si el lugar se movió
+    if instance.pk and _toca_coordenadas(update_fields):
+        instance._coordenadas_anteriores = (
+            sender.objects.filter(pk=instance.pk).values_list('latitud', 'longitud').first()
+        )
+
+
+@receiver(post_save, sender=Lugar)
+def recalcular_rutas_de_lugar(sender, instance, created, update_fields=None, **kwargs):
+    if created or not _toca_coordenadas(update_fields):
+        return
+    anterior = getattr(instance, '_coordenadas_anteriores', None)
+    if anterior is not None and anterior == (_redondeada(instance, 'latitud'), _redondeada(instance, 'longitud')):
+        return
+    ruta_ids = list(
+        Ruta_Lugar.objects.filter(lugar=instance).values_list('ruta_id', flat=True).distinct()
+    )
+    if ruta_ids:
+        # Un lugar puede estar en muchas rutas: se recalculan en la cola
+        encolar_al_confirmar('recalcular_rutas', ruta_ids, clave=f'recalcular-lugar:{instance.pk}')
+        for ruta_id in ruta_ids:
+            encolar_geometria(ruta_id)
+
+
+# --- Contadores de interacción ---
+
+@receiver(pre_save, sender=Ruta_Guardada)
+def recordar_ruta_anterior(sender, instance, **kwargs):
+    # Solo en ediciones: permite mover el contador si cambia la ruta
+    if instance.pk:
+        instance._ruta_anterior = sender.objects.filter(pk=instance.pk).values_list('ruta_id', flat=True).first()
+
+
+@receiver(post_save, sender=Ruta_Guardada)
+def contar_ruta_guardada(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_ruta_anterior', None)
+    if created:
+        ajustar(Ruta, instance.ruta_id, 'num_guardados', 1)
+    elif anterior is not None and anterior != instance.ruta_id:
+        ajustar(Ruta, anterior, 'num_guardados', -1)
+        ajustar(Ruta, instance.ruta_id, 'num_guardados', 1)
+
+
+@receiver(post_delete, sender=Ruta_Guardada)
+def descontar_ruta_guardada(sender, instance, **kwargs):
+    ajustar(Ruta, instance.ruta_id, 'num_guardados', -1)
+
+
+@receiver(pre_save, sender=Favorito)
+def recordar_favorito_anterior(sender, instance, **kwargs):
+    if instance.pk:
+        instance._favorito_anterior = sender.objects.filter(pk=instance.pk).values_list('lugar_id', 'tipo').first()
+
+
+@receiver(post_save, sender=Favorito)
+def contar_favorito(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_favorito_anterior', None)
+    if created:
+        ajustar(Lugar, instance.lugar_id, CAMPOS_FAVORITO[instance.tipo], 1)
+    elif anterior is not None and anterior != (instance.lugar_id, instance.tipo):
+        ajustar(Lugar, anterior[0], CAMPOS_FAVORITO[anterior[1]], -1)
+        ajustar(Lugar, instance.lugar_id, CAMPOS_FAVORITO[instance.tipo], 1)
+
+
+@receiver(post_delete, sender=Favorito)
+def descontar_favorito(sender, instance, **kwargs):
+    ajustar(Lugar, instance.lugar_id, CAMPOS_FAVORITO[instance.tipo], -1)
+
+
+# --- Estadísticas de usuario (caché) ---
+
+@receiver(pre_save, sender=Favorito)
+@receiver(pre_save, sender=Ruta)
+@receiver(pre_save, sender=Ruta_Guardada)
+@receiver(pre_save, sender=Resena)
+@receiver(pre_save, sender=Publicacion)
+def recordar_usuario_anterior(sender, instance, **kwargs):
+    # Si la fila cambia de usuario, también cambian las stats del anterior
+    if instance.pk:
+        instance._usuario_anterior = sender.objects.filter(pk=instance.pk).values_list('usuario_id', flat=True).first()
+
+
+@receiver(post_save, sender=Favorito)
+@receiver(post_delete, sender=Favorito)
+@receiver(post_save, sender=Ruta)
+@receiver(post_delete, sender=Ruta)
+@receiver(post_save, sender=Ruta_Guardada)
+@receiver(post_delete, sender=Ruta_Guardada)
+@receiver(post_save, sender=Resena)
+@receiver(post_delete, sender=Resena)
+@receiver(post_save, sender=Publicacion)
+@receiver(post_delete, sender=Publicacion)
+def invalidar_stats_de_usuario(sender, instance, **kwargs):
+    invalidar_stats(instance.usuario_id, getattr(instance, '_usuario_anterior', None))
+
+
+# --- Versiones de recursos (ETag / Last-Modified) ---
+
+def tocar_versiones(sender, action=None, **kwargs):
+    # m2m_changed llega también con pre_add/pre_remove/pre_clear
+    if action is None or action.startswith('post_'):
+        tocar(*recursos_de(sender._meta.object_name))
+
+
+for nombre in {modelo for modelos in DEPENDENCIAS.values() for modelo in modelos}:
+    modelo = apps.get_model('app1', nombre)
+    if modelo._meta.auto_created:
+        m2m_changed.connect(tocar_versiones, sender=modelo, dispatch_uid=f'version-{nombre}-m2m')
+    else:
+        post_save.connect(tocar_versiones, sender=modelo, dispatch_uid=f'version-{nombre}-save')
+        post_delete.connect(tocar_versiones, sender=modelo, dispatch_uid=f'version-{nombre}-delete')
+
+
+# --- Índice de búsqueda (app1/busqueda.py) ---
+
+TIPOS_BUSQUEDA = {Lugar: 'lugar', Ruta: 'ruta', Evento: 'evento'}
+
+
+@receiver(post_save, sender=Lugar)
+@receiver(post_save, sender=Ruta)
+@receiver(post_save, sender=Evento)
+def indexar_documento(sender, instance, **kwargs):
+    if busqueda.disponible():
+        busqueda.indexar(TIPOS_BUSQUEDA[sender], instance)
+
+
+@receiver(post_delete, sender=Lugar)
+@receiver(post_delete, sender=Ruta)
+@receiver(post_delete, sender=Evento)
+def desindexar_documento(sender, instance, **kwargs):
+    if busqueda.disponible():
+        busqueda.desindexar(TIPOS_BUSQUEDA[sender], instance.pk)
+
+
+@receiver(m2m_changed, sender=Lugar.categorias.through)
+@receiver(m2m_changed, sender=Ruta.categorias.through)
+def indexar_categorias(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not action.startswith('post_') or not busqueda.disponible():
+        return
+    if not reverse:
+        busqueda.indexar(TIPOS_BUSQUEDA[type(instance)], instance)
+    elif pk_set:
+        # Cambio desde la categoría: se reindexan los lugares/rutas afectados
+        for objeto in model.objects.filter(pk__in=pk_set).prefetch_related('categorias'):
+            busqueda.indexar(TIPOS_BUSQUEDA[model], objeto)
+
+
+@receiver(post_save, sender=Categoria)
+def indexar_por_categoria(sender, instance, created, **kwargs):
+    if created or not busqueda.disponible():
+        return
+    for modelo, relacion in ((Lugar, instance.lugares), (Ruta, instance.rutas)):
+        for objeto in relacion.prefetch_related('categorias'):
+            busqueda.indexar(TIPOS_BUSQUEDA[modelo], objeto)
+
+
+# --- Registro de cambios para /api/sync/ (app1/sincronizacion.py) ---
+
+def registrar_guardado(sender, instance, created, **kwargs):
+    nombre = sender._meta.object_name
+    if nombre in RECURSO_DE_MODELO:
+        registrar(RECURSO_DE_MODELO[nombre], [instance.pk])
+    if not created:
+        registrar_relacionados(nombre, [instance.pk])
+
+
+def registrar_relacionados_borrado(sender, instance, **kwargs):
+    # Antes de borrar: después ya no se sabe qué filas la referenciaban
+    registrar_relacionados(sender._meta.object_name, [instance.pk])
+
+
+def registrar_borrado(sender, instance, **kwargs):
+    registrar(RECURSO_DE_MODELO[sender._meta.object_name], [instance.pk], borrado=True)
+
+
+for nombre in set(RECURSO_DE_MODELO) | {m for _, relaciones in RECURSOS.values() for m in relaciones}:
+    modelo = apps.get_model('app1', nombre)
+    post_save.connect(registrar_guardado, sender=modelo, dispatch_uid=f'sync-{nombre}-save')
+    pre_delete.connect(registrar_relacionados_borrado, sender=modelo, dispatch_uid=f'sync-{nombre}-pre-delete')
+    if nombre in RECURSO_DE_MODELO:
+        post_delete.connect(registrar_borrado, sender=modelo, dispatch_uid=f'sync-{nombre}-delete')
+
+
+@receiver(post_save, sender=Ruta_Lugar)
+@receiver(post_delete, sender=Ruta_Lugar)
+def registrar_ruta_de_parada(sender, instance, **kwargs):
+    # tiempo_total_estimado de la ruta suma los tiempos de sus paradas
+    registrar('rutas', [instance.ruta_id])
+
+
+@receiver(m2m_changed, sender=Lugar.categorias.through)
+@receiver(m2m_changed, sender=Ruta.categorias.through)
+def registrar_categorias(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Tras vaciar ya no se sabe qué lugares/rutas tenían la categoría
+        registrar_relacionados('Categoria', [instance.pk])
+    elif not reverse and action.startswith('post_'):
+        registrar(RECURSO_DE_MODELO[type(instance).__name__], [instance.pk])
+    elif reverse and pk_set and action.startswith('post_'):
+        registrar(RECURSO_DE_MODELO[model.__name__], pk_set)
+
+
+# --- Variantes de imagen de las publicaciones (app1/imagenes.py) ---
+
+@receiver(post_save, sender=Publicacion)
+def generar_variantes_de_publicacion(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'archivo_media' not in update_fields:
+        return
+    if instance.archivo_media:
+        if instance.variantes.get('origen') != instance.archivo_media.name:
+            # Prioridad alta: el autor espera ver su publicación en el feed
+            encolar_al_confirmar('generar_variantes', instance.pk, prioridad=10, clave=f'variantes:{instance.pk}')
+    elif instance.variantes:
+        # Se quitó la imagen
+        sender.objects.filter(pk=instance.pk).update(variantes={})
+        encolar_al_confirmar('borrar_variantes', instance.pk)
+
+
+@receiver(post_delete, sender=Publicacion)
+def borrar_variantes_de_publicacion(sender, instance, **kwargs):
+    if instance.variantes:
+        encolar_al_confirmar('borrar_variantes', instance.pk)
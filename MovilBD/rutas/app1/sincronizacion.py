@@ -0,0 +1,89 @@
+"""
+Sincronización incremental del catálogo (/api/sync/?since=<token>).
+
+CambioSync guarda, por cada fila sincronizable, su último cambio: una fila
+por (recurso, objeto_id) que se reemplaza en cada escritura, con un id
+autoincremental que nunca se reutiliza. Ese id es el token: el cliente envía
+el último que recibió y solo se le devuelven las filas cambiadas después,
+así el coste de una sincronización depende de lo que cambió y no del tamaño
+del catálogo. Los borrados quedan como lápidas (borrado=True) y el registro
+no crece con las ediciones, solo con el número de filas.
+
+app1/signals.py registra los cambios; las escrituras en bloque (bulk_update,
+.update()) que no disparan señales llaman a registrar() directamente, igual
+que hacen con versiones.tocar().
+"""
+from django.apps import apps
+from django.db import transaction
+
+# recurso -> (modelo, {modelo relacionado: lookup desde el modelo del recurso})
+# Un cambio en una fila relacionada marca las filas del recurso que la
+# muestran, p. ej. renombrar una categoría marca sus lugares y rutas.
+RECURSOS = {
+    'categorias': ('Categoria', {}),
+    'lugares': ('Lugar', {
+        'Categoria': 'categorias',
+        'Parroquia': 'ubicacion',
+        'Canton': 'ubicacion__canton',
+        'Provincia': 'ubicacion__canton__provincia',
+    }),
+    'rutas': ('Ruta', {'Categoria': 'categorias', 'Usuario': 'usuario'}),
+    'ruta-lugares': ('Ruta_Lugar', {'Ruta': 'ruta', 'Lugar': 'lugar'}),
+    'eventos': ('Evento', {'Lugar': 'lugar'}),
+}
+
+RECURSO_DE_MODELO = {modelo: recurso for recurso, (modelo, _) in RECURSOS.items()}
+
+
+def registrar(recurso, ids, borrado=False):
+    """
+    Anota como cambiadas (o borradas) las filas `ids` del recurso.
+    """
+    from .models import CambioSync
+
+    ids = set(ids)
+    if not ids:
+        return
+    with transaction.atomic():
+        # Borrar e insertar da a cada fila un id nuevo, mayor que cualquier token emitido
+        CambioSync.objects.filter(recurso=recurso, objeto_id__in=ids).delete()
+        CambioSync.objects.bulk_create(
+            [CambioSync(recurso=recurso, objeto_id=pk, borrado=borrado) for pk in sorted(ids)]
+        )
+
+
+def registrar_relacionados(nombre_modelo, pks):
+    """
+    Marca las filas de otros recursos que muestran las filas `pks` de `nombre_modelo`.
+    """
+    for recurso, (modelo, relaciones) in RECURSOS.items():
+        lookup = relaciones.get(nombre_modelo)
+        if lookup and pks:
+            ids = (
+                apps.get_model('app1', modelo).objects
+                .filter(**{f'{lookup}__in': pks}).values_list('id', flat=True).distinct()
+            )
+            registrar(recurso, ids)
+
+
+def cambios_desde(token, limite):
+    """
+    (cambios, nuevo token, hay más) con hasta `limite` entradas del registro
+    posteriores a `token`, en orden. `cambios` mapea recurso ->
+    ({ids cambiados}, [ids borrados]).
+    """
+    from .models import CambioSync
+
+    entradas = list(
+        CambioSync.objects.filter(id__gt=token).order_by('id')
+        .values_list('id', 'recurso', 'objeto_id', 'borrado')[:limite]
+    )
+    cambios = {recurso: (set(), []) for recurso in RECURSOS}
+    for _, recurso, objeto_id, borrado in entradas:
+        cambiados, borrados = cambios[recurso]
+        if borrado:
+            borrados.append(objeto_id)
+        else:
+            cambiados.add(objeto_id)
+    nuevo_token = entradas[-1][0] if entradas else token
+    return cambios, nuevo_token, len(entradas) == limite
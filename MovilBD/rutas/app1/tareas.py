@@ -0,0 +1,180 @@
+"""
+Cola de tareas en segundo plano guardada en la propia base de datos.
+
+encolar('generar_variantes', 12) inserta una fila en Tarea; los procesos de
+`manage.py trabajador --procesos N` la reclaman y la ejecutan fuera de la
+petición. No hace falta broker: funciona con el mismo SQLite en una sola
+máquina y en local.
+
+- Reclamo atómico: un UPDATE condicionado (estado y plazo) marca la tarea
+  como en curso; si otro proceso se adelantó, el UPDATE no afecta filas y se
+  prueba con la siguiente. En bases con SELECT ... FOR UPDATE SKIP LOCKED
+  (PostgreSQL) los candidatos se bloquean al leerlos.
+- Arriendo: una tarea en curso cuyo `bloqueada_hasta` venció (el proceso
+  murió) vuelve a poder reclamarse.
+- Reintentos: si la función lanza una excepción se reprograma con espera
+  exponencial hasta `max_intentos`; después queda FALLIDA con el error.
+- Prioridad: mayor número, antes; a igual prioridad, la más antigua.
+- `clave`: si ya hay una tarea pendiente con la misma clave no se duplica
+  (p. ej. varias ediciones seguidas de la misma ruta).
+
+Solo se ejecutan las funciones de TAREAS.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# nombre -> función (ruta de importación)
+TAREAS = {
+    'generar_variantes': 'app1.imagenes.generar_variantes',
+    'borrar_variantes': 'app1.imagenes.borrar_variantes',
+    'recalcular_rutas': 'app1.metricas.recalcular_rutas',
+    'calentar_geometria': 'app1.metricas.calentar_geometria',
+    'construir_grafo': 'app1.ruteo.preparar_grafo',
+    'reconciliar_contadores': 'app1.contadores.reconciliar_contadores',
+    'tocar_versiones': 'app1.versiones.tocar',
+}
+
+MAX_INTENTOS = 5
+# Espera antes del reintento n: ESPERA_BASE * 2**(n-1), como mucho ESPERA_MAXIMA
+ESPERA_BASE = timedelta(seconds=10)
+ESPERA_MAXIMA = timedelta(hours=1)
+
+
+def _arriendo():
+    return timedelta(seconds=getattr(settings, 'TAREAS_ARRIENDO_SEG', 300))
+
+
+def encolar(nombre, *args, prioridad=0, retraso=None, clave=None, max_intentos=MAX_INTENTOS):
+    """
+    Programa `nombre(*args)` (argumentos serializables a JSON).
+    Devuelve la Tarea creada o la pendiente que ya tenía la misma clave.
+    """
+    from .models import Tarea
+
+    if nombre not in TAREAS:
+        raise ValueError(f'Tarea desconocida: {nombre}')
+    if clave:
+        pendiente = Tarea.objects.filter(clave=clave, estado=Tarea.PENDIENTE).first()
+        if pendiente is not None:
+            return pendiente
+    return Tarea.objects.create(
+        nombre=nombre,
+        argumentos=list(args),
+        prioridad=prioridad,
+        disponible_en=timezone.now() + (retraso or timedelta()),
+        clave=clave,
+        max_intentos=max_intentos,
+    )
+
+
+def encolar_al_confirmar(nombre, *args, **opciones):
+    """
+    encolar() cuando la transacción actual se confirme, así el trabajador ya
+    ve las filas y archivos que la tarea necesita.
+    """
+    transaction.on_commit(lambda: encolar(nombre, *args, **opciones))
+
+
+def identificador_trabajador():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _reclamables(ahora):
+    from .models import Tarea
+
+    return Tarea.objects.filter(
+        Q(estado=Tarea.PENDIENTE, disponible_en__lte=ahora)
+        | Q(estado=Tarea.EN_CURSO, bloqueada_hasta__lt=ahora)
+    )
+
+
+def reclamar(trabajador, candidatos=10):
+    """
+    Reclama la siguiente tarea disponible para `trabajador` o devuelve None.
+    """
+    from .models import Tarea
+
+    ahora = timezone.now()
+    cambios = {
+        'estado': Tarea.EN_CURSO,
+        'trabajador': trabajador,
+        'bloqueada_hasta': ahora + _arriendo(),
+        'intentos': F('intentos') + 1,
+    }
+    orden = ('-prioridad', 'disponible_en', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            tarea = _reclamables(ahora).order_by(*orden).select_for_update(skip_locked=True).first()
+            if tarea is None:
+                return None
+            Tarea.objects.filter(pk=tarea.pk).update(**cambios)
+        tarea.refresh_from_db()
+        return tarea
+
+    ids = list(_reclamables(ahora).order_by(*orden).values_list('id', flat=True)[:candidatos])
+    for pk in ids:
+        # Solo gana un proceso: el resto ve 0 filas actualizadas
+        if _reclamables(ahora).filter(pk=pk).update(**cambios):
+            return Tarea.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea ya reclamada y anota el resultado.
+    Devuelve True si terminó bien.
+    """
+    from .models import Tarea
+
+    if tarea.intentos > tarea.max_intentos:
+        # Su arriendo venció demasiadas veces: el proceso muere al ejecutarla
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.FALLIDA, terminada=timezone.now(), bloqueada_hasta=None,
+            error=tarea.error or 'Arriendo vencido en todos los intentos.',
+        )
+        return False
+    try:
+        funcion = import_string(TAREAS[tarea.nombre])
+        funcion(*tarea.argumentos)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Tarea %s (%s) falló en el intento %s', tarea.pk, tarea.nombre, tarea.intentos)
+        cambios = {'error': error, 'bloqueada_hasta': None}
+        if tarea.intentos >= tarea.max_intentos or tarea.nombre not in TAREAS:
+            cambios.update(estado=Tarea.FALLIDA, terminada=timezone.now())
+        else:
+            espera = min(ESPERA_BASE * 2 ** (tarea.intentos - 1), ESPERA_MAXIMA)
+            # Un poco de azar para que los reintentos no coincidan
+            espera *= random.uniform(0.8, 1.2)
+            cambios.update(estado=Tarea.PENDIENTE, disponible_en=timezone.now() + espera)
+        # Solo si sigue siendo nuestra (el arriendo pudo vencer y otro reclamarla)
+        Tarea.objects.filter(pk=tarea.pk, trabajador=tarea.trabajador, estado=Tarea.EN_CURSO).update(**cambios)
+        return False
+
+    Tarea.objects.filter(pk=tarea.pk, trabajador=tarea.trabajador, estado=Tarea.EN_CURSO).update(
+        estado=Tarea.HECHA, terminada=timezone.now(), bloqueada_hasta=None, error='',
+    )
+    return True
+
+
+def purgar(dias=7):
+    """
+    Borra las tareas terminadas hace más de `dias` días. Devuelve cuántas.
+    """
+    from .models import Tarea
+
+    limite = timezone.now() - timedelta(days=dias)
+    borradas, _ = Tarea.objects.filter(estado=Tarea.HECHA, terminada__lt=limite).delete()
+    return borradas
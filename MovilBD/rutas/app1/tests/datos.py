@@ -0,0 +1,109 @@
+"""
+Datos y utilidades compartidos por los tests de app1.
+"""
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import TestCase
+
+from ..autenticacion import emitir_tokens
+from ..models import (
+    Canton, Categoria, Comentario, Evento, Favorito, Lugar, Parroquia, Provincia,
+    Publicacion, Resena, Ruta, Ruta_Guardada, Ruta_Lugar, Usuario,
+)
+
+CLAVE = 'clave-de-prueba-123'
+
+
+def crear_usuario(username='ana', **extra):
+    return Usuario.objects.create(
+        username=username, email=f'{username}@example.com', password=make_password(CLAVE), **extra
+    )
+
+
+def crear_parroquia(nombre='San Sebastián'):
+    provincia, _ = Provincia.objects.get_or_create(nombre='Loja')
+    canton, _ = Canton.objects.get_or_create(nombre='Loja', provincia=provincia)
+    return Parroquia.objects.create(nombre=nombre, canton=canton)
+
+
+def crear_lugar(nombre, latitud=-3.9931, longitud=-79.2042, categorias=(), **extra):
+    extra.setdefault('descripcion', f'Descripción de {nombre}')
+    lugar = Lugar.objects.create(
+        nombre=nombre, latitud=Decimal(str(latitud)), longitud=Decimal(str(longitud)), **extra
+    )
+    if categorias:
+        lugar.categorias.set(categorias)
+    return lugar
+
+
+def crear_ruta(usuario, nombre, lugares=(), **extra):
+    extra.setdefault('descripcion', f'Descripción de {nombre}')
+    ruta = Ruta.objects.create(nombre=nombre, visibilidadRuta='PUBLICA', usuario=usuario, **extra)
+    for orden, lugar in enumerate(lugares):
+        Ruta_Lugar.objects.create(ruta=ruta, lugar=lugar, orden=orden, tiempo_sugerido_minutos=30)
+    return ruta
+
+
+def crear_catalogo(lugares=4, rutas=3, paradas=3):
+    """
+    Catálogo pequeño con todas las relaciones que serializa la API:
+    ubicación, categorías, rutas con paradas, reseñas, eventos, favoritos
+    y publicaciones con comentarios.
+    """
+    usuarios = [crear_usuario('ana'), crear_usuario('beto')]
+    parroquia = crear_parroquia()
+    categorias = [Categoria.objects.create(nombre=n) for n in ('Parques', 'Museos', 'Miradores')]
+    lista_lugares = [
+        crear_lugar(
+            f'Lugar {i}', -3.99 + i * 0.001, -79.20 - i * 0.001,
+            categorias=categorias[: 1 + i % 3], ubicacion=parroquia,
+        )
+        for i in range(lugares)
+    ]
+    lista_rutas = [
+        crear_ruta(usuarios[i % 2], f'Ruta {i}', lista_lugares[i:i + paradas])
+        for i in range(rutas)
+    ]
+    for ruta in lista_rutas:
+        ruta.categorias.set(categorias[:2])
+    for i, lugar in enumerate(lista_lugares):
+        Resena.objects.create(texto='Muy bonito', calificacion=5, lugar=lugar, usuario=usuarios[i % 2])
+        Evento.objects.create(
+            nombre=f'Evento {i}', descripcion='Feria', fechaEvento='2030-01-0%dT10:00:00Z' % (1 + i % 9), lugar=lugar
+        )
+        Favorito.objects.create(usuario=usuarios[0], lugar=lugar, tipo='FAV')
+    for ruta in lista_rutas:
+        Resena.objects.create(texto='Recomendada', calificacion=4, ruta=ruta, usuario=usuarios[1])
+        Ruta_Guardada.objects.create(usuario=usuarios[0], ruta=ruta, orden=ruta.id)
+    for i, lugar in enumerate(lista_lugares[:2]):
+        publicacion = Publicacion.objects.create(usuario=usuarios[i % 2], lugar=lugar, descripcion='Foto')
+        for j in range(3):
+            Comentario.objects.create(usuario=usuarios[j % 2], publicacion=publicacion, texto=f'Comentario {j}')
+    return {
+        'usuarios': usuarios, 'categorias': categorias, 'lugares': lista_lugares, 'rutas': lista_rutas,
+    }
+
+
+def autorizacion(usuario):
+    """
+    Cabecera Authorization con un token de acceso del usuario.
+    """
+    return {'HTTP_AUTHORIZATION': f"Bearer {emitir_tokens(usuario)['access']}"}
+
+
+class ApiTestCase(TestCase):
+    """
+    Vacía las cachés entre tests: las respuestas y estadísticas cacheadas
+    de un test no deben verse en el siguiente.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias in ('default', 'respuestas'):
+            caches[alias].clear()
+
+    def resultados(self, response):
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response.json()['results']
@@ -0,0 +1,89 @@
+from django.core.cache import caches
+from django.test import TransactionTestCase
+from django.utils.http import http_date, parse_http_date
+
+from .datos import crear_catalogo
+
+# Misma respuesta que la API síncrona
+EQUIVALENTES = [
+    'lugares/', 'lugares/?fields=id,nombre', 'lugares/?near=-3.99,-79.2&radius_km=1',
+    'rutas/', 'rutas/?expand=lugares&fields=id,lugares', 'eventos/', 'comentarios/',
+    'publicaciones/feed/',
+]
+
+
+class AsincronoTests(TransactionTestCase):
+    """
+    TransactionTestCase: en_paralelo() consulta desde otros hilos, con otras
+    conexiones, que no ven una transacción sin confirmar.
+    """
+
+    def setUp(self):
+        for alias in ('default', 'respuestas'):
+            caches[alias].clear()
+        self.datos = crear_catalogo()
+
+    async def test_igual_que_la_api_sincrona(self):
+        for url in EQUIVALENTES:
+            with self.subTest(url=url):
+                asincrona = await self.async_client.get(f'/api/async/{url}')
+                self.assertEqual(asincrona.status_code, 200, asincrona.content[:300])
+                sincrona = await self.async_client.get(f'/api/{url}')
+                self.assertEqual(asincrona.json(), sincrona.json())
+
+    async def test_detalle_expandido(self):
+        ruta = self.datos['rutas'][0]
+        url = f'/api/async/rutas/{ruta.id}/?expand=lugares,resenas,usuario'
+        datos = (await self.async_client.get(url)).json()
+        self.assertEqual(datos, (await self.async_client.get(f'/api/rutas/{ruta.id}/?expand=lugares,resenas,usuario')).json())
+        self.assertEqual([p['lugar'] for p in datos['lugares']], [l.id for l in self.datos['lugares'][:3]])
+
+    async def test_expand_con_fields(self):
+        # Las expansiones leen la ruta (ruta_nombre) aunque ?fields= no la pida
+        ruta = self.datos['rutas'][0]
+        for consulta in ('expand=lugares&fields=id,lugares', 'expand=lugares,resenas&omit=nombre'):
+            with self.subTest(consulta=consulta):
+                response = await self.async_client.get(f'/api/async/rutas/{ruta.id}/?{consulta}')
+                self.assertEqual(response.status_code, 200, response.content[:300])
+                self.assertEqual({p['ruta_nombre'] for p in response.json()['lugares']}, {ruta.nombre})
+        lugar = self.datos['lugares'][0]
+        response = await self.async_client.get(f'/api/async/lugares/{lugar.id}/?expand=resenas,eventos&fields=id,resenas,eventos')
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        self.assertEqual({e['lugar_nombre'] for e in response.json()['eventos']}, {lugar.nombre})
+
+    async def test_cache(self):
+        primera = await self.async_client.get('/api/async/lugares/')
+        segunda = await self.async_client.get('/api/async/lugares/')
+        self.assertEqual((primera['X-Cache'], segunda['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(primera.json(), segunda.json())
+
+    async def test_get_condicional(self):
+        lugar = self.datos['lugares'][0]
+        for url in ('/api/async/lugares/', f'/api/async/lugares/{lugar.id}/', '/api/async/rutas/?expand=lugares'):
+            with self.subTest(url=url):
+                primera = await self.async_client.get(url)
+                self.assertEqual(primera.status_code, 200)
+                segunda = await self.async_client.get(url, headers={'If-None-Match': primera['ETag']})
+                self.assertEqual(segunda.status_code, 304)
+                self.assertEqual(segunda.content, b'')
+                self.assertEqual(segunda['ETag'], primera['ETag'])
+                posterior = http_date(parse_http_date(primera['Last-Modified']) + 1)
+                desde = await self.async_client.get(url, headers={'If-Modified-Since': posterior})
+                self.assertEqual(desde.status_code, 304)
+
+        # Tras escribir, el ETag anterior ya no vale
+        etag = (await self.async_client.get('/api/async/lugares/'))['ETag']
+        lugar.nombre = 'Renombrado'
+        await lugar.asave()
+        response = await self.async_client.get('/api/async/lugares/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    async def test_errores(self):
+        self.assertEqual((await self.async_client.get('/api/async/rutas/999999/')).status_code, 404)
+        response = await self.async_client.get('/api/async/rutas/?expand=otra')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.json())
+        self.assertEqual((await self.async_client.post('/api/async/lugares/')).status_code, 405)
+        response = await self.async_client.get('/api/async/lugares/', headers={'Authorization': 'Bearer falso'})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,173 @@
+from django.contrib.auth.hashers import make_password
+from django.test import override_settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from ..autenticacion import emitir_tokens, verificar_acceso
+from ..models import Favorito, Resena, Ruta_Lugar, Usuario
+from .datos import CLAVE, ApiTestCase, autorizacion, crear_lugar, crear_ruta, crear_usuario
+
+
+class TokensTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ana = crear_usuario('ana')
+
+    def post(self, url, datos):
+        return self.client.post(url, datos, content_type='application/json')
+
+    def test_login(self):
+        for credenciales in ({'username': 'ana'}, {'email': 'ana@example.com'}):
+            with self.subTest(credenciales=credenciales):
+                response = self.post('/api/usuarios/login/', {**credenciales, 'password': CLAVE})
+                self.assertEqual(response.status_code, 200)
+                datos = response.json()
+                self.assertEqual(datos['user']['id'], self.ana.id)
+                self.assertNotIn('password', datos['user'])
+                self.assertEqual(set(datos) - {'status', 'user'}, {'access', 'refresh', 'expires_in'})
+        for credenciales in ({'username': 'ana', 'password': 'otra'}, {'username': 'nadie', 'password': CLAVE}):
+            with self.subTest(credenciales=credenciales):
+                self.assertEqual(self.post('/api/usuarios/login/', credenciales).status_code, 401)
+
+    def test_acceso_sin_consultas(self):
+        token = emitir_tokens(self.ana)['access']
+        with self.assertNumQueries(0):
+            usuario = verificar_acceso(token)
+        self.assertEqual((usuario.id, usuario.rol), (self.ana.id, self.ana.rol))
+
+    def test_tokens_invalidos(self):
+        tokens = emitir_tokens(self.ana)
+        falsos = {
+            'alterado': tokens['access'][:-2] + 'xx',
+            'de refresco': tokens['refresh'],
+            'basura': 'abc',
+        }
+        for nombre, token in falsos.items():
+            with self.subTest(token=nombre):
+                response = self.client.get('/api/resenas/?usuario=me', HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(self.client.get('/api/resenas/', HTTP_AUTHORIZATION='Bearer').status_code, 401)
+
+    def test_acceso_caducado(self):
+        cabecera = autorizacion(self.ana)
+        with override_settings(TOKEN_ACCESO_SEG=-1):
+            response = self.client.get('/api/resenas/?usuario=me', **cabecera)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'El token ha caducado.')
+
+    def test_refresco(self):
+        refresco = emitir_tokens(self.ana)['refresh']
+        response = self.post('/api/usuarios/refresh/', {'refresh': refresco})
+        self.assertEqual(response.status_code, 200)
+        nuevo = response.json()
+        self.assertEqual(verificar_acceso(nuevo['access']).id, self.ana.id)
+        self.assertEqual(self.post('/api/usuarios/refresh/', {}).status_code, 400)
+        self.assertEqual(self.post('/api/usuarios/refresh/', {'refresh': 'abc'}).status_code, 401)
+        with override_settings(TOKEN_REFRESCO_SEG=-1):
+            self.assertEqual(self.post('/api/usuarios/refresh/', {'refresh': refresco}).status_code, 401)
+
+    def test_cambiar_la_contrasena_revoca_el_refresco(self):
+        refresco = emitir_tokens(self.ana)['refresh']
+        self.ana.password = make_password('nueva-clave-456')
+        self.ana.save()
+        self.assertEqual(self.post('/api/usuarios/refresh/', {'refresh': refresco}).status_code, 401)
+        with self.assertRaises(AuthenticationFailed):
+            verificar_acceso(refresco)
+
+
+class PropietarioDelUsuarioTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ana = crear_usuario('ana')
+        self.beto = crear_usuario('beto')
+
+    def patch(self, usuario, **cabeceras):
+        return self.client.patch(
+            f'/api/usuarios/{usuario.id}/', {'nombreDisplay': 'Nuevo'}, content_type='application/json', **cabeceras
+        )
+
+    def test_editar_el_propio(self):
+        response = self.patch(self.ana, **autorizacion(self.ana))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['nombreDisplay'], 'Nuevo')
+
+    def test_editar_o_borrar_otro(self):
+        self.assertEqual(self.patch(self.beto, **autorizacion(self.ana)).status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/usuarios/{self.beto.id}/', **autorizacion(self.ana)).status_code, 403)
+        self.assertEqual(self.patch(self.beto).status_code, 401)
+        self.assertEqual(self.client.delete(f'/api/usuarios/{self.beto.id}/').status_code, 401)
+        self.beto.refresh_from_db()
+        self.assertNotEqual(self.beto.nombreDisplay, 'Nuevo')
+
+        self.assertEqual(self.client.delete(f'/api/usuarios/{self.beto.id}/', **autorizacion(self.beto)).status_code, 204)
+        self.assertFalse(Usuario.objects.filter(pk=self.beto.pk).exists())
+
+    def test_leer_y_registrarse_siguen_abiertos(self):
+        self.assertEqual(self.client.get(f'/api/usuarios/{self.beto.id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/usuarios/{self.beto.id}/stats/').status_code, 200)
+        response = self.client.post(
+            '/api/usuarios/', {'username': 'carla', 'email': 'carla@example.com', 'password': CLAVE},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class AutorDelTokenTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ana = crear_usuario('ana')
+        self.beto = crear_usuario('beto')
+        self.lugar = crear_lugar('Parque')
+
+    def crear_resena(self, **cabeceras):
+        return self.client.post(
+            '/api/resenas/', {'texto': 'Bonito', 'calificacion': 5, 'lugar': self.lugar.id, 'usuario': self.ana.id},
+            content_type='application/json', **cabeceras,
+        )
+
+    def test_crear_en_nombre_de_otro(self):
+        self.assertEqual(self.crear_resena().status_code, 401)
+        self.assertEqual(self.crear_resena(**autorizacion(self.beto)).status_code, 403)
+        self.assertFalse(Resena.objects.exists())
+        self.assertEqual(self.crear_resena(**autorizacion(self.ana)).status_code, 201)
+
+    def test_borrar_de_otro(self):
+        favorito = Favorito.objects.create(usuario=self.ana, lugar=self.lugar)
+        url = f'/api/favoritos/{favorito.id}/'
+        self.assertEqual(self.client.delete(url).status_code, 401)
+        self.assertEqual(self.client.delete(url, **autorizacion(self.beto)).status_code, 403)
+        self.assertTrue(Favorito.objects.filter(pk=favorito.pk).exists())
+        self.assertEqual(self.client.delete(url, **autorizacion(self.ana)).status_code, 204)
+
+    def test_leer_sigue_abierto(self):
+        self.assertEqual(self.client.get('/api/resenas/').status_code, 200)
+        self.assertEqual(self.client.get('/api/favoritos/').status_code, 200)
+
+    def test_paradas_solo_del_autor_de_la_ruta(self):
+        ruta = crear_ruta(self.ana, 'Centro', [self.lugar])
+        otra = crear_ruta(self.beto, 'Norte')
+        parada = Ruta_Lugar.objects.get(ruta=ruta)
+        nueva = {'ruta': ruta.id, 'lugar': self.lugar.id, 'orden': 1}
+
+        def post(datos, usuario=None):
+            cabeceras = autorizacion(usuario) if usuario else {}
+            return self.client.post('/api/ruta-lugares/', datos, content_type='application/json', **cabeceras)
+
+        self.assertEqual(post(nueva).status_code, 401)
+        self.assertEqual(post(nueva, self.beto).status_code, 403)
+        url = f'/api/ruta-lugares/{parada.id}/'
+        self.assertEqual(self.client.patch(url, {'orden': 5}, content_type='application/json').status_code, 401)
+        # Ni reordenar la parada ajena ni llevarla a una ruta propia
+        for datos in ({'orden': 5}, {'ruta': otra.id}):
+            with self.subTest(datos=datos):
+                response = self.client.patch(url, datos, content_type='application/json', **autorizacion(self.beto))
+                self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.delete(url, **autorizacion(self.beto)).status_code, 403)
+        parada.refresh_from_db()
+        self.assertEqual((parada.ruta_id, parada.orden), (ruta.id, 0))
+
+        self.assertEqual(post(nueva, self.ana).status_code, 201)
+        self.assertEqual(self.client.delete(url, **autorizacion(self.ana)).status_code, 204)
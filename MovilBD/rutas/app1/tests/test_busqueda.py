@@ -0,0 +1,145 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase
+
+from .. import busqueda
+from ..models import Categoria, Evento, Lugar
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+class NormalizarTests(SimpleTestCase):
+
+    def test_tildes_palabras_vacias_y_raices(self):
+        self.assertEqual(busqueda.normalizar('El Jardín Botánico de las Luces'), ['jardin', 'botanic', 'luz'])
+        self.assertEqual(busqueda.normalizar('Iglesias'), busqueda.normalizar('iglesia'))
+        self.assertEqual(busqueda.normalizar(None), [])
+
+
+class BusquedaTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.parques = Categoria.objects.create(nombre='Parques')
+        self.jardin = crear_lugar('Jardín Botánico Reinaldo Espinosa', categorias=[self.parques])
+        self.iglesia = crear_lugar('Iglesia de San Francisco')
+        self.puerta = crear_lugar('Puerta de la Ciudad')
+        # "jardín" solo en la descripción
+        self.ruta = crear_ruta(crear_usuario(), 'Paseo verde', descripcion='Termina en el jardín')
+        self.evento = Evento.objects.create(
+            nombre='Festival de Luces', descripcion='Música', fechaEvento='2030-01-01T20:00:00Z', lugar=self.puerta
+        )
+
+    def buscar(self, consulta):
+        response = self.client.get('/api/buscar/', {'q': consulta})
+        self.assertEqual(response.status_code, 200)
+        return [(r['tipo'], r['id']) for r in response.json()['results']]
+
+    def test_sin_tildes_ni_mayusculas(self):
+        for consulta in ('jardin botanico', 'JARDÍN', 'Botánicos'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(self.buscar(consulta)[0], ('lugar', self.jardin.id))
+        self.assertEqual(self.buscar('iglesias'), [('lugar', self.iglesia.id)])
+        self.assertEqual(self.buscar('luz'), [('evento', self.evento.id)])
+
+    def test_titulo_pesa_mas_y_prefijo(self):
+        self.assertEqual(self.buscar('jardin'), [('lugar', self.jardin.id), ('ruta', self.ruta.id)])
+        # La última palabra vale como prefijo
+        self.assertEqual(self.buscar('franc'), [('lugar', self.iglesia.id)])
+        self.assertEqual(self.buscar('el de la'), [])
+
+    def test_filtro_por_tipo_y_limite(self):
+        response = self.client.get('/api/buscar/', {'q': 'jardin', 'tipo': 'ruta'}).json()
+        self.assertEqual([(r['tipo'], r['id']) for r in response['results']], [('ruta', self.ruta.id)])
+        self.assertEqual(response['results'][0]['objeto']['nombre'], 'Paseo verde')
+        self.assertEqual(self.client.get('/api/buscar/', {'q': 'jardin', 'limit': 1}).json()['count'], 1)
+
+    def test_el_indice_sigue_los_cambios(self):
+        self.puerta.descripcion = 'Castillo con museo'
+        self.puerta.save()
+        self.assertEqual(self.buscar('museo'), [('lugar', self.puerta.id)])
+        self.iglesia.delete()
+        self.assertEqual(self.buscar('iglesia'), [])
+        # Categorías: asignar una y renombrarla
+        self.puerta.categorias.add(self.parques)
+        self.assertIn(('lugar', self.puerta.id), self.buscar('parque'))
+        self.parques.nombre = 'Áreas verdes'
+        self.parques.save()
+        self.assertEqual(sorted(self.buscar('areas')), sorted([('lugar', self.jardin.id), ('lugar', self.puerta.id)]))
+
+    def test_reindexar(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {busqueda.TABLA}')
+        self.assertEqual(self.buscar('jardin'), [])
+        salida = StringIO()
+        call_command('reindexar_busqueda', stdout=salida)
+        self.assertIn('5 documentos', salida.getvalue())
+        self.assertEqual(len(self.buscar('jardin')), 2)
+
+    def test_parametros_invalidos(self):
+        for params in ({}, {'q': ' '}, {'q': 'x', 'tipo': 'otro'}, {'q': 'x', 'limit': 0}, {'q': 'x', 'limit': 'a'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/buscar/', params).status_code, 400)
+
+
+def queryset_del_admin(termino):
+    request = RequestFactory().get('/admin/app1/lugar/', {'q': termino})
+    queryset, _ = site._registry[Lugar].get_search_results(request, Lugar.objects.all(), termino)
+    return queryset
+
+
+def buscar_en_admin(termino):
+    return set(queryset_del_admin(termino))
+
+
+class BusquedaAdminTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.jardin = crear_lugar('Jardín Botánico')
+        self.puerta = crear_lugar('Puerta de la Ciudad')
+
+    def test_usa_el_indice_sin_tope(self):
+        self.assertEqual(buscar_en_admin('jardin'), {self.jardin})
+        parques = {crear_lugar(f'Parque {i}') for i in range(30)}
+        self.assertEqual(buscar_en_admin('parque'), parques)
+        # Los ids se filtran con una subconsulta, no como parámetros: un
+        # término frecuente no choca con el límite de variables de SQLite
+        _, params = queryset_del_admin('parque').query.sql_with_params()
+        self.assertEqual(len(params), 2)
+
+    def test_solo_palabras_vacias(self):
+        # "la" no llega al índice: búsqueda normal por icontains
+        self.assertEqual(buscar_en_admin('la'), {self.puerta})
+        self.assertEqual(buscar_en_admin(''), {self.jardin, self.puerta})
+
+    def test_sin_indice(self):
+        with mock.patch.object(busqueda, 'disponible', return_value=False), \
+                mock.patch.object(busqueda, 'ids_coincidentes') as ids_coincidentes:
+            self.assertEqual(buscar_en_admin('Jardín'), {self.jardin})
+        ids_coincidentes.assert_not_called()
+
+
+@mock.patch.object(busqueda, 'disponible', return_value=False)
+class SinFts5Tests(ApiTestCase):
+    """
+    Con otro motor la tabla no existe: no se toca el índice.
+    """
+
+    def test_senales_no_escriben_el_indice(self, _):
+        with mock.patch.object(busqueda, 'indexar') as indexar, mock.patch.object(busqueda, 'desindexar') as desindexar:
+            categoria = Categoria.objects.create(nombre='Museos')
+            lugar = crear_lugar('Museo', categorias=[categoria])
+            categoria.nombre = 'Museos y galerías'
+            categoria.save()
+            lugar.delete()
+        indexar.assert_not_called()
+        desindexar.assert_not_called()
+
+    def test_comando_y_vista(self, _):
+        with self.assertRaises(CommandError):
+            call_command('reindexar_busqueda', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/buscar/', {'q': 'museo'}).status_code, 503)
@@ -0,0 +1,72 @@
+from ..models import Lugar, Resena
+from .datos import ApiTestCase, autorizacion, crear_catalogo
+
+
+class CacheRespuestasTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def test_hit_y_miss(self):
+        primera = self.client.get('/api/lugares/')
+        self.assertEqual(primera['X-Cache'], 'MISS')
+        segunda = self.client.get('/api/lugares/')
+        self.assertEqual(segunda['X-Cache'], 'HIT')
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(self.client.get('/api/lugares/?page_size=2')['X-Cache'], 'MISS')
+
+        stats = self.client.get('/api/cache/stats/').json()
+        self.assertEqual((stats['lugares']['hits'], stats['lugares']['misses']), (1, 2))
+        self.assertIsNone(stats['eventos']['ratio'])
+
+    def test_escritura_invalida(self):
+        lugar = self.datos['lugares'][0]
+        url = f'/api/lugares/{lugar.id}/'
+        self.client.get(url)
+        Lugar.objects.filter(pk=lugar.pk).update(nombre='Sin señal')
+        # update() no dispara señales: se sigue sirviendo la copia cacheada
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        lugar.nombre = 'Renombrado'
+        lugar.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['nombre'], 'Renombrado')
+
+    def test_clave_incluye_host_y_esquema(self):
+        url = '/api/rutas/?page_size=1'
+        local = self.client.get(url, HTTP_HOST='localhost:8000').json()
+        self.assertTrue(local['next'].startswith('http://localhost:8000/'))
+
+        publico = self.client.get(url, HTTP_HOST='api.example.com')
+        self.assertEqual(publico['X-Cache'], 'MISS')
+        self.assertTrue(publico.json()['next'].startswith('http://api.example.com/'))
+
+        seguro = self.client.get(url, HTTP_HOST='api.example.com', secure=True)
+        self.assertEqual(seguro['X-Cache'], 'MISS')
+        self.assertTrue(seguro.json()['next'].startswith('https://api.example.com/'))
+        self.assertEqual(self.client.get(url, HTTP_HOST='api.example.com')['X-Cache'], 'HIT')
+
+    def test_usuario_me_por_token(self):
+        ana, beto = self.datos['usuarios']
+        url = '/api/resenas/?usuario=me'
+        de_ana = self.resultados(self.client.get(url, **autorizacion(ana)))
+        response = self.client.get(url, **autorizacion(beto))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual({r['usuario'] for r in self.resultados(response)}, {beto.id})
+        self.assertEqual({r['usuario'] for r in de_ana}, {ana.id})
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_errores_no_se_cachean(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/lugares/999999/').status_code, 404)
+        stats = self.client.get('/api/cache/stats/').json()['lugares']
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_recurso_relacionado_invalida(self):
+        # Las reseñas muestran el usuario: editarlo invalida su caché
+        self.client.get('/api/resenas/')
+        usuario = Resena.objects.first().usuario
+        usuario.username = 'otro_nombre'
+        usuario.save()
+        self.assertEqual(self.client.get('/api/resenas/')['X-Cache'], 'MISS')
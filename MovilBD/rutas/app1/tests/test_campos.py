@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .datos import ApiTestCase, crear_catalogo
+
+
+class CamposDinamicosTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response.json(), ' '.join(c['sql'] for c in consultas)
+
+    def test_fields(self):
+        datos, sql = self.get('/api/lugares/?fields=id,nombre')
+        self.assertEqual({tuple(fila) for fila in datos['results']}, {('id', 'nombre')})
+        # Las columnas que nadie pide no se leen
+        self.assertNotIn('"descripcion"', sql)
+        self.assertNotIn('app1_lugar_categorias', sql)
+
+        ruta = self.datos['rutas'][0]
+        datos, _ = self.get(f'/api/rutas/{ruta.id}/?fields=id,usuario_username')
+        self.assertEqual(datos, {'id': ruta.id, 'usuario_username': ruta.usuario.username})
+
+    def test_omit(self):
+        datos, sql = self.get('/api/lugares/?omit=descripcion,categorias')
+        fila = datos['results'][0]
+        self.assertNotIn('descripcion', fila)
+        self.assertNotIn('categorias', fila)
+        self.assertIn('nombre', fila)
+        self.assertNotIn('"descripcion"', sql)
+
+    def test_join_podado(self):
+        _, sql = self.get('/api/rutas/?fields=id,nombre')
+        self.assertNotIn('app1_usuario', sql)
+        _, sql = self.get('/api/rutas/?fields=id,usuario_username')
+        self.assertIn('app1_usuario', sql)
+        self.assertNotIn('"password"', sql)
+
+    def test_campos_del_orden_se_conservan(self):
+        # ?orden=favoritos pagina sobre num_favoritos aunque no se pida
+        primera, _ = self.get('/api/lugares/?orden=favoritos&fields=id&page_size=2')
+        segunda, _ = self.get(primera['next'])
+        self.assertEqual(len(primera['results'] + segunda['results']), 4)
+
+    def test_vista_compacta(self):
+        datos, _ = self.get('/api/lugares/?vista=compacta&near=-3.99,-79.2')
+        self.assertEqual(
+            set(datos['results'][0]),
+            {'id', 'nombre', 'latitud', 'longitud', 'urlImagenPrincipal', 'categorias', 'distancia_km', 'num_favoritos'},
+        )
+        # distancia_km solo existe con ?near=
+        datos, _ = self.get('/api/lugares/?vista=compacta')
+        self.assertNotIn('distancia_km', datos['results'][0])
+        self.assertIsInstance(datos['results'][0]['categorias'][0], int)
+        datos, _ = self.get('/api/rutas/?vista=compacta&fields=id,tiempo_total_estimado')
+        self.assertEqual(set(datos['results'][0]), {'id', 'tiempo_total_estimado'})
+        # El detalle no tiene versión compacta
+        lugar = self.datos['lugares'][0]
+        datos, _ = self.get(f'/api/lugares/{lugar.id}/?vista=compacta')
+        self.assertIn('descripcion', datos)
+
+    def test_vista_invalida(self):
+        self.assertEqual(self.client.get('/api/lugares/?vista=mini').status_code, 400)
+
+    def test_escrituras_devuelven_todo(self):
+        lugar = self.datos['lugares'][0]
+        response = self.client.patch(
+            f'/api/lugares/{lugar.id}/?fields=id', {'nombre': 'Nuevo'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['nombre'], 'Nuevo')
+        self.assertIn('descripcion', response.json())
+
+    def test_anidados_completos(self):
+        datos, _ = self.get('/api/rutas/?fields=id,categorias')
+        self.assertEqual(set(datos['results'][0]['categorias'][0]), {'id', 'nombre', 'urlIcono', 'urlImagen'})
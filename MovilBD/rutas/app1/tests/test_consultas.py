@@ -0,0 +1,73 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import (
+    AdministradorLugar, Categoria, Comentario, Evento, Favorito, Publicacion, Resena, Ruta_Guardada,
+)
+from .datos import ApiTestCase, crear_catalogo, crear_lugar, crear_ruta, crear_usuario
+
+LISTADOS = [
+    '/api/lugares/', '/api/rutas/', '/api/eventos/', '/api/resenas/', '/api/favoritos/',
+    '/api/rutas-guardadas/', '/api/ruta-lugares/', '/api/publicaciones/', '/api/comentarios/',
+    '/api/administradores/', '/api/categorias/',
+]
+
+
+class ConsultasFijasTests(ApiTestCase):
+    """
+    Los listados y detalles lanzan las mismas consultas con 2 filas que con 20.
+    """
+
+    def contar(self, url):
+        # La primera petición crea los sellos de versión que aún no existen
+        self.client.get(url)
+        caches['respuestas'].clear()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(consultas)
+
+    def test_listados_sin_consultas_por_fila(self):
+        crear_catalogo(lugares=3, rutas=2)
+        pocas = {url: self.contar(url) for url in LISTADOS}
+        crear_catalogo_extra()
+        for url in LISTADOS:
+            with self.subTest(url=url):
+                self.assertEqual(self.contar(url), pocas[url])
+
+    def test_detalle_de_ruta_y_lugar(self):
+        datos = crear_catalogo()
+        ruta, lugar = datos['rutas'][0], datos['lugares'][0]
+        antes = self.contar(f'/api/rutas/{ruta.id}/'), self.contar(f'/api/lugares/{lugar.id}/')
+        crear_catalogo_extra()
+        self.assertEqual((self.contar(f'/api/rutas/{ruta.id}/'), self.contar(f'/api/lugares/{lugar.id}/')), antes)
+
+    def test_usuario_managed_places(self):
+        datos = crear_catalogo()
+        usuario = datos['usuarios'][0]
+        AdministradorLugar.objects.create(usuario=usuario, lugar=datos['lugares'][0])
+        una = self.contar(f'/api/usuarios/{usuario.id}/managed_places/')
+        for lugar in datos['lugares'][1:]:
+            AdministradorLugar.objects.create(usuario=usuario, lugar=lugar)
+        self.assertEqual(self.contar(f'/api/usuarios/{usuario.id}/managed_places/'), una)
+
+
+def crear_catalogo_extra():
+    """
+    Más filas de todo, con otros usuarios y otra categoría.
+    """
+    usuarios = [crear_usuario(f'extra{i}') for i in range(3)]
+    categoria = Categoria.objects.create(nombre='Extra')
+    lugares = [crear_lugar(f'Extra {i}', categorias=[categoria]) for i in range(6)]
+    for i in range(4):
+        ruta = crear_ruta(usuarios[i % 3], f'Extra {i}', lugares[i:i + 3])
+        ruta.categorias.set([categoria])
+        Ruta_Guardada.objects.create(usuario=usuarios[i % 3], ruta=ruta, orden=i)
+    for i, lugar in enumerate(lugares):
+        AdministradorLugar.objects.create(usuario=usuarios[i % 3], lugar=lugar)
+        Resena.objects.create(texto='Extra', calificacion=3, lugar=lugar, usuario=usuarios[i % 3])
+        Evento.objects.create(nombre=f'Extra {i}', descripcion='-', fechaEvento='2031-01-01T10:00:00Z', lugar=lugar)
+        Favorito.objects.create(usuario=usuarios[i % 3], lugar=lugar, tipo='PEND')
+        publicacion = Publicacion.objects.create(usuario=usuarios[i % 3], lugar=lugar)
+        Comentario.objects.create(usuario=usuarios[(i + 1) % 3], publicacion=publicacion, texto='Extra')
@@ -0,0 +1,141 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..contadores import reconciliar_contadores
+from ..models import Favorito, Lugar, Ruta, Ruta_Guardada, Tarea
+from ..tareas import ejecutar, reclamar
+from ..versiones import obtener_version
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+class ContadoresTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuarios = [crear_usuario(f'u{i}') for i in range(3)]
+        self.lugares = [crear_lugar(f'L{i}') for i in range(3)]
+        self.ruta = crear_ruta(self.usuarios[0], 'R', self.lugares)
+
+    def contadores(self, lugar):
+        lugar = Lugar.objects.get(pk=lugar.pk)
+        return lugar.num_favoritos, lugar.num_pendientes, lugar.num_visitados
+
+    def test_favoritos(self):
+        lugar, otro = self.lugares[:2]
+        favoritos = [Favorito.objects.create(usuario=u, lugar=lugar, tipo='FAV') for u in self.usuarios]
+        self.assertEqual(self.contadores(lugar), (3, 0, 0))
+        # Cambiar de tipo y de lugar mueve el contador
+        favoritos[0].tipo = 'VISIT'
+        favoritos[0].save()
+        favoritos[1].lugar = otro
+        favoritos[1].save()
+        self.assertEqual(self.contadores(lugar), (1, 0, 1))
+        self.assertEqual(self.contadores(otro), (1, 0, 0))
+        favoritos[2].delete()
+        self.assertEqual(self.contadores(lugar), (0, 0, 1))
+
+    def test_rutas_guardadas(self):
+        otra = crear_ruta(self.usuarios[1], 'Otra')
+        guardadas = [Ruta_Guardada.objects.create(usuario=u, ruta=self.ruta, orden=0) for u in self.usuarios]
+        guardadas[0].ruta = otra
+        guardadas[0].save()
+        guardadas[1].delete()
+        self.assertEqual(Ruta.objects.get(pk=self.ruta.pk).num_guardados, 1)
+        self.assertEqual(Ruta.objects.get(pk=otra.pk).num_guardados, 1)
+
+    def test_guardar_el_modelo_no_pisa_los_contadores(self):
+        lugar = Lugar.objects.get(pk=self.lugares[0].pk)
+        Favorito.objects.create(usuario=self.usuarios[0], lugar=lugar, tipo='FAV')
+        lugar.nombre = 'Renombrado'
+        lugar.save()
+        self.assertEqual(self.contadores(lugar), (1, 0, 0))
+
+    def test_reconciliar(self):
+        Favorito.objects.create(usuario=self.usuarios[0], lugar=self.lugares[0], tipo='PEND')
+        Ruta_Guardada.objects.create(usuario=self.usuarios[0], ruta=self.ruta, orden=0)
+        Lugar.objects.filter(pk=self.lugares[0].pk).update(num_pendientes=7, num_favoritos=2)
+        Ruta.objects.filter(pk=self.ruta.pk).update(num_guardados=0)
+        self.assertEqual(reconciliar_contadores(), (1, 1))
+        self.assertEqual(self.contadores(self.lugares[0]), (0, 1, 0))
+        self.assertEqual(Ruta.objects.get(pk=self.ruta.pk).num_guardados, 1)
+        self.assertEqual(reconciliar_contadores(), (0, 0))
+
+
+class InvalidacionTestCase(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = crear_usuario()
+        self.lugar = crear_lugar('Parque')
+        self.ruta = crear_ruta(self.usuario, 'R', [self.lugar])
+
+
+@override_settings(TAREAS_TRABAJADOR=False)
+class InvalidacionSinTrabajadorTests(InvalidacionTestCase):
+
+    def test_marcar_invalida_el_catalogo(self):
+        primera = self.client.get('/api/lugares/')
+        version = obtener_version('lugares').version
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorito.objects.create(usuario=self.usuario, lugar=self.lugar, tipo='FAV')
+        self.assertGreater(obtener_version('lugares').version, version)
+        response = self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['num_favoritos'], 1)
+        self.assertFalse(Tarea.objects.exists())
+
+
+@override_settings(TAREAS_TRABAJADOR=True)
+class InvalidacionDiferidaTests(InvalidacionTestCase):
+
+    def test_marcar_no_invalida_el_catalogo(self):
+        primera = self.client.get('/api/lugares/')
+        version = obtener_version('lugares').version
+        with self.captureOnCommitCallbacks(execute=True):
+            favorito = Favorito.objects.create(usuario=self.usuario, lugar=self.lugar, tipo='FAV')
+        with self.captureOnCommitCallbacks(execute=True):
+            favorito.delete()
+        self.assertEqual(obtener_version('lugares').version, version)
+        response = self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # Una sola tarea para todas las marcas; al ejecutarse sube el sello
+        tarea = Tarea.objects.get(clave='contadores:lugares')
+        self.assertEqual(tarea.argumentos, ['lugares'])
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_en=tarea.creada)
+        self.assertTrue(ejecutar(reclamar('prueba')))
+        self.assertGreater(obtener_version('lugares').version, version)
+        self.assertEqual(self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 200)
+
+    def test_guardar_ruta_encola_su_recurso(self):
+        version = obtener_version('rutas').version
+        with self.captureOnCommitCallbacks(execute=True):
+            Ruta_Guardada.objects.create(usuario=self.usuario, ruta=self.ruta, orden=0)
+        self.assertEqual(obtener_version('rutas').version, version)
+        self.assertTrue(Tarea.objects.filter(clave='contadores:rutas', estado=Tarea.PENDIENTE).exists())
+
+
+class OrdenPorContadorTests(ApiTestCase):
+
+    def test_orden_favoritos_con_empates(self):
+        usuarios = [crear_usuario(f'u{i}') for i in range(3)]
+        lugares = [crear_lugar(f'L{i}') for i in range(12)]
+        # Muchos empates: 0, 1, 2 o 3 favoritos
+        for i, lugar in enumerate(lugares):
+            for usuario in usuarios[:i % 4]:
+                Favorito.objects.create(usuario=usuario, lugar=lugar, tipo='FAV')
+        esperados = list(Lugar.objects.order_by('-num_favoritos', '-id').values_list('id', flat=True))
+
+        ids, sql, url = [], [], '/api/lugares/?orden=favoritos&page_size=5'
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                datos = self.client.get(url).json()
+            sql += [c['sql'] for c in consultas]
+            ids += [l['id'] for l in datos['results']]
+            url = datos['next']
+        self.assertEqual(ids, esperados)
+        self.assertFalse(any('OFFSET' in consulta.upper() for consulta in sql))
+
+    def test_orden_invalido(self):
+        self.assertEqual(self.client.get('/api/lugares/?orden=otro').status_code, 400)
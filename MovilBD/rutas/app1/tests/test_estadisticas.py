@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from .. import estadisticas
+from ..models import Favorito, Publicacion, Resena, Ruta_Guardada, VersionRecurso, VersionStats
+from .datos import ApiTestCase, crear_catalogo, crear_lugar, crear_ruta, crear_usuario
+
+
+class StatsTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+        self.ana, self.beto = self.datos['usuarios']
+
+    def stats(self, usuario):
+        response = self.client.get(f'/api/usuarios/{usuario.id}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_conteos(self):
+        self.assertEqual(self.stats(self.ana), {
+            'favoritos': 4, 'visitados': 0, 'pendientes': 0, 'rutas': 2,
+            'rutas_guardadas': 3, 'resenas': 2, 'publicaciones': 1,
+        })
+
+    def test_usuario_inexistente(self):
+        self.assertEqual(self.client.get('/api/usuarios/999999/stats/').status_code, 404)
+        self.assertEqual(self.client.get('/api/usuarios/abc/stats/').status_code, 404)
+        self.assertFalse(VersionStats.objects.filter(usuario_id=999999).exists())
+
+    def test_una_consulta(self):
+        self.stats(self.ana)
+        with self.assertNumQueries(1):
+            self.assertEqual(estadisticas.calcular_stats(self.beto.id)['rutas'], 1)
+        # Los sellos de stats no se mezclan con los de la API
+        self.assertFalse(VersionRecurso.objects.filter(recurso__startswith='stats').exists())
+
+    def test_cacheadas_e_invalidadas(self):
+        self.stats(self.ana)
+        with self.assertNumQueries(1):
+            self.stats(self.ana)
+        Favorito.objects.create(usuario=self.ana, lugar=crear_lugar('Nuevo'), tipo='PEND')
+        self.assertEqual(self.stats(self.ana)['pendientes'], 1)
+        Publicacion.objects.filter(usuario=self.ana).delete()
+        self.assertEqual(self.stats(self.ana)['publicaciones'], 0)
+
+    def test_invalidacion_entre_procesos(self):
+        # Cada proceso tiene su propia caché local: la del proceso que lee
+        # no se toca al escribir, pero el sello de la base de datos cambia
+        otra = LocMemCache('otro-proceso', {})
+        with mock.patch.object(estadisticas, 'cache', otra):
+            self.assertEqual(self.stats(self.beto)['rutas'], 1)
+        crear_ruta(self.beto, 'Otra más')
+        with mock.patch.object(estadisticas, 'cache', otra):
+            self.assertEqual(self.stats(self.beto)['rutas'], 2)
+
+    def test_cambio_de_usuario_invalida_al_anterior(self):
+        self.stats(self.ana), self.stats(self.beto)
+        favorito = Favorito.objects.filter(usuario=self.ana).first()
+        favorito.usuario = self.beto
+        favorito.save()
+        guardada = Ruta_Guardada.objects.filter(usuario=self.ana).first()
+        guardada.usuario = self.beto
+        guardada.save()
+        resena = Resena.objects.filter(usuario=self.ana).first()
+        resena.usuario = self.beto
+        resena.save()
+
+        ana, beto = self.stats(self.ana), self.stats(self.beto)
+        self.assertEqual((ana['favoritos'], beto['favoritos']), (3, 1))
+        self.assertEqual((ana['rutas_guardadas'], beto['rutas_guardadas']), (2, 1))
+        self.assertEqual((ana['resenas'], beto['resenas']), (1, 6))
+
+    def test_otro_usuario_no_se_invalida(self):
+        carla = crear_usuario('carla')
+        self.stats(carla), self.stats(self.ana)
+        version = VersionStats.objects.get(usuario=carla).version
+        Favorito.objects.create(usuario=self.ana, lugar=self.datos['lugares'][0], tipo='VISIT')
+        self.assertEqual(VersionStats.objects.get(usuario=carla).version, version)
+        self.assertGreater(VersionStats.objects.get(usuario=self.ana).version, 0)
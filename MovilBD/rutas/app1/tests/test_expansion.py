@@ -0,0 +1,81 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .datos import ApiTestCase, crear_catalogo
+from .test_consultas import crear_catalogo_extra
+
+# Las expansiones leen el padre (parada.ruta.nombre, resena.lugar.nombre)
+# aunque ?fields= o ?omit= no pidan esas columnas
+URLS = [
+    '/api/rutas/?expand=lugares',
+    '/api/rutas/?expand=lugares&fields=id,lugares',
+    '/api/rutas/?expand=lugares&omit=nombre',
+    '/api/rutas/?expand=resenas,usuario&fields=id,resenas,usuario',
+    '/api/lugares/?expand=resenas&fields=id,resenas',
+    '/api/lugares/?expand=eventos&fields=id,eventos',
+]
+
+
+class ExpansionTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def contar(self, url):
+        # La primera petición crea los sellos de versión que aún no existen
+        self.client.get(url)
+        caches['respuestas'].clear()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return len(consultas)
+
+    def test_detalle_expandido(self):
+        ruta = self.datos['rutas'][0]
+        datos = self.client.get(f'/api/rutas/{ruta.id}/?expand=lugares,resenas,usuario').json()
+        self.assertEqual([p['lugar'] for p in datos['lugares']], [l.id for l in self.datos['lugares'][:3]])
+        self.assertEqual(datos['lugares'][0]['ruta_nombre'], ruta.nombre)
+        self.assertEqual(datos['lugares'][0]['lugar_detalle']['nombre'], 'Lugar 0')
+        self.assertEqual([r['texto'] for r in datos['resenas']], ['Recomendada'])
+        self.assertEqual(datos['usuario']['username'], ruta.usuario.username)
+
+    def test_expansion_invalida(self):
+        self.assertEqual(self.client.get('/api/rutas/?expand=lugares,otra').status_code, 400)
+        self.assertEqual(self.client.get('/api/categorias/?expand=lugares').status_code, 200)
+
+    def test_con_fields_sin_consultas_por_fila(self):
+        pocas = {url: self.contar(url) for url in URLS}
+        crear_catalogo_extra()
+        for url in URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.contar(url), pocas[url])
+        # Podar columnas nunca añade consultas
+        self.assertLessEqual(pocas[URLS[1]], pocas[URLS[0]])
+
+    def test_detalle_con_fields(self):
+        ruta = self.datos['rutas'][0]
+        url = f'/api/rutas/{ruta.id}/?expand=lugares&fields=id,lugares'
+        self.assertLessEqual(self.contar(url), self.contar(f'/api/rutas/{ruta.id}/?expand=lugares'))
+        datos = self.client.get(url).json()
+        self.assertEqual(set(datos), {'id', 'lugares'})
+        self.assertEqual({p['ruta_nombre'] for p in datos['lugares']}, {ruta.nombre})
+
+    def test_datos_anidados_con_fields(self):
+        datos = self.client.get('/api/lugares/?expand=resenas,eventos&fields=id,resenas,eventos').json()
+        nombres = {l.id: l.nombre for l in self.datos['lugares']}
+        for fila in datos['results']:
+            self.assertEqual({r['lugar_nombre'] for r in fila['resenas']}, {nombres[fila['id']]})
+            self.assertEqual({e['lugar_nombre'] for e in fila['eventos']}, {nombres[fila['id']]})
+
+    def test_cache_sigue_a_lo_expandido(self):
+        ruta = self.datos['rutas'][0]
+        url = f'/api/rutas/{ruta.id}/?expand=resenas'
+        self.client.get(url)
+        resena = ruta.resenas.get()
+        resena.texto = 'Cambiada'
+        resena.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['resenas'][0]['texto'], 'Cambiada')
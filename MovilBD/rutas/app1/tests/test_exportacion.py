@@ -0,0 +1,64 @@
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import exportacion
+from ..exportacion import json_en_bloques
+from .datos import ApiTestCase, crear_catalogo, crear_lugar
+
+
+class JsonEnBloquesTests(SimpleTestCase):
+
+    def test_trozos(self):
+        trozos = list(json_en_bloques(range(5), lambda n: {'n': n, 'texto': 'ñandú'}, tamano=2))
+        self.assertEqual(len(trozos), 5)  # '[', 3 bloques, ']'
+        self.assertEqual(json.loads(''.join(trozos)), [{'n': n, 'texto': 'ñandú'} for n in range(5)])
+        self.assertIn('ñandú', trozos[1])
+        self.assertEqual(''.join(json_en_bloques([], str)), '[]')
+
+
+class ExportarTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo(lugares=6)
+
+    def exportar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def test_igual_que_el_listado(self):
+        for recurso in ('lugares', 'rutas', 'eventos', 'resenas'):
+            with self.subTest(recurso=recurso):
+                response, exportados = self.exportar(f'/api/{recurso}/exportar/')
+                self.assertEqual(response['Content-Disposition'], f'attachment; filename="{recurso}.json"')
+                listado = self.resultados(self.client.get(f'/api/{recurso}/?page_size=200'))
+                self.assertEqual(exportados, listado)
+
+    def test_filtros_y_campos(self):
+        lugares = self.datos['lugares']
+        _, exportados = self.exportar(f'/api/lugares/exportar/?ids={lugares[0].id},{lugares[1].id}&fields=id,nombre')
+        self.assertEqual(exportados, [{'id': l.id, 'nombre': l.nombre} for l in lugares[:2]])
+        _, cercanos = self.exportar('/api/lugares/exportar/?near=-3.99,-79.20&radius_km=0.2&vista=compacta')
+        self.assertEqual([l['id'] for l in cercanos], [lugares[0].id, lugares[1].id])
+        self.assertIn('distancia_km', cercanos[0])
+
+    def test_consultas_por_bloque(self):
+        def contar():
+            with CaptureQueriesContext(connection) as consultas:
+                self.exportar('/api/lugares/exportar/')
+            return len(consultas)
+
+        with mock.patch.object(exportacion, 'TAMANO_BLOQUE', 100):
+            un_bloque = contar()
+            for i in range(20):
+                crear_lugar(f'Extra {i}')
+            self.assertEqual(contar(), un_bloque)
+        # Con bloques más pequeños las precargas se repiten por bloque, no por fila
+        with mock.patch.object(exportacion, 'TAMANO_BLOQUE', 10):
+            self.assertLess(contar(), un_bloque * 4)
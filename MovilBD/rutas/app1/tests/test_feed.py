@@ -0,0 +1,67 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import AdministradorLugar, Comentario, Publicacion
+from .datos import ApiTestCase, crear_lugar, crear_usuario
+
+
+class FeedTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ana, self.beto = crear_usuario('ana'), crear_usuario('beto')
+        self.lugar = crear_lugar('Puerta de la Ciudad')
+        AdministradorLugar.objects.create(usuario=self.ana, lugar=self.lugar)
+        self.publicaciones = []
+        for i in range(4):
+            publicacion = Publicacion.objects.create(
+                usuario=self.ana if i % 2 else self.beto, lugar=self.lugar, descripcion=f'P{i}'
+            )
+            for j in range(i + 2):
+                Comentario.objects.create(usuario=self.beto, publicacion=publicacion, texto=f'{i}-{j}')
+            self.publicaciones.append(publicacion)
+
+    def feed(self, url='/api/publicaciones/feed/'):
+        return self.resultados(self.client.get(url))
+
+    def test_conteo_y_ultimos_comentarios(self):
+        datos = {p['id']: p for p in self.feed('/api/publicaciones/feed/?comentarios=2')}
+        for i, publicacion in enumerate(self.publicaciones):
+            with self.subTest(i=i):
+                fila = datos[publicacion.id]
+                self.assertEqual(fila['num_comentarios'], i + 2)
+                # Los dos más recientes, en orden cronológico
+                self.assertEqual([c['texto'] for c in fila['ultimos_comentarios']], [f'{i}-{i}', f'{i}-{i + 1}'])
+                self.assertEqual(fila['es_propietario'], publicacion.usuario_id == self.ana.id)
+
+    def test_sin_comentarios(self):
+        for fila in self.feed('/api/publicaciones/feed/?comentarios=0'):
+            self.assertEqual(fila['ultimos_comentarios'], [])
+            self.assertGreater(fila['num_comentarios'], 0)
+
+    def test_orden_y_paginacion(self):
+        primera = self.client.get('/api/publicaciones/feed/?page_size=3').json()
+        segunda = self.client.get(primera['next']).json()
+        ids = [p['id'] for p in primera['results'] + segunda['results']]
+        self.assertEqual(ids, [p.id for p in reversed(self.publicaciones)])
+
+    def test_parametro_comentarios_invalido(self):
+        for valor in ('x', '-1', '21'):
+            with self.subTest(valor=valor):
+                self.assertEqual(self.client.get(f'/api/publicaciones/feed/?comentarios={valor}').status_code, 400)
+
+    def test_consultas_fijas(self):
+        def contar():
+            self.client.get('/api/publicaciones/feed/')
+            caches['respuestas'].clear()
+            with CaptureQueriesContext(connection) as consultas:
+                self.feed()
+            return len(consultas)
+
+        antes = contar()
+        for i in range(5):
+            publicacion = Publicacion.objects.create(usuario=self.ana, lugar=crear_lugar(f'Otro {i}'))
+            for j in range(6):
+                Comentario.objects.create(usuario=self.ana, publicacion=publicacion, texto='+')
+        self.assertEqual(contar(), antes)
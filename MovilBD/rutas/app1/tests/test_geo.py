@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+
+from .. import geo
+from ..models import Lugar
+from .datos import ApiTestCase, crear_lugar
+
+
+class RejillaTests(SimpleTestCase):
+
+    def test_celdas_vecinas(self):
+        celda = geo.celda_para(-3.9931, -79.2042)
+        self.assertEqual(geo.celda_para(-3.9931, -79.1942), celda + 1)
+        self.assertEqual(geo.celda_para(-3.9831, -79.2042), celda + geo.GRID_COLUMNAS)
+        self.assertIsNone(geo.celda_para(None, -79.2))
+
+    def test_bbox_radio_cruza_el_antimeridiano(self):
+        sur, oeste, norte, este = geo.bbox_radio(0, 179.99, 5)
+        self.assertGreater(oeste, este)
+        self.assertAlmostEqual(norte - sur, 2 * 5 / geo.KM_POR_GRADO)
+
+
+class BusquedaEspacialTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Centro de Loja y lugares a ~0.5, ~2 y ~30 km al norte
+        self.centro = crear_lugar('Centro', -3.9931, -79.2042)
+        self.cerca = crear_lugar('Cerca', -3.9886, -79.2042)
+        self.medio = crear_lugar('Medio', -3.9751, -79.2042)
+        self.lejos = crear_lugar('Lejos', -3.7233, -79.2042)
+        self.otro = crear_lugar('Fiyi', -16.5, 179.995)
+
+    def ids(self, url):
+        return [lugar['id'] for lugar in self.resultados(self.client.get(url))]
+
+    def test_celda_se_guarda_y_se_actualiza(self):
+        self.assertEqual(self.centro.celda, geo.celda_para(-3.9931, -79.2042))
+        self.centro.latitud = -3.7233
+        self.centro.save(update_fields=['latitud'])
+        self.assertEqual(Lugar.objects.get(pk=self.centro.pk).celda, self.lejos.celda)
+
+    def test_near_ordena_por_distancia(self):
+        url = '/api/lugares/?near=-3.9931,-79.2042&radius_km=3'
+        self.assertEqual(self.ids(url), [self.centro.id, self.cerca.id, self.medio.id])
+        datos = self.resultados(self.client.get(url))
+        self.assertAlmostEqual(datos[1]['distancia_km'], 0.5, places=1)
+        self.assertEqual(self.ids('/api/lugares/?near=-3.9931,-79.2042&radius_km=1'), [self.centro.id, self.cerca.id])
+
+    def test_near_pagina_por_distancia(self):
+        url = '/api/lugares/?near=-3.9931,-79.2042&radius_km=50&page_size=2'
+        primera = self.client.get(url).json()
+        segunda = self.client.get(primera['next']).json()
+        ids = [l['id'] for l in primera['results'] + segunda['results']]
+        self.assertEqual(ids, [self.centro.id, self.cerca.id, self.medio.id, self.lejos.id])
+
+    def test_bbox(self):
+        url = '/api/lugares/?bbox=-79.21,-4.0,-79.20,-3.98'
+        self.assertEqual(sorted(self.ids(url)), [self.centro.id, self.cerca.id])
+        # Rectángulo que cruza el antimeridiano (oeste > este)
+        self.assertEqual(self.ids('/api/lugares/?bbox=179.9,-17,-179.9,-16'), [self.otro.id])
+
+    def test_bbox_alto_usa_un_rango_por_filas(self):
+        url = '/api/lugares/?bbox=-79.3,-5,-79.1,-3'
+        self.assertEqual(sorted(self.ids(url)), sorted([self.centro.id, self.cerca.id, self.medio.id, self.lejos.id]))
+
+    def test_parametros_invalidos(self):
+        for url in (
+            '/api/lugares/?near=-3.99',
+            '/api/lugares/?near=a,b',
+            '/api/lugares/?near=-3.99,-79.2&radius_km=0',
+            '/api/lugares/?bbox=1,2,3',
+            '/api/lugares/?bbox=1,2,3,nan',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
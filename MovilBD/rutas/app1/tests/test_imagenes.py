@@ -0,0 +1,181 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from .. import imagenes
+from ..models import Publicacion, Tarea
+from ..tareas import ejecutar, reclamar
+from .datos import ApiTestCase, crear_lugar, crear_usuario
+
+ORIENTACION = 0x0112
+MODELO_CAMARA = 0x0110
+
+
+def foto(ancho=2000, alto=1000, formato='JPEG', modo='RGB', orientacion=None, nombre='foto.jpg'):
+    imagen = Image.new(modo, (ancho, alto), (200, 30, 30, 0) if modo == 'RGBA' else (200, 30, 30))
+    exif = Image.Exif()
+    exif[MODELO_CAMARA] = 'Cámara de prueba'
+    if orientacion:
+        exif[ORIENTACION] = orientacion
+    buffer = BytesIO()
+    opciones = {'exif': exif} if formato == 'JPEG' else {}
+    imagen.save(buffer, formato, **opciones)
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type=f'image/{formato.lower()}')
+
+
+class ImagenesTestCase(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def abrir(self, ruta):
+        with default_storage.open(ruta) as archivo:
+            imagen = Image.open(archivo)
+            imagen.load()
+        return imagen
+
+
+class ProcesarTests(ImagenesTestCase):
+
+    def test_tamanos_rotacion_y_sin_exif(self):
+        # Orientation 6: la foto se tomó girada 90°
+        resultado = imagenes.procesar(foto(orientacion=6), 7)
+        self.assertEqual(resultado['origen'], 'foto.jpg')
+        for nombre, lado in imagenes.VARIANTES.items():
+            with self.subTest(variante=nombre):
+                variante = resultado[nombre]
+                self.assertEqual((variante['ancho'], variante['alto']), (lado // 2, lado))
+                self.assertTrue(variante['webp'].startswith(f'publicaciones/variantes/7/{nombre}.'))
+                for clave, formato in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                    imagen = self.abrir(variante[clave])
+                    self.assertEqual(imagen.format, formato)
+                    self.assertEqual(imagen.size, (lado // 2, lado))
+                    self.assertEqual(dict(imagen.getexif()), {})
+
+    def test_no_amplia(self):
+        resultado = imagenes.procesar(foto(500, 400), 1)
+        self.assertEqual((resultado['thumb']['ancho'], resultado['thumb']['alto']), (320, 256))
+        self.assertEqual((resultado['full']['ancho'], resultado['full']['alto']), (500, 400))
+
+    def test_transparencia(self):
+        resultado = imagenes.procesar(foto(100, 100, 'PNG', 'RGBA', nombre='logo.png'), 1)
+        self.assertEqual(self.abrir(resultado['card']['webp']).mode, 'RGBA')
+        # JPEG se compone sobre blanco
+        jpeg = self.abrir(resultado['card']['jpeg'])
+        self.assertEqual(jpeg.mode, 'RGB')
+        self.assertTrue(all(canal > 240 for canal in jpeg.getpixel((50, 50))))
+
+
+class VariantesDePublicacionTests(ImagenesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = crear_usuario()
+        self.lugar = crear_lugar('Parque')
+
+    def publicar(self, archivo):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Publicacion.objects.create(usuario=self.usuario, lugar=self.lugar, archivo_media=archivo)
+
+    def procesar_cola(self):
+        while (tarea := reclamar('prueba')) is not None:
+            ejecutar(tarea)
+
+    def test_subida_encola_y_expone_urls(self):
+        publicacion = self.publicar(foto())
+        tarea = Tarea.objects.get(nombre='generar_variantes')
+        self.assertEqual((tarea.argumentos, tarea.clave), ([publicacion.pk], f'variantes:{publicacion.pk}'))
+        # Mientras se generan, la API devuelve el original y variantes vacías
+        self.assertEqual(self.client.get(f'/api/publicaciones/{publicacion.pk}/').json()['variantes'], {})
+
+        self.procesar_cola()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.variantes['origen'], publicacion.archivo_media.name)
+        datos = self.client.get(f'/api/publicaciones/{publicacion.pk}/').json()['variantes']
+        self.assertEqual(set(datos), set(imagenes.VARIANTES))
+        self.assertTrue(datos['card']['webp'].startswith('http://testserver/media/publicaciones/variantes/'))
+        self.assertEqual((datos['card']['ancho'], datos['card']['alto']), (800, 400))
+        self.assertEqual(self.client.get(datos['thumb']['jpeg']).status_code, 200)
+
+    def test_otra_imagen_reemplaza_las_variantes(self):
+        publicacion = self.publicar(foto())
+        self.procesar_cola()
+        publicacion.refresh_from_db()
+        anteriores = publicacion.variantes['card']['webp']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publicacion.archivo_media = foto(600, 600, nombre='otra.jpg')
+            publicacion.save()
+        self.procesar_cola()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.variantes['card']['ancho'], 600)
+        self.assertFalse(default_storage.exists(anteriores))
+
+        # Quitar la imagen vacía las variantes y borra los archivos
+        actuales = publicacion.variantes['card']['webp']
+        with self.captureOnCommitCallbacks(execute=True):
+            publicacion.archivo_media = None
+            publicacion.save()
+        self.procesar_cola()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.variantes, {})
+        self.assertFalse(default_storage.exists(actuales))
+
+    def test_borrar_la_publicacion(self):
+        publicacion = self.publicar(foto())
+        self.procesar_cola()
+        publicacion.refresh_from_db()
+        ruta = publicacion.variantes['full']['jpeg']
+        with self.captureOnCommitCallbacks(execute=True):
+            publicacion.delete()
+        self.procesar_cola()
+        self.assertFalse(default_storage.exists(ruta))
+
+    def test_no_pisa_una_subida_posterior(self):
+        publicacion = self.publicar(foto())
+        procesar = imagenes.procesar
+
+        def subir_otra_mientras(archivo, publicacion_id):
+            resultado = procesar(archivo, publicacion_id)
+            Publicacion.objects.filter(pk=publicacion_id).update(archivo_media='publicaciones/otra.jpg')
+            return resultado
+
+        with mock.patch.object(imagenes, 'procesar', subir_otra_mientras):
+            self.assertFalse(imagenes.generar_variantes(publicacion.pk))
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.variantes, {})
+
+    def test_otros_cambios_no_regeneran(self):
+        publicacion = self.publicar(foto())
+        self.procesar_cola()
+        # Como la API: se edita la fila recién leída
+        publicacion.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            publicacion.descripcion = 'Editada'
+            publicacion.save()
+        self.assertFalse(Tarea.objects.filter(estado=Tarea.PENDIENTE).exists())
+
+    def test_comando(self):
+        with mock.patch('app1.signals.encolar_al_confirmar'):
+            sin_variantes = self.publicar(foto())
+        salida = StringIO()
+        call_command('generar_variantes', stdout=salida)
+        self.assertIn('1 publicaciones procesadas', salida.getvalue())
+        sin_variantes.refresh_from_db()
+        self.assertIn('thumb', sin_variantes.variantes)
+        call_command('generar_variantes', stdout=salida)
+        self.assertIn('0 publicaciones procesadas', salida.getvalue())
+        call_command('generar_variantes', '--todas', stdout=salida)
+        self.assertIn('1 publicaciones procesadas', salida.getvalue().splitlines()[-1])
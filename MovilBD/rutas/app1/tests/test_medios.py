@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+from urllib.parse import quote
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from ..medios import CACHE_INMUTABLE, CACHE_SIN_HUELLA, AlmacenamientoConHuella, huella
+
+CONTENIDO = b'0123456789' * 10
+
+
+class MediosTestCase(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media, MEDIA_SENDFILE='')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.almacen = AlmacenamientoConHuella(location=self.media)
+        self.nombre = self.almacen.save('reels/video.mp4', ContentFile(CONTENIDO))
+
+    def get(self, ruta=None, **cabeceras):
+        return self.client.get(f'/media/{ruta or self.nombre}', headers=cabeceras)
+
+
+class AlmacenamientoConHuellaTests(MediosTestCase):
+
+    def test_nombre_con_huella(self):
+        self.assertEqual(self.nombre, f'reels/video.{huella(ContentFile(CONTENIDO))}.mp4')
+        # El mismo contenido reutiliza el archivo; otro contenido, otro nombre
+        self.assertEqual(self.almacen.save('reels/video.mp4', ContentFile(CONTENIDO)), self.nombre)
+        self.assertNotEqual(self.almacen.save('reels/video.mp4', ContentFile(b'otro')), self.nombre)
+        self.assertEqual(len(os.listdir(os.path.join(self.media, 'reels'))), 2)
+
+    def test_nombre_largo_conserva_la_huella(self):
+        nombre = self.almacen.save('x' * 80 + '.jpg', ContentFile(b'foto'), max_length=40)
+        self.assertEqual(len(nombre), 40)
+        self.assertTrue(nombre.endswith(f'.{huella(ContentFile(b"foto"))}.jpg'))
+
+
+class ServirMedioTests(MediosTestCase):
+
+    def test_archivo_completo(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENIDO)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Cache-Control'], CACHE_INMUTABLE)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        # Sin huella (subidas antiguas) la caché es corta
+        with open(os.path.join(self.media, 'viejo.jpg'), 'wb') as archivo:
+            archivo.write(b'foto')
+        self.assertEqual(self.get('viejo.jpg')['Cache-Control'], CACHE_SIN_HUELLA)
+
+    def test_rangos(self):
+        casos = {
+            'bytes=0-3': (0, 3),
+            'bytes=95-': (95, 99),
+            'bytes=-4': (96, 99),
+            'bytes=90-500': (90, 99),
+        }
+        for rango, (inicio, fin) in casos.items():
+            with self.subTest(rango=rango):
+                response = self.get(Range=rango)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), CONTENIDO[inicio:fin + 1])
+                self.assertEqual(response['Content-Range'], f'bytes {inicio}-{fin}/100')
+                self.assertEqual(response['Content-Length'], str(fin - inicio + 1))
+
+    def test_rango_no_satisfacible(self):
+        for rango in ('bytes=100-', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(rango=rango):
+                response = self.get(Range=rango)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_rangos_ignorados(self):
+        # Varios rangos, otra unidad o un If-Range que ya no coincide: archivo entero
+        for cabeceras in ({'Range': 'bytes=0-1,5-6'}, {'Range': 'items=0-1'},
+                          {'Range': 'bytes=0-3', 'If-Range': '"otro"'}):
+            with self.subTest(cabeceras=cabeceras):
+                self.assertEqual(self.get(**cabeceras).status_code, 200)
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-3', **{'If-Range': etag}).status_code, 206)
+
+    def test_peticiones_condicionales(self):
+        completa = self.get()
+        response = self.get(**{'If-None-Match': completa['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], CACHE_INMUTABLE)
+        self.assertEqual(self.get(**{'If-Modified-Since': completa['Last-Modified']}).status_code, 304)
+        self.assertEqual(self.get(**{'If-None-Match': '"otro"'}).status_code, 200)
+
+    def test_sendfile(self):
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get(Range='bytes=0-3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media, self.nombre))
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Cache-Control'], CACHE_INMUTABLE)
+
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/interna/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/interna/{self.nombre}')
+        self.assertNotIn('X-Sendfile', response)
+
+    def test_sendfile_con_nombres_no_ascii(self):
+        nombre = self.almacen.save('fotos/Cañón del río.jpg', ContentFile(b'foto'))
+        self.assertIn('Cañón', nombre)
+        # Subidas antiguas, sin pasar por get_valid_name
+        with open(os.path.join(self.media, 'viejo 100%?.jpg'), 'wb') as archivo:
+            archivo.write(b'foto')
+        for ruta in (nombre, 'viejo 100%?.jpg'):
+            with self.subTest(ruta=ruta):
+                with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/interna/'):
+                    response = self.get(quote(ruta))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['X-Accel-Redirect'], f'/interna/{quote(ruta)}')
+                with override_settings(MEDIA_SENDFILE='x-sendfile'):
+                    response = self.get(quote(ruta))
+                # X-Sendfile lleva la ruta sin codificar: sus bytes tal cual
+                self.assertEqual(response['X-Sendfile'].encode('latin-1'), os.fsencode(os.path.join(self.media, ruta)))
+
+    def test_rutas_invalidas(self):
+        self.assertEqual(self.get('no-existe.jpg').status_code, 404)
+        self.assertEqual(self.get('reels').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+        self.assertEqual(self.client.post(f'/media/{self.nombre}').status_code, 405)
+        self.assertEqual(self.client.head(f'/media/{self.nombre}').status_code, 200)
@@ -0,0 +1,96 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ..metricas import distancias_tramos, duracion_seg, haversine_km, recalcular_rutas
+from ..models import Ruta, Ruta_Lugar, Tarea
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+class CalculoTests(SimpleTestCase):
+
+    def test_haversine(self):
+        # Un grado de latitud ~ 111.2 km
+        self.assertAlmostEqual(haversine_km((0, 0), (1, 0)), 111.19, places=1)
+        self.assertEqual(haversine_km((-3.99, -79.2), (-3.99, -79.2)), 0)
+
+    def test_tramos_y_duracion(self):
+        self.assertEqual(distancias_tramos([]), [])
+        tramos = distancias_tramos([(0, 0), (0.01, 0), (0.02, 0)])
+        self.assertEqual(tramos[0], 0.0)
+        self.assertAlmostEqual(tramos[1], tramos[2])
+        self.assertEqual(duracion_seg(4.5), 3600)
+
+
+class MetricasRutaTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = crear_usuario()
+        # Tres paradas separadas ~1.11 km en latitud
+        self.lugares = [crear_lugar(f'L{i}', -3.99 + i * 0.01, -79.2) for i in range(3)]
+        self.ruta = crear_ruta(self.usuario, 'Norte', self.lugares[:2])
+
+    def totales(self):
+        ruta = Ruta.objects.get(pk=self.ruta.pk)
+        return ruta.distanciaEstimadaKm, ruta.duracionEstimadaSeg
+
+    def test_guardar_parada_recalcula(self):
+        self.assertEqual(self.totales(), (Decimal('1.11'), duracion_seg(haversine_km((-3.99, -79.2), (-3.98, -79.2)))))
+        parada = Ruta_Lugar.objects.create(ruta=self.ruta, lugar=self.lugares[2], orden=2)
+        # La instancia devuelta ya trae su tramo
+        self.assertEqual(parada.distancia_tramo_km, Decimal('1.112'))
+        self.assertEqual(self.totales()[0], Decimal('2.22'))
+
+    def test_reordenar_y_borrar_parada(self):
+        tercera = Ruta_Lugar.objects.create(ruta=self.ruta, lugar=self.lugares[2], orden=2)
+        # L0 -> L2 -> L1: ~2.22 + ~1.11
+        tercera.orden = 1
+        tercera.save()
+        Ruta_Lugar.objects.filter(ruta=self.ruta, lugar=self.lugares[1]).update(orden=5)
+        recalcular_rutas([self.ruta.pk])
+        self.assertEqual(self.totales()[0], Decimal('3.34'))
+
+        tercera.delete()
+        self.assertEqual(self.totales()[0], Decimal('1.11'))
+        Ruta_Lugar.objects.filter(ruta=self.ruta).delete()
+        self.assertEqual(self.totales(), (Decimal('0.00'), 0))
+
+    def test_mover_lugar_encola_el_recalculo(self):
+        lugar = self.lugares[1]
+        lugar.latitud = Decimal('-3.970')
+        with self.captureOnCommitCallbacks(execute=True):
+            lugar.save()
+        tarea = Tarea.objects.get(nombre='recalcular_rutas')
+        self.assertEqual(tarea.argumentos, [[self.ruta.pk]])
+        self.assertEqual(self.totales()[0], Decimal('1.11'))
+        recalcular_rutas(*tarea.argumentos)
+        self.assertEqual(self.totales()[0], Decimal('2.22'))
+
+    def test_editar_lugar_sin_moverlo_no_encola_nada(self):
+        lugar = self.lugares[1]
+        lugar.nombre = 'Otro nombre'
+        with self.captureOnCommitCallbacks(execute=True):
+            lugar.save(update_fields=['nombre'])
+        # save() completo: incluye latitud/longitud aunque no cambien
+        lugar.descripcion = 'Otra descripción'
+        with self.captureOnCommitCallbacks(execute=True):
+            lugar.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(
+                f'/api/lugares/{lugar.pk}/', {'descripcion': 'Vía la API'}, content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Tarea.objects.filter(nombre__in=['recalcular_rutas', 'calentar_geometria']).exists())
+
+    def test_comando_recalcular_rutas(self):
+        Ruta.objects.filter(pk=self.ruta.pk).update(distanciaEstimadaKm=0, duracionEstimadaSeg=0)
+        call_command('recalcular_rutas', stdout=StringIO())
+        self.assertEqual(self.totales()[0], Decimal('1.11'))
+
+    def test_respuesta_incluye_totales(self):
+        datos = self.client.get(f'/api/rutas/{self.ruta.pk}/').json()
+        self.assertEqual(datos['distanciaEstimadaKm'], '1.11')
+        self.assertGreater(datos['duracionEstimadaSeg'], 0)
@@ -0,0 +1,102 @@
+import itertools
+import random
+
+from django.test import SimpleTestCase
+
+from ..models import Ruta_Lugar
+from ..optimizador import longitud, matriz_distancias, optimizar_orden
+from .datos import ApiTestCase, autorizacion, crear_lugar, crear_ruta, crear_usuario
+
+
+def mejor_por_fuerza_bruta(d, inicio=None, fin=None):
+    n = len(d)
+    candidatos = (
+        c for c in itertools.permutations(range(n))
+        if (inicio is None or c[0] == inicio) and (fin is None or c[-1] == fin)
+    )
+    return min(longitud(list(c), d) for c in candidatos)
+
+
+class OptimizarOrdenTests(SimpleTestCase):
+
+    def test_cerca_del_optimo(self):
+        # Es una heurística: casi siempre da el óptimo y nunca se aleja mucho
+        azar = random.Random(7)
+        optimos = casos = 0
+        for _ in range(15):
+            puntos = [(-4 + azar.random() * 0.05, -79.2 + azar.random() * 0.05) for _ in range(7)]
+            d = matriz_distancias(puntos)
+            for inicio, fin in ((None, None), (0, None), (None, 3), (2, 5)):
+                with self.subTest(puntos=puntos, inicio=inicio, fin=fin):
+                    orden = optimizar_orden(d, inicio, fin)
+                    self.assertEqual(sorted(orden), list(range(7)))
+                    if inicio is not None:
+                        self.assertEqual(orden[0], inicio)
+                    if fin is not None:
+                        self.assertEqual(orden[-1], fin)
+                    obtenida, mejor = longitud(orden, d), mejor_por_fuerza_bruta(d, inicio, fin)
+                    self.assertLessEqual(obtenida, mejor * 1.05)
+                    optimos += obtenida - mejor < 1e-9
+                    casos += 1
+        self.assertGreaterEqual(optimos / casos, 0.9)
+
+    def test_casos_pequenos(self):
+        self.assertEqual(optimizar_orden([]), [])
+        self.assertEqual(optimizar_orden([[0.0]]), [0])
+        d = [[0.0, 1.0], [1.0, 0.0]]
+        self.assertEqual(optimizar_orden(d), [0, 1])
+        self.assertEqual(optimizar_orden(d, inicio=1), [1, 0])
+        self.assertEqual(optimizar_orden(d, fin=0), [1, 0])
+
+
+class OptimizarRutaTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Puntos en línea recta visitados en desorden
+        self.lugares = [crear_lugar(f'L{i}', -3.99 + i * 0.01, -79.2) for i in range(5)]
+        desorden = [self.lugares[i] for i in (2, 0, 4, 1, 3)]
+        self.autor = crear_usuario()
+        self.ruta = crear_ruta(self.autor, 'Zigzag', desorden)
+        self.url = f'/api/rutas/{self.ruta.pk}/optimizar/'
+
+    def orden_guardado(self):
+        return list(Ruta_Lugar.objects.filter(ruta=self.ruta).order_by('orden').values_list('lugar_id', flat=True))
+
+    def test_guarda_el_nuevo_orden(self):
+        response = self.client.post(
+            self.url, {'inicio': self.lugares[0].id}, content_type='application/json', **autorizacion(self.autor)
+        )
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertLess(datos['distancia_despues_km'], datos['distancia_antes_km'])
+        ids = [l.id for l in self.lugares]
+        self.assertEqual(self.orden_guardado(), ids)
+        self.assertEqual([p['lugar'] for p in datos['paradas']], ids)
+        # Las métricas de la ruta se recalculan con el nuevo orden
+        self.assertEqual(str(self.client.get(f'/api/rutas/{self.ruta.pk}/').json()['distanciaEstimadaKm']), '4.45')
+
+    def test_extremos_fijos(self):
+        datos = {'inicio': self.lugares[2].id, 'fin': self.lugares[4].id}
+        self.client.post(self.url, datos, content_type='application/json', **autorizacion(self.autor))
+        orden = self.orden_guardado()
+        self.assertEqual((orden[0], orden[-1]), (self.lugares[2].id, self.lugares[4].id))
+
+    def test_extremos_invalidos(self):
+        otro = crear_lugar('Fuera')
+        for datos in ({'inicio': otro.id}, {'fin': 'x'}, {'inicio': self.lugares[1].id, 'fin': self.lugares[1].id}):
+            with self.subTest(datos=datos):
+                response = self.client.post(self.url, datos, content_type='application/json', **autorizacion(self.autor))
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/rutas/999999/optimizar/', **autorizacion(self.autor)).status_code, 404)
+
+    def test_solo_el_autor(self):
+        antes = self.orden_guardado()
+        otro = crear_usuario('beto')
+        response = self.client.post(self.url, {}, content_type='application/json', **autorizacion(otro))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.orden_guardado(), antes)
+        self.assertEqual(self.client.post(self.url, {}, content_type='application/json').status_code, 401)
+        self.assertEqual(self.orden_guardado(), antes)
+        response = self.client.post(self.url, {}, content_type='application/json', **autorizacion(self.autor))
+        self.assertEqual(response.status_code, 200)
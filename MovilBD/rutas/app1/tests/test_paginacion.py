@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Evento, Ruta_Lugar
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+class PaginacionCursorTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        usuario = crear_usuario()
+        lugares = [crear_lugar(f'Lugar {i}') for i in range(8)]
+        # Tres rutas con las mismas posiciones: muchos empates en `orden`
+        for i in range(3):
+            crear_ruta(usuario, f'Ruta {i}', lugares)
+
+    def recorrer(self, url):
+        ids, enlaces, sql = [], [], []
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                datos = self.client.get(url).json()
+            sql += [c['sql'] for c in consultas]
+            ids += [fila['id'] for fila in datos['results']]
+            enlaces.append(datos)
+            url = datos['next']
+        return ids, enlaces, sql
+
+    def test_recorre_empates_sin_repetir_ni_saltar(self):
+        esperados = list(Ruta_Lugar.objects.order_by('orden', 'id').values_list('id', flat=True))
+        ids, paginas, sql = self.recorrer('/api/ruta-lugares/?page_size=5')
+        self.assertEqual(ids, esperados)
+        self.assertEqual(len(paginas), 5)
+        self.assertFalse(any('OFFSET' in consulta.upper() for consulta in sql))
+
+    def test_previous_vuelve_a_la_pagina_anterior(self):
+        primera = self.client.get('/api/ruta-lugares/?page_size=5').json()
+        segunda = self.client.get(primera['next']).json()
+        tercera = self.client.get(segunda['next']).json()
+        self.assertIsNone(primera['previous'])
+        self.assertEqual(self.client.get(tercera['previous']).json()['results'], segunda['results'])
+        self.assertEqual(self.client.get(segunda['previous']).json()['results'], primera['results'])
+
+    def test_fechas_con_empates(self):
+        lugar = crear_lugar('Plaza')
+        for i in range(7):
+            Evento.objects.create(nombre=f'E{i}', descripcion='-', fechaEvento='2030-05-01T10:00:00.123456Z', lugar=lugar)
+        esperados = list(Evento.objects.order_by('fechaEvento', 'id').values_list('id', flat=True))
+        ids, _, _ = self.recorrer('/api/eventos/?page_size=3')
+        self.assertEqual(ids, esperados)
+
+    def test_pagina_vacia_enlaza_a_la_anterior(self):
+        primera = self.client.get('/api/ruta-lugares/?page_size=5').json()
+        Ruta_Lugar.objects.exclude(id__in=[fila['id'] for fila in primera['results']]).delete()
+        vacia = self.client.get(primera['next']).json()
+        self.assertEqual(vacia['results'], [])
+        self.assertIsNone(vacia['next'])
+        self.assertEqual(self.client.get(vacia['previous']).json()['results'], primera['results'])
+
+    def test_cursor_invalido(self):
+        for cursor in ('no-es-base64', 'cD1bMV0=', 'cD1beyJhIjoxfSwxXQ=='):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f'/api/ruta-lugares/?cursor={cursor}').status_code, 404)
+
+    def test_page_size_maximo(self):
+        datos = self.client.get('/api/ruta-lugares/?page_size=1000').json()
+        self.assertEqual(len(datos['results']), min(200, Ruta_Lugar.objects.count()))
@@ -0,0 +1,172 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from ..models import Lugar, Usuario
+from ..replicas import COOKIE, ReplicaMiddleware, ReplicasRouter, _replica, comprobar_cache_compartida
+from .datos import CLAVE, autorizacion
+
+router = ReplicasRouter()
+
+
+def leer_desde(estado=200):
+    """
+    Vista que anota de qué base leería el ORM durante la petición.
+    """
+    vistas = []
+
+    def vista(request):
+        vistas.append(router.db_for_read(Lugar))
+        return HttpResponse(status=estado)
+
+    return vista, vistas
+
+
+# Sin transacción abierta: dentro de una el router lee siempre del primario
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], REPLICA_PEGAJOSO_SEG=10)
+class ReplicaMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_lecturas_a_una_replica(self):
+        vista, vistas = leer_desde()
+        response = ReplicaMiddleware(vista)(self.factory.get('/api/lugares/'))
+        self.assertIn(vistas[0], settings.DATABASE_REPLICAS)
+        self.assertNotIn(COOKIE, response.cookies)
+        # Fuera de la petición todo vuelve al primario
+        self.assertIsNone(_replica.get())
+        self.assertEqual(router.db_for_read(Lugar), 'default')
+
+    def test_escrituras_al_primario_y_cookie(self):
+        vista, vistas = leer_desde()
+        response = ReplicaMiddleware(vista)(self.factory.post('/api/favoritos/'))
+        self.assertEqual(vistas, ['default'])
+        self.assertEqual(response.cookies[COOKIE]['max-age'], 10)
+
+        request = self.factory.get('/api/favoritos/')
+        request.COOKIES[COOKIE] = '1'
+        ReplicaMiddleware(vista)(request)
+        self.assertEqual(vistas[-1], 'default')
+
+    def test_escritura_fallida_no_marca(self):
+        vista, _ = leer_desde(estado=400)
+        response = ReplicaMiddleware(vista)(self.factory.post('/api/favoritos/', **autorizacion(Usuario(id=1))))
+        self.assertNotIn(COOKIE, response.cookies)
+
+    def test_marca_por_token(self):
+        # Otro dispositivo del mismo usuario, sin la cookie
+        ana, beto = Usuario(id=1), Usuario(id=2)
+        vista, vistas = leer_desde()
+        ReplicaMiddleware(vista)(self.factory.patch('/api/usuarios/', **autorizacion(ana)))
+        ReplicaMiddleware(vista)(self.factory.get('/api/favoritos/', **autorizacion(ana)))
+        ReplicaMiddleware(vista)(self.factory.get('/api/favoritos/', **autorizacion(beto)))
+        ReplicaMiddleware(vista)(self.factory.get('/api/favoritos/', HTTP_AUTHORIZATION='Bearer falso'))
+        self.assertEqual(vistas[1], 'default')
+        self.assertIn(vistas[2], settings.DATABASE_REPLICAS)
+        self.assertIn(vistas[3], settings.DATABASE_REPLICAS)
+
+    def test_asincrono(self):
+        vistas = []
+
+        async def vista(request):
+            vistas.append(router.db_for_read(Lugar))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(vista)
+        async_to_sync(middleware)(self.factory.get('/api/async/lugares/'))
+        response = async_to_sync(middleware)(self.factory.delete('/api/favoritos/1/'))
+        self.assertIn(vistas[0], settings.DATABASE_REPLICAS)
+        self.assertEqual(vistas[1], 'default')
+        self.assertIn(COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sin_replicas_no_interviene(self):
+        vista, vistas = leer_desde()
+        response = ReplicaMiddleware(vista)(self.factory.post('/api/favoritos/'))
+        ReplicaMiddleware(vista)(self.factory.get('/api/lugares/'))
+        self.assertEqual(vistas, ['default', 'default'])
+        self.assertNotIn(COOKIE, response.cookies)
+
+
+class CacheCompartidaCheckTests(SimpleTestCase):
+
+    def test_replicas_con_cache_local(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(DATABASE_REPLICAS=['replica1'], CACHES=locmem):
+            self.assertEqual([e.id for e in comprobar_cache_compartida(None)], ['app1.E001'])
+        with override_settings(DATABASE_REPLICAS=['replica1'], CACHES=redis):
+            self.assertEqual(comprobar_cache_compartida(None), [])
+        with override_settings(DATABASE_REPLICAS=[], CACHES=locmem):
+            self.assertEqual(comprobar_cache_compartida(None), [])
+
+
+class ReplicasRouterTests(TestCase):
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_con_el_cliente(self):
+        response = self.client.post(
+            '/api/usuarios/', {'username': 'carla', 'email': 'carla@example.com', 'password': CLAVE},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(COOKIE, response.cookies)
+
+    def test_transaccion_lee_del_primario(self):
+        token = _replica.set('replica1')
+        self.addCleanup(_replica.reset, token)
+        # TestCase ya abre una transacción
+        self.assertEqual(router.db_for_read(Lugar), 'default')
+        with mock.patch.object(transaction.get_connection(), 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(Lugar), 'replica1')
+        self.assertEqual(router.db_for_write(Lugar), 'default')
+
+    def test_solo_se_migra_el_primario(self):
+        self.assertTrue(router.allow_migrate('default', 'app1'))
+        self.assertFalse(router.allow_migrate('replica1', 'app1'))
+
+
+class CopiarReplicasTests(SimpleTestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta)
+
+    def base(self, nombre):
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(self.carpeta, nombre)}
+
+    def test_sin_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]), self.assertRaises(CommandError):
+            call_command('copiar_replicas', stdout=StringIO())
+
+    def test_copia(self):
+        primario, replica = self.base('primario.sqlite3'), self.base('replica.sqlite3')
+        with sqlite3.connect(primario['NAME']) as conexion:
+            conexion.execute('CREATE TABLE t (n INTEGER)')
+            conexion.execute('INSERT INTO t VALUES (7)')
+        conexion.close()
+        bases = {'default': primario, 'replica1': replica}
+        with mock.patch.dict(settings.DATABASES, bases), override_settings(DATABASE_REPLICAS=['replica1']):
+            call_command('copiar_replicas', stdout=StringIO())
+        conexion = sqlite3.connect(replica['NAME'])
+        self.addCleanup(conexion.close)
+        self.assertEqual(conexion.execute('SELECT n FROM t').fetchall(), [(7,)])
+
+    def test_solo_sqlite(self):
+        bases = {'replica1': {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'x'}}
+        with mock.patch.dict(settings.DATABASES, bases), override_settings(DATABASE_REPLICAS=['replica1']):
+            with self.assertRaises(CommandError):
+                call_command('copiar_replicas', stdout=StringIO())
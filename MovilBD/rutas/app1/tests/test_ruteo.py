@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import ruteo
+from ..metricas import calentar_geometria
+from ..models import Tarea
+from ..tareas import ejecutar, reclamar
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+def extracto_osm(directorio):
+    """
+    Calle residencial recta de -3.99 a -3.98 de latitud (lon -79.2), con una
+    vía privada que no se puede usar.
+    """
+    nodos = ''.join(
+        f'<node id="{i}" lat="{-3.99 + i * 0.0025:.4f}" lon="-79.2"/>' for i in range(5)
+    ) + '<node id="10" lat="-3.985" lon="-79.19"/>'
+    vias = (
+        '<way id="1">' + ''.join(f'<nd ref="{i}"/>' for i in range(5))
+        + '<tag k="highway" v="residential"/></way>'
+        '<way id="2"><nd ref="2"/><nd ref="10"/><tag k="highway" v="service"/><tag k="access" v="private"/></way>'
+    )
+    ruta = os.path.join(directorio, 'prueba.osm')
+    with open(ruta, 'w') as f:
+        f.write(f'<?xml version="1.0"?><osm version="0.6">{nodos}{vias}</osm>')
+    return ruta
+
+
+class PolylineTests(SimpleTestCase):
+
+    def test_ejemplo_de_google(self):
+        puntos = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(ruteo.codificar_polyline(puntos), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+
+
+class GrafoTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.osm = extracto_osm(self.directorio)
+        ruteo._grafos.clear()
+        self.addCleanup(ruteo._grafos.clear)
+
+    def test_construir_y_trazar(self):
+        grafo = ruteo.construir_grafos(self.osm, ['walking'])['walking']
+        # La vía privada no entra en el grafo
+        self.assertEqual(grafo.num_nodos, 5)
+        self.assertTrue(os.path.exists(ruteo._ruta_cache(self.osm, 'walking')))
+        s, t = grafo.nodo_cercano(-3.99, -79.2), grafo.nodo_cercano(-3.98, -79.2)
+        nodos, segundos, metros = grafo.camino(s, t)
+        self.assertEqual(len(nodos), 5)
+        self.assertAlmostEqual(metros, ruteo.distancia_m(-3.99, -79.2, -3.98, -79.2), delta=1)
+        self.assertIsNone(grafo.nodo_cercano(-3.5, -79.2))
+
+    def test_cota_de_landmarks_admisible(self):
+        grafo = ruteo.construir_grafos(self.osm, ['walking'])['walking']
+        # Tablas en doble precisión, como las sumas de A*
+        self.assertEqual({tabla.typecode for tabla in grafo.landmarks_desde + grafo.landmarks_hacia}, {'d'})
+        for v in range(grafo.num_nodos):
+            for t in range(grafo.num_nodos):
+                with self.subTest(v=v, t=t):
+                    # En esta calle recta la cota en línea recta es exacta: margen de redondeo
+                    self.assertLessEqual(grafo._heuristica(v, t), grafo.camino(v, t)[1] + 1e-3)
+
+
+class GrafoEnColaTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.osm = extracto_osm(self.directorio)
+        ajustes = override_settings(RUTEO_OSM_PATH=self.osm)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        ruteo._grafos.clear()
+        self.addCleanup(ruteo._grafos.clear)
+
+        lugares = [crear_lugar('Sur', -3.99, -79.2), crear_lugar('Norte', -3.98, -79.2)]
+        self.ruta = crear_ruta(crear_usuario(), 'Recta', lugares)
+        self.url = f'/api/rutas/{self.ruta.pk}/geometria/'
+
+    def test_sin_extracto(self):
+        with override_settings(RUTEO_OSM_PATH=os.path.join(self.directorio, 'no-existe.osm')):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn('Retry-After', response)
+        self.assertFalse(Tarea.objects.filter(nombre='construir_grafo').exists())
+
+    def test_la_peticion_encola_la_compilacion(self):
+        for _ in range(3):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], str(ruteo.GrafoEnConstruccion.reintentar_en))
+        # Nada se compila en la petición y solo queda una tarea pendiente
+        self.assertFalse(os.path.exists(ruteo._ruta_cache(self.osm, 'walking')))
+        tarea = Tarea.objects.get(nombre='construir_grafo')
+        self.assertEqual(tarea.argumentos, ['walking'])
+
+        self.assertTrue(ejecutar(reclamar('prueba')))
+        # Otro proceso lee el grafo del disco
+        ruteo._grafos.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(len(datos['tramos']), 1)
+        self.assertFalse(datos['tramos'][0]['aproximado'])
+
+    def test_extracto_modificado_se_recompila_en_la_cola(self):
+        ruteo.construir_grafos(self.osm, ['walking'])
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        os.utime(self.osm, (0, os.path.getmtime(self.osm) + 10))
+        self.assertEqual(self.client.get(self.url).status_code, 503)
+        self.assertTrue(Tarea.objects.filter(nombre='construir_grafo', estado=Tarea.PENDIENTE).exists())
+
+    def test_preparar_grafo_no_recompila_si_esta_al_dia(self):
+        ruteo.construir_grafos(self.osm, ['walking'])
+        archivo = ruteo._ruta_cache(self.osm, 'walking')
+        antes = os.path.getmtime(archivo)
+        ruteo._grafos.clear()
+        ruteo.preparar_grafo('walking')
+        self.assertEqual(os.path.getmtime(archivo), antes)
+
+    def test_calentar_geometria_se_reintenta(self):
+        with self.assertRaises(ruteo.GrafoEnConstruccion):
+            calentar_geometria(self.ruta.pk)
+        with override_settings(RUTEO_OSM_PATH=os.path.join(self.directorio, 'no-existe.osm')):
+            calentar_geometria(self.ruta.pk)
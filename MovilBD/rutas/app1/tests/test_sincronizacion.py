@@ -0,0 +1,109 @@
+from ..models import CambioSync, Favorito
+from .datos import ApiTestCase, crear_catalogo, crear_lugar
+
+
+class SyncTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def sync(self, token=0, **params):
+        response = self.client.get('/api/sync/', {'since': token, **params})
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response.json()
+
+    def ids(self, respuesta, recurso):
+        return sorted(fila['id'] for fila in respuesta['cambios'].get(recurso, []))
+
+    def test_sincronizacion_completa(self):
+        datos = self.sync()
+        self.assertFalse(datos['mas'])
+        self.assertEqual(self.ids(datos, 'lugares'), sorted(l.id for l in self.datos['lugares']))
+        self.assertEqual(self.ids(datos, 'rutas'), sorted(r.id for r in self.datos['rutas']))
+        self.assertEqual(self.ids(datos, 'categorias'), sorted(c.id for c in self.datos['categorias']))
+        self.assertEqual(datos['borrados'], {})
+        # Sin cambios después del token no vuelve nada
+        vacia = self.sync(datos['token'])
+        self.assertEqual((vacia['token'], vacia['cambios'], vacia['borrados']), (datos['token'], {}, {}))
+
+    def test_solo_lo_cambiado(self):
+        token = self.sync()['token']
+        lugar = self.datos['lugares'][1]
+        lugar.nombre = 'Renombrado'
+        lugar.save()
+        datos = self.sync(token)
+        self.assertEqual(self.ids(datos, 'lugares'), [lugar.id])
+        self.assertEqual(datos['cambios']['lugares'][0]['nombre'], 'Renombrado')
+        # Y las filas que muestran el lugar; nada más
+        self.assertEqual(self.ids(datos, 'eventos'), sorted(e.id for e in lugar.evento_set.all()))
+        self.assertEqual(self.ids(datos, 'ruta-lugares'), sorted(p.id for p in lugar.ruta_lugar_set.all()))
+        self.assertNotIn('rutas', datos['cambios'])
+        self.assertGreater(datos['token'], token)
+
+    def test_lapidas(self):
+        token = self.sync()['token']
+        ruta = self.datos['rutas'][0]
+        paradas = list(ruta.ruta_lugar_set.values_list('id', flat=True))
+        ruta_id = ruta.id
+        ruta.delete()
+        datos = self.sync(token)
+        self.assertEqual(datos['borrados']['rutas'], [ruta_id])
+        self.assertEqual(sorted(datos['borrados']['ruta-lugares']), sorted(paradas))
+        self.assertNotIn(ruta_id, self.ids(datos, 'rutas'))
+
+        # Un cliente nuevo también recibe la lápida y no la fila
+        completa = self.sync()
+        self.assertIn(ruta_id, completa['borrados']['rutas'])
+        self.assertNotIn(ruta_id, self.ids(completa, 'rutas'))
+
+    def test_cambio_en_fila_relacionada(self):
+        token = self.sync()['token']
+        categoria = self.datos['categorias'][0]
+        categoria.nombre = 'Parques y jardines'
+        categoria.save()
+        datos = self.sync(token)
+        self.assertEqual(self.ids(datos, 'categorias'), [categoria.id])
+        self.assertEqual(self.ids(datos, 'lugares'), sorted(l.id for l in categoria.lugares.all()))
+        self.assertEqual(self.ids(datos, 'rutas'), sorted(r.id for r in categoria.rutas.all()))
+
+    def test_contadores_y_escrituras_en_bloque(self):
+        token = self.sync()['token']
+        lugar = crear_lugar('Nuevo', -3.95, -79.2)
+        Favorito.objects.create(usuario=self.datos['usuarios'][1], lugar=self.datos['lugares'][0], tipo='VISIT')
+        # Mover un lugar recalcula en bloque las rutas que lo visitan
+        parada = self.datos['rutas'][0].ruta_lugar_set.first()
+        parada.lugar = lugar
+        parada.save()
+        datos = self.sync(token)
+        self.assertIn(self.datos['lugares'][0].id, self.ids(datos, 'lugares'))
+        self.assertIn(lugar.id, self.ids(datos, 'lugares'))
+        self.assertIn(parada.id, self.ids(datos, 'ruta-lugares'))
+        self.assertIn(self.datos['rutas'][0].id, self.ids(datos, 'rutas'))
+
+    def test_el_registro_no_crece_con_las_ediciones(self):
+        lugar = self.datos['lugares'][0]
+        antes = CambioSync.objects.count()
+        for i in range(5):
+            lugar.nombre = f'Edición {i}'
+            lugar.save()
+        self.assertEqual(CambioSync.objects.count(), antes)
+
+    def test_por_partes(self):
+        total = CambioSync.objects.count()
+        token, vistos, respuestas = 0, 0, 0
+        while True:
+            datos = self.sync(token, limit=5)
+            vistos += sum(len(filas) for filas in datos['cambios'].values())
+            vistos += sum(len(ids) for ids in datos['borrados'].values())
+            token = datos['token']
+            respuestas += 1
+            if not datos['mas']:
+                break
+        self.assertEqual(vistos, total)
+        self.assertEqual(respuestas, total // 5 + 1)
+
+    def test_parametros_invalidos(self):
+        for params in ({'since': 'x'}, {'since': -1}, {'limit': 0}, {'limit': 5001}, {'limit': 'a'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/sync/', params).status_code, 400)
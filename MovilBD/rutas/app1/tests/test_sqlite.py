@@ -0,0 +1,58 @@
+import importlib
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+migracion = importlib.import_module('app1.migrations.0015_sqlite_wal')
+
+
+def journal_mode(ruta):
+    conexion = sqlite3.connect(ruta)
+    try:
+        return conexion.execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        conexion.close()
+
+
+class JournalModeTests(SimpleTestCase):
+    """
+    journal_mode se fija una vez (migración 0015), no en cada conexión.
+    """
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta)
+        self.ruta = os.path.join(carpeta, 'db.sqlite3')
+        sqlite3.connect(self.ruta).execute('CREATE TABLE t (id INTEGER)').connection.close()
+
+    def conectar(self):
+        ajustes = {**connections['default'].settings_dict, 'NAME': self.ruta}
+        conexion = DatabaseWrapper(ajustes, alias='prueba_wal')
+        self.addCleanup(conexion.close)
+        return conexion
+
+    def test_init_command_no_cambia_el_archivo(self):
+        init_command = settings.DATABASES['default']['OPTIONS']['init_command']
+        self.assertNotIn('journal_mode', init_command)
+        self.assertIn('busy_timeout', init_command)
+        conexion = self.conectar()
+        conexion.ensure_connection()
+        conexion.close()
+        self.assertEqual(journal_mode(self.ruta), 'delete')
+
+    def test_migracion(self):
+        conexion = self.conectar()
+        with conexion.schema_editor(atomic=False) as editor:
+            migracion.activar_wal(None, editor)
+        conexion.close()
+        self.assertEqual(journal_mode(self.ruta), 'wal')
+        with conexion.schema_editor(atomic=False) as editor:
+            migracion.desactivar_wal(None, editor)
+        conexion.close()
+        self.assertEqual(journal_mode(self.ruta), 'delete')
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import tareas
+from ..models import Tarea
+from ..tareas import ejecutar, encolar, purgar, reclamar
+
+LLAMADAS = []
+
+
+def anotar(*args):
+    LLAMADAS.append(args)
+
+
+def fallar(*args):
+    raise RuntimeError('sin conexión')
+
+
+@mock.patch.dict(tareas.TAREAS, {
+    'anotar': 'app1.tests.test_tareas.anotar',
+    'fallar': 'app1.tests.test_tareas.fallar',
+})
+class ColaTests(TestCase):
+
+    def setUp(self):
+        LLAMADAS.clear()
+
+    def test_ejecuta_con_sus_argumentos(self):
+        tarea = encolar('anotar', 1, 'dos')
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+        reclamada = reclamar('t1')
+        self.assertEqual((reclamada.pk, reclamada.estado, reclamada.intentos), (tarea.pk, Tarea.EN_CURSO, 1))
+        self.assertIsNotNone(reclamada.bloqueada_hasta)
+        self.assertTrue(ejecutar(reclamada))
+        self.assertEqual(LLAMADAS, [(1, 'dos')])
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.HECHA)
+        self.assertIsNotNone(tarea.terminada)
+        self.assertIsNone(reclamar('t1'))
+
+    def test_tarea_desconocida(self):
+        with self.assertRaises(ValueError):
+            encolar('borrar_todo')
+
+    def test_clave_no_duplica_pendientes(self):
+        primera = encolar('anotar', 1, clave='ruta:1')
+        self.assertEqual(encolar('anotar', 1, clave='ruta:1').pk, primera.pk)
+        self.assertNotEqual(encolar('anotar', 1, clave='ruta:2').pk, primera.pk)
+        # Ya en curso: un cambio posterior necesita otra ejecución
+        reclamar('t1')
+        self.assertNotEqual(encolar('anotar', 1, clave='ruta:1').pk, primera.pk)
+
+    def test_prioridad_y_retraso(self):
+        normal = encolar('anotar', 'normal')
+        urgente = encolar('anotar', 'urgente', prioridad=10)
+        encolar('anotar', 'luego', prioridad=20, retraso=timedelta(minutes=5))
+        self.assertEqual([reclamar('t').pk for _ in range(2)], [urgente.pk, normal.pk])
+        self.assertIsNone(reclamar('t'))
+
+    def test_reintentos_con_espera_exponencial(self):
+        tarea = encolar('fallar', max_intentos=3)
+        for intento in (1, 2):
+            antes = timezone.now()
+            with self.assertLogs('app1.tareas', 'WARNING'):
+                self.assertFalse(ejecutar(reclamar('t1')))
+            tarea.refresh_from_db()
+            self.assertEqual((tarea.estado, tarea.intentos), (Tarea.PENDIENTE, intento))
+            self.assertIn('RuntimeError: sin conexión', tarea.error)
+            espera = (tarea.disponible_en - antes).total_seconds()
+            base = tareas.ESPERA_BASE.total_seconds() * 2 ** (intento - 1)
+            self.assertGreaterEqual(espera, base * 0.8)
+            self.assertLessEqual(espera, base * 1.2 + 1)
+            # Hasta que pase la espera no se vuelve a reclamar
+            self.assertIsNone(reclamar('t1'))
+            Tarea.objects.filter(pk=tarea.pk).update(disponible_en=timezone.now())
+
+        with self.assertLogs('app1.tareas', 'WARNING'):
+            self.assertFalse(ejecutar(reclamar('t1')))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.FALLIDA, 3))
+        self.assertIsNotNone(tarea.terminada)
+        self.assertIsNone(reclamar('t1'))
+
+    def test_arriendo_vencido(self):
+        tarea = encolar('anotar', 'x')
+        primera = reclamar('muerto')
+        self.assertIsNone(reclamar('vivo'))
+        Tarea.objects.filter(pk=tarea.pk).update(bloqueada_hasta=timezone.now() - timedelta(seconds=1))
+        segunda = reclamar('vivo')
+        self.assertEqual((segunda.pk, segunda.trabajador, segunda.intentos), (tarea.pk, 'vivo', 2))
+        # El primer trabajador no pisa el estado de quien la tiene ahora
+        ejecutar(primera)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.trabajador), (Tarea.EN_CURSO, 'vivo'))
+        self.assertTrue(ejecutar(segunda))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.HECHA)
+
+    def test_arriendo_vencido_en_todos_los_intentos(self):
+        tarea = encolar('anotar', max_intentos=2)
+        for _ in range(3):
+            Tarea.objects.filter(pk=tarea.pk).update(bloqueada_hasta=timezone.now() - timedelta(seconds=1))
+            reclamada = reclamar('t1')
+        self.assertFalse(ejecutar(reclamada))
+        self.assertEqual(LLAMADAS, [])
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertIn('Arriendo vencido', tarea.error)
+
+    def test_purgar(self):
+        hace_mucho = timezone.now() - timedelta(days=8)
+        vieja = Tarea.objects.create(nombre='anotar', estado=Tarea.HECHA, terminada=hace_mucho)
+        fallida = Tarea.objects.create(nombre='anotar', estado=Tarea.FALLIDA, terminada=hace_mucho)
+        reciente = Tarea.objects.create(nombre='anotar', estado=Tarea.HECHA, terminada=timezone.now())
+        self.assertEqual(purgar(), 1)
+        self.assertFalse(Tarea.objects.filter(pk=vieja.pk).exists())
+        self.assertEqual(Tarea.objects.filter(pk__in=[fallida.pk, reciente.pk]).count(), 2)
+
+    def test_comando_trabajador(self):
+        for i in range(3):
+            encolar('anotar', i)
+        encolar('fallar', max_intentos=1)
+        with mock.patch('signal.signal'), self.assertLogs('app1.tareas', 'WARNING'):
+            call_command('trabajador', '--una-vez', stdout=StringIO())
+        self.assertEqual(sorted(LLAMADAS), [(0,), (1,), (2,)])
+        self.assertEqual(
+            sorted(Tarea.objects.values_list('estado', flat=True)),
+            [Tarea.FALLIDA] + [Tarea.HECHA] * 3,
+        )
@@ -0,0 +1,45 @@
+from ..models import Ruta, Ruta_Guardada, Ruta_Lugar
+from .datos import ApiTestCase, crear_lugar, crear_ruta, crear_usuario
+
+
+class TiempoTotalTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuarios = [crear_usuario('ana'), crear_usuario('beto'), crear_usuario('carla')]
+        lugares = [crear_lugar(f'L{i}', -3.99 + i * 0.01, -79.2) for i in range(3)]
+        # Tres paradas de 30 minutos y ~2.2 km a pie (~29 minutos)
+        self.ruta = crear_ruta(self.usuarios[0], 'Norte', lugares)
+        self.vacia = crear_ruta(self.usuarios[0], 'Vacía')
+
+    def esperado(self, ruta):
+        ruta = Ruta.objects.get(pk=ruta.pk)
+        paradas = sum(Ruta_Lugar.objects.filter(ruta=ruta).values_list('tiempo_sugerido_minutos', flat=True))
+        return ruta.duracionEstimadaSeg // 60 + paradas
+
+    def test_anotado_igual_que_en_python(self):
+        anotadas = {r.pk: r.tiempo_total_estimado for r in Ruta.objects.con_tiempo_total()}
+        self.assertEqual(anotadas[self.ruta.pk], self.esperado(self.ruta))
+        self.assertEqual(anotadas[self.ruta.pk], 90 + 29)
+        self.assertEqual(anotadas[self.vacia.pk], 0)
+        # Sin anotar, la propiedad suma las paradas
+        self.assertEqual(Ruta.objects.get(pk=self.ruta.pk).tiempo_total_estimado, 90 + 29)
+
+    def test_guardados_no_multiplican_la_suma(self):
+        for usuario in self.usuarios:
+            Ruta_Guardada.objects.create(usuario=usuario, ruta=self.ruta, orden=0)
+        datos = self.client.get(f'/api/rutas/{self.ruta.pk}/').json()
+        self.assertEqual(datos['num_guardados'], 3)
+        self.assertEqual(datos['tiempo_total_estimado'], self.esperado(self.ruta))
+
+    def test_cambia_con_las_paradas(self):
+        parada = Ruta_Lugar.objects.filter(ruta=self.ruta).first()
+        parada.tiempo_sugerido_minutos = 90
+        parada.save()
+        datos = self.resultados(self.client.get(f'/api/rutas/?ids={self.ruta.pk}'))
+        self.assertEqual(datos[0]['tiempo_total_estimado'], self.esperado(self.ruta))
+        self.assertEqual(datos[0]['tiempo_total_estimado'], 150 + 29)
+
+    def test_ordenar_por_tiempo_total(self):
+        orden = list(Ruta.objects.con_tiempo_total().order_by('tiempo_total_estimado').values_list('pk', flat=True))
+        self.assertEqual(orden, [self.vacia.pk, self.ruta.pk])
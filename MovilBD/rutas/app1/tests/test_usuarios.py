@@ -0,0 +1,72 @@
+from ..models import Favorito, Ruta_Guardada
+from .datos import ApiTestCase, crear_catalogo
+
+
+class ListasDelUsuarioTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+        self.ana, self.beto = self.datos['usuarios']
+
+    def test_favoritos_por_tipo(self):
+        lugares = self.datos['lugares']
+        Favorito.objects.create(usuario=self.ana, lugar=lugares[0], tipo='PEND')
+        Favorito.objects.create(usuario=self.beto, lugar=lugares[1], tipo='FAV')
+
+        favoritos = self.client.get(f'/api/usuarios/{self.ana.id}/favoritos/').json()
+        self.assertEqual([l['id'] for l in favoritos], [l.id for l in lugares])
+        self.assertIn('categorias', favoritos[0])
+
+        pendientes = self.client.get(f'/api/usuarios/{self.ana.id}/favoritos/?tipo=PEND').json()
+        self.assertEqual([l['id'] for l in pendientes], [lugares[0].id])
+        self.assertEqual(self.client.get(f'/api/usuarios/{self.ana.id}/favoritos/?tipo=VISIT').json(), [])
+
+    def test_favoritos_tipo_invalido(self):
+        response = self.client.get(f'/api/usuarios/{self.ana.id}/favoritos/?tipo=OTRO')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tipo', response.json())
+
+    def test_rutas_guardadas(self):
+        rutas = self.client.get(f'/api/usuarios/{self.ana.id}/rutas_guardadas/').json()
+        self.assertEqual(sorted(r['id'] for r in rutas), sorted(r.id for r in self.datos['rutas']))
+        self.assertIn('categorias', rutas[0])
+        self.assertEqual(self.client.get(f'/api/usuarios/{self.beto.id}/rutas_guardadas/').json(), [])
+
+    def test_rutas_guardadas_en_orden(self):
+        # Beto guarda rutas que Ana también guardó: sin repetirlas, la última primero
+        rutas = self.datos['rutas']
+        for ruta in (rutas[2], rutas[0]):
+            Ruta_Guardada.objects.create(usuario=self.beto, ruta=ruta, orden=0)
+        guardadas = self.client.get(f'/api/usuarios/{self.beto.id}/rutas_guardadas/').json()
+        self.assertEqual([r['id'] for r in guardadas], [rutas[0].id, rutas[2].id])
+        esperadas = Ruta_Guardada.objects.filter(usuario=self.ana).order_by('-id').values_list('ruta', flat=True)
+        guardadas = self.client.get(f'/api/usuarios/{self.ana.id}/rutas_guardadas/').json()
+        self.assertEqual([r['id'] for r in guardadas], list(esperadas))
+
+    def test_usuario_inexistente(self):
+        self.assertEqual(self.client.get('/api/usuarios/999999/favoritos/').status_code, 404)
+        self.assertEqual(self.client.get('/api/usuarios/999999/rutas_guardadas/').status_code, 404)
+
+
+class BusquedaPorIdsTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def test_lugares_y_rutas_por_ids(self):
+        lugares, rutas = self.datos['lugares'], self.datos['rutas']
+        ids = f'{lugares[2].id},{lugares[0].id},999999'
+        encontrados = self.resultados(self.client.get(f'/api/lugares/?ids={ids}'))
+        self.assertEqual(sorted(l['id'] for l in encontrados), sorted([lugares[0].id, lugares[2].id]))
+
+        encontradas = self.resultados(self.client.get(f'/api/rutas/?ids={rutas[1].id},'))
+        self.assertEqual([r['id'] for r in encontradas], [rutas[1].id])
+
+    def test_ids_mal_formados(self):
+        for url in ('/api/lugares/?ids=1,a,3', '/api/rutas/?ids=1;2'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.json())
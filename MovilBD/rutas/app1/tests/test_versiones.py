@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from ..models import Categoria, Evento, Parroquia
+from ..versiones import obtener_version, recursos_de
+from .datos import ApiTestCase, crear_catalogo
+
+
+class GetCondicionalTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.datos = crear_catalogo()
+
+    def test_304_con_if_none_match(self):
+        for url in ('/api/lugares/', '/api/rutas/', '/api/categorias/', '/api/eventos/',
+                    f'/api/lugares/{self.datos["lugares"][0].id}/'):
+            with self.subTest(url=url):
+                primera = self.client.get(url)
+                self.assertEqual(primera['Cache-Control'], 'no-cache')
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], primera['ETag'])
+                # Solo se lee el sello
+                self.assertEqual(len(consultas), 1)
+
+    def test_etag_debil_lista_y_comodin(self):
+        etag = self.client.get('/api/lugares/')['ETag']
+        for cabecera in (f'W/{etag}', f'"otro", {etag}', '*'):
+            with self.subTest(cabecera=cabecera):
+                self.assertEqual(self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH=cabecera).status_code, 304)
+        self.assertEqual(self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+    def test_etag_depende_de_la_url_y_del_formato(self):
+        etag = self.client.get('/api/lugares/')['ETag']
+        self.assertNotEqual(self.client.get('/api/lugares/?page_size=1')['ETag'], etag)
+        self.assertNotEqual(self.client.get('/api/lugares/', HTTP_ACCEPT='text/html')['ETag'], etag)
+
+    def test_escritura_invalida(self):
+        etag = self.client.get('/api/lugares/')['ETag']
+        # Un modelo relacionado (la ubicación) también cambia la respuesta
+        parroquia = Parroquia.objects.first()
+        parroquia.nombre = 'Sucre'
+        parroquia.save()
+        response = self.client.get('/api/lugares/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_m2m_invalida(self):
+        ruta = self.datos['rutas'][0]
+        etag = self.client.get('/api/rutas/')['ETag']
+        ruta.categorias.add(Categoria.objects.create(nombre='Nueva'))
+        self.assertEqual(self.client.get('/api/rutas/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_escritura_de_otro_recurso_no_invalida(self):
+        etag = self.client.get('/api/categorias/')['ETag']
+        Evento.objects.create(nombre='Nuevo', descripcion='-', fechaEvento='2031-01-01T10:00:00Z',
+                              lugar=self.datos['lugares'][0])
+        self.assertEqual(self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_modified_since(self):
+        modificado = obtener_version('eventos').modificado.timestamp()
+        posterior = http_date(modificado + 1)
+        self.assertEqual(self.client.get('/api/eventos/', HTTP_IF_MODIFIED_SINCE=posterior).status_code, 304)
+        anterior = http_date(modificado - 60)
+        self.assertEqual(self.client.get('/api/eventos/', HTTP_IF_MODIFIED_SINCE=anterior).status_code, 200)
+        # If-None-Match tiene prioridad
+        response = self.client.get(
+            '/api/eventos/', HTTP_IF_MODIFIED_SINCE=posterior, HTTP_IF_NONE_MATCH='"otro"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_del_mismo_segundo(self):
+        primera = self.client.get('/api/eventos/')
+        # Otra escritura en el mismo segundo: Last-Modified no cambia
+        version = obtener_version('eventos')
+        version.version += 1
+        version.modificado = version.modificado.replace(microsecond=999999)
+        version.save()
+        response = self.client.get('/api/eventos/', HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], primera['Last-Modified'])
+        self.assertNotEqual(response['ETag'], primera['ETag'])
+
+    def test_errores_sin_etag(self):
+        response = self.client.get('/api/lugares/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_recursos_de(self):
+        self.assertEqual(sorted(recursos_de('Categoria')), ['categorias', 'lugares', 'rutas'])
+        self.assertEqual(recursos_de('Favorito'), [])
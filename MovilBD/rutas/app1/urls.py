@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import asincrono, views
 
 router = DefaultRouter()
 
@@ -16,10 +16,22 @@ router.register(r'ruta-lugares', views.Ruta_LugarViewSet, basename='rutalugar')
 router.register(r'publicaciones', views.PublicacionViewSet, basename='publicacion')
 router.register(r'administradores', views.AdministradorLugarViewSet, basename='administradorlugar')
 router.register(r'comentarios', views.ComentarioViewSet, basename='comentario')
+router.register(r'buscar', views.BusquedaViewSet, basename='buscar')
+router.register(r'sync', views.SyncViewSet, basename='sync')
 
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+
+    # Mismos GET en vistas async para servir con ASGI (app1/asincrono.py)
+    path('async/lugares/', asincrono.lugares, name='async_lugares'),
+    path('async/lugares/<int:pk>/', asincrono.lugar, name='async_lugar'),
+    path('async/rutas/', asincrono.rutas, name='async_rutas'),
+    path('async/rutas/<int:pk>/', asincrono.ruta, name='async_ruta'),
+    path('async/eventos/', asincrono.eventos, name='async_eventos'),
+    path('async/publicaciones/feed/', asincrono.feed, name='async_feed'),
+    path('async/comentarios/', asincrono.comentarios, name='async_comentarios'),
     
     path('ajax/load-cantones/', views.load_cantones, name='ajax_load_cantones'),
     path('ajax/load-parroquias/', views.load_parroquias, name='ajax_load_parroquias'),
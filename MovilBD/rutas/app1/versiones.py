@@ -0,0 +1,167 @@
+"""
+Versiones de recursos de la API y GET condicional (ETag / Last-Modified).
+
+Cada recurso de DEPENDENCIAS tiene un sello en VersionRecurso que
+app1/signals.py incrementa cuando se escribe cualquier modelo cuyo contenido
+aparece en sus respuestas. El sello se guarda en la base de datos (no en la
+caché local) para que todos los procesos vean el mismo valor. Además del
+GET condicional del catálogo, app1/cache_respuestas.py lo usa en sus claves.
+
+Con If-None-Match / If-Modified-Since vigentes la vista responde 304 tras
+leer solo el sello, sin ejecutar el queryset ni el serializador.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+# Recurso de la API -> modelos cuyos cambios alteran sus respuestas.
+# Favorito y Ruta_Guardada no aparecen: sus contadores invalidan el catálogo
+# con retraso (ver app1/contadores.py), no en cada marca.
+DEPENDENCIAS = {
+    'categorias': ('Categoria',),
+    'lugares': ('Lugar', 'Lugar_categorias', 'Categoria', 'Parroquia', 'Canton', 'Provincia'),
+    'rutas': ('Ruta', 'Ruta_categorias', 'Categoria', 'Usuario', 'Ruta_Lugar', 'Lugar'),
+    'eventos': ('Evento', 'Lugar'),
+    'resenas': ('Resena', 'Usuario', 'Lugar', 'Ruta'),
+    'ruta-lugares': ('Ruta_Lugar', 'Ruta', 'Lugar'),
+    'publicaciones': (
+        'Publicacion', 'Usuario', 'Lugar', 'AdministradorLugar',
+        'Comentario',  # conteos y últimos comentarios del feed
+    ),
+}
+
+
+def recursos_de(nombre_modelo):
+    return [recurso for recurso, modelos in DEPENDENCIAS.items() if nombre_modelo in modelos]
+
+
+def tocar(*recursos):
+    """
+    Incrementa el sello de los recursos indicados.
+    """
+    from .models import VersionRecurso
+
+    if recursos:
+        VersionRecurso.objects.filter(recurso__in=recursos).update(
+            version=F('version') + 1, modificado=timezone.now()
+        )
+
+
+def obtener_version(recurso):
+    from .models import VersionRecurso
+
+    # Se lee como los datos (de la réplica, si la hay, ver app1/replicas.py):
+    # un sello más nuevo que los datos guardaría datos viejos con él en la caché
+    version = VersionRecurso.objects.filter(recurso=recurso).first()
+    if version is None:
+        version, _ = VersionRecurso.objects.get_or_create(recurso=recurso)
+    return version
+
+
+def version_conjunta(recursos):
+    """
+    Sello (sin guardar) de una respuesta que combina varios recursos. Las
+    versiones solo crecen, así que su suma cambia si cambia cualquiera.
+    """
+    from .models import VersionRecurso
+
+    versiones = {v.recurso: v for v in VersionRecurso.objects.filter(recurso__in=recursos)}
+    for recurso in recursos:
+        if recurso not in versiones:
+            versiones[recurso] = obtener_version(recurso)
+    return VersionRecurso(
+        recurso='+'.join(recursos),
+        version=sum(v.version for v in versiones.values()),
+        modificado=max(v.modificado for v in versiones.values()),
+    )
+
+
+def _etag(version, request):
+    # La respuesta depende de la URL completa (filtros, cursor) y del formato
+    clave = f'{version.recurso}:{version.version}:{request.get_full_path()}:{request.META.get("HTTP_ACCEPT", "")}'
+    return '"%s"' % hashlib.sha1(clave.encode()).hexdigest()[:32]
+
+
+def _coincide_etag(cabecera, etag):
+    etiquetas = [e.strip() for e in cabecera.split(',')]
+    return '*' in etiquetas or etag in (e[2:] if e.startswith('W/') else e for e in etiquetas)
+
+
+class RecursoVersionadoMixin:
+    """
+    ViewSet asociado a un recurso de DEPENDENCIAS (`recurso_version`).
+    El sello se lee una sola vez por petición.
+    """
+    recurso_version = None
+
+    def recursos_relacionados(self):
+        """
+        Otros recursos incluidos en la respuesta (p. ej. con ?expand=).
+        """
+        return []
+
+    def version_actual(self):
+        if not hasattr(self, '_version_actual'):
+            relacionados = self.recursos_relacionados()
+            if relacionados:
+                self._version_actual = version_conjunta([self.recurso_version, *relacionados])
+            else:
+                self._version_actual = obtener_version(self.recurso_version)
+        return self._version_actual
+
+
+class GetCondicionalMixin(RecursoVersionadoMixin):
+    """
+    Añade ETag y Last-Modified a list/retrieve y responde 304 cuando el
+    cliente ya tiene la versión vigente. El ViewSet declara `recurso_version`.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._get_condicional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_condicional(super().retrieve, request, *args, **kwargs)
+
+    def _get_condicional(self, handler, request, *args, **kwargs):
+        # El sello se lee antes que los datos: si alguien escribe entre medio
+        # el cliente recibe un ETag antiguo y solo pierde un 304, nunca datos.
+        validadores = Validadores(self.version_actual(), request)
+        if validadores.vigente:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        validadores.aplicar(response)
+        return response
+
+
+class Validadores:
+    """
+    ETag y Last-Modified de una versión para una petición, y si el cliente
+    ya tiene esa versión (If-None-Match / If-Modified-Since). Lo comparten
+    GetCondicionalMixin y las vistas async (app1/asincrono.py).
+    """
+
+    def __init__(self, version, request):
+        self.etag = _etag(version, request)
+        self.modificado = version.modificado.replace(microsecond=0)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            self.vigente = _coincide_etag(if_none_match, self.etag)
+        else:
+            # Last-Modified va en segundos enteros: otra escritura en el mismo
+            # segundo no lo cambia. Solo un sello de un segundo anterior al
+            # del cliente es seguro; en el mismo segundo decide el ETag
+            desde = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            self.vigente = desde is not None and self.modificado.timestamp() < desde
+
+    def aplicar(self, response):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self.etag
+            response['Last-Modified'] = http_date(self.modificado.timestamp())
+            # El cliente puede guardar la respuesta pero debe revalidarla
+            response['Cache-Control'] = 'no-cache'
@@ -1,21 +1,77 @@
-from django.shortcuts import render
+import math
+
+from django.shortcuts import get_object_or_404, render
 from rest_framework import viewsets
 from .models import *
 from .serializers import *
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
 from django.contrib.auth.hashers import check_password
 from django.http import JsonResponse
-from django.db.models import Count
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.db import transaction
+from . import busqueda, geo, ruteo
+from .estadisticas import stats_usuario
+from .metricas import encolar_geometria, geometria_ruta, recalcular_rutas
+from .optimizador import longitud, matriz_distancias, optimizar_orden
+from .sincronizacion import cambios_desde, registrar
+from .autenticacion import (
+    AutorDelTokenMixin, EsElMismoUsuario, emitir_tokens, parametro_usuario, verificar_refresco,
+)
+from .campos import CamposDinamicosViewMixin
+from .exportacion import ExportacionMixin
+from .expansion import Expansion, ExpansionViewMixin
+from .cache_respuestas import CacheRespuestaMixin, estadisticas as estadisticas_cache
+from .versiones import GetCondicionalMixin, tocar
+
+
+def parse_ids(value):
+    """
+    Convierte '1,2,3' (parámetro ?ids=) en una lista de enteros.
+    """
+    try:
+        return [int(pk) for pk in value.split(',') if pk.strip()]
+    except ValueError:
+        raise ValidationError({'ids': 'Debe ser una lista de IDs separados por comas.'})
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+
+def parse_floats(value, cantidad, nombre):
+    """
+    Convierte 'a,b,...' en exactamente `cantidad` floats (?near=, ?bbox=).
+    """
+    try:
+        numeros = [float(v) for v in value.split(',')]
+    except ValueError:
+        numeros = []
+    if len(numeros) != cantidad or not all(math.isfinite(n) for n in numeros):
+        raise ValidationError({nombre: f'Se esperaban {cantidad} números separados por comas.'})
+    return numeros
+
+
+def parse_orden(value, ordenes, por_defecto):
+    """
+    Orden del listado según ?orden=; `ordenes` mapea cada valor permitido
+    a los campos de ordenación.
+    """
+    if not value:
+        return por_defecto
+    if value not in ordenes:
+        raise ValidationError({'orden': f"Debe ser uno de: {', '.join(ordenes)}."})
+    return ordenes[value]
+
+
+class UsuarioViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Usuarios.
     """
     queryset = Usuario.objects.all().order_by('-fechaCreacion')
     serializer_class = UsuarioSerializer
+    cursor_ordering = ('-fechaCreacion', '-id')
+    permission_classes = [EsElMismoUsuario]
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], authentication_classes=[])
     def login(self, request):
         username = request.data.get('username')
         email = request.data.get('email')
@@ -32,25 +88,41 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             
         if usuario and check_password(password, usuario.password):
             serializer = UsuarioSerializer(usuario)
-            return Response({'status': 'success', 'user': serializer.data})
+            return Response({'status': 'success', 'user': serializer.data, **emitir_tokens(usuario)})
         else:
             return Response({'error': 'Credenciales inválidas'}, status=401)
 
+    @action(detail=False, methods=['post'], authentication_classes=[])
+    def refresh(self, request):
+        """
+        Cambia un token de refresco por un par nuevo (acceso y refresco)
+        sin volver a comprobar la contraseña.
+        Body: {"refresh": "<token>"}
+        """
+        token = request.data.get('refresh')
+        if not token:
+            raise ValidationError({'refresh': 'Este campo es obligatorio.'})
+        try:
+            usuario = verificar_refresco(token)
+        except AuthenticationFailed as e:
+            return Response({'error': e.detail}, status=401)
+        return Response({'user': UsuarioSerializer(usuario).data, **emitir_tokens(usuario)})
+
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
-        usuario = self.get_object()
-        # Contar favoritos (tipo='FAV')
-        fav_count = Favorito.objects.filter(usuario=usuario, tipo='FAV').count()
-        # Contar visitados (tipo='VISIT')
-        visit_count = Favorito.objects.filter(usuario=usuario, tipo='VISIT').count()
-        # Contar rutas creadas
-        route_count = Ruta.objects.filter(usuario=usuario).count()
-        
-        return Response({
-            'favoritos': fav_count,
-            'visitados': visit_count,
-            'rutas': route_count
-        })
+        """
+        Conteos del perfil: favoritos, visitados, pendientes, rutas creadas,
+        rutas guardadas, reseñas y publicaciones.
+        Una sola consulta (ver app1/estadisticas.py), cacheada por usuario.
+        """
+        try:
+            usuario_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        stats = stats_usuario(usuario_id)
+        if stats is None:
+            raise NotFound()
+        return Response(stats)
 
     @action(detail=True, methods=['get'])
     def managed_places(self, request, pk=None):
@@ -58,38 +130,152 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         Devuelve la lista de lugares que este usuario administra.
         """
         usuario = self.get_object()
-        admins = AdministradorLugar.objects.filter(usuario=usuario)
-        lugares = [admin.lugar for admin in admins]
+        lugares = LugarViewSet.queryset.filter(administradores__usuario=usuario)
         # Usamos el LugarSerializer para devolver la data completa del lugar
         serializer = LugarSerializer(lugares, many=True)
         return Response(serializer.data)
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def favoritos(self, request, pk=None):
+        """
+        Devuelve los lugares completos que el usuario marcó con un tipo
+        de Favorito (?tipo=FAV|PEND|VISIT, por defecto FAV) en una sola consulta.
+        """
+        usuario = self.get_object()
+        tipo = request.query_params.get('tipo', 'FAV')
+        if tipo not in dict(Favorito.TIPOS):
+            raise ValidationError({'tipo': f'Tipo inválido: {tipo}'})
+        lugares = LugarViewSet.queryset.filter(
+            favorito__usuario=usuario, favorito__tipo=tipo
+        ).order_by('id')
+        serializer = LugarSerializer(lugares, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def rutas_guardadas(self, request, pk=None):
+        """
+        Devuelve las rutas completas que el usuario tiene guardadas, de la
+        última guardada a la primera.
+        """
+        usuario = self.get_object()
+        # order_by reutiliza el JOIN del filtro: solo las filas de este usuario
+        rutas = RutaViewSet.queryset.filter(ruta_guardada__usuario=usuario).order_by('-ruta_guardada__id')
+        serializer = RutaSerializer(rutas, many=True)
+        return Response(serializer.data)
+
+class CategoriaViewSet(GetCondicionalMixin, CacheRespuestaMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Categorias.
     """
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
-
-class LugarViewSet(viewsets.ModelViewSet):
+    cursor_ordering = 'id'
+    recurso_version = 'categorias'
+
+# ?expand= comunes: sustituyen el id de la FK por el objeto completo
+EXPANSION_LUGAR = Expansion(
+    LugarSerializer,
+    select_related=['lugar__ubicacion__canton__provincia'],
+    prefetch=['lugar__categorias'],
+    recursos=['lugares'],
+)
+EXPANSION_USUARIO = Expansion(UsuarioSerializer, select_related=['usuario'])
+
+class LugarViewSet(ExpansionViewMixin, GetCondicionalMixin, CacheRespuestaMixin, ExportacionMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Lugares.
     """
-    queryset = Lugar.objects.all()
+    # La jerarquía de ubicación y las categorías se cargan en bloque
+    # para no lanzar consultas por cada lugar serializado.
+    queryset = Lugar.objects.select_related(
+        'ubicacion__canton__provincia'
+    ).prefetch_related('categorias')
     serializer_class = LugarSerializer
+    serializer_compacto_class = LugarCompactoSerializer
+    recurso_version = 'lugares'
+    # ?expand=resenas,eventos
+    expansiones = {
+        'resenas': Expansion(
+            ResenaSerializer, source='resenas_expandidas', many=True,
+            prefetch=[Prefetch(
+                'resenas',
+                queryset=Resena.objects.select_related('usuario', 'ruta').order_by('-fechaCreacion'),
+                to_attr='resenas_expandidas',
+            )],
+            recursos=['resenas'],
+        ),
+        'eventos': Expansion(
+            EventoSerializer, source='eventos_expandidos', many=True,
+            prefetch=[Prefetch(
+                'evento_set', queryset=Evento.objects.order_by('fechaEvento'), to_attr='eventos_expandidos'
+            )],
+            recursos=['eventos'],
+        ),
+    }
+
+    # ?orden= sobre los contadores desnormalizados (columnas indexadas)
+    ordenes = {
+        'favoritos': ('-num_favoritos', '-id'),
+        'pendientes': ('-num_pendientes', '-id'),
+        'visitados': ('-num_visitados', '-id'),
+    }
+
+    @property
+    def cursor_ordering(self):
+        # Con ?near= los resultados se ordenan por distancia
+        if 'near' in self.request.query_params:
+            return ('distancia_km', 'id')
+        return parse_orden(self.request.query_params.get('orden'), self.ordenes, 'id')
 
-class ResenaViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        """
+        Filtros opcionales:
+        - ?ids=1,2,3                       búsqueda en bloque
+        - ?bbox=oeste,sur,este,norte       lugares dentro del rectángulo (lon/lat)
+        - ?near=lat,lon&radius_km=5        lugares en el radio, ordenados por distancia
+        - ?orden=favoritos|pendientes|visitados   más marcados primero
+        Los filtros espaciales usan el índice de rejilla `Lugar.celda`.
+        """
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        # Búsqueda en bloque: /api/lugares/?ids=1,2,3
+        ids = params.get('ids')
+        if ids:
+            queryset = queryset.filter(id__in=parse_ids(ids))
+
+        bbox = params.get('bbox')
+        if bbox:
+            oeste, sur, este, norte = parse_floats(bbox, 4, 'bbox')
+            queryset = queryset.filter(geo.filtro_bbox(sur, oeste, norte, este))
+
+        near = params.get('near')
+        if near:
+            lat, lon = parse_floats(near, 2, 'near')
+            radio = parse_floats(params.get('radius_km', '5'), 1, 'radius_km')[0]
+            if radio <= 0:
+                raise ValidationError({'radius_km': 'Debe ser mayor que 0.'})
+            queryset = queryset.filter(
+                geo.filtro_bbox(*geo.bbox_radio(lat, lon, radio))
+            ).annotate(
+                distancia_km=geo.distancia_km(lat, lon)
+            ).filter(distancia_km__lte=radio).order_by('distancia_km', 'id')
+        return queryset
+
+class ResenaViewSet(ExpansionViewMixin, CacheRespuestaMixin, ExportacionMixin, CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Reseñas (Reviews).
     """
-    queryset = Resena.objects.all().order_by('-fechaCreacion')
+    queryset = Resena.objects.select_related('usuario', 'lugar', 'ruta').order_by('-fechaCreacion')
     serializer_class = ResenaSerializer
+    cursor_ordering = ('-fechaCreacion', '-id')
+    recurso_version = 'resenas'
+    expansiones = {'usuario': EXPANSION_USUARIO}
 
     def get_queryset(self):
-        queryset = Resena.objects.all().order_by('-fechaCreacion')
+        queryset = super().get_queryset()
         lugar_id = self.request.query_params.get('lugar')
         ruta_id = self.request.query_params.get('ruta')
-        usuario_id = self.request.query_params.get('usuario')
+        usuario_id = parametro_usuario(self.request)
 
         if lugar_id:
             queryset = queryset.filter(lugar__id=lugar_id)
@@ -100,16 +286,17 @@ class ResenaViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class FavoritoViewSet(viewsets.ModelViewSet):
+class FavoritoViewSet(CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Favoritos.
     """
-    queryset = Favorito.objects.all()
+    queryset = Favorito.objects.select_related('usuario', 'lugar')
     serializer_class = FavoritoSerializer
+    cursor_ordering = ('-fechaGuardado', '-id')
 
     def get_queryset(self):
-        queryset = Favorito.objects.all()
-        usuario_id = self.request.query_params.get('usuario')
+        queryset = super().get_queryset()
+        usuario_id = parametro_usuario(self.request)
         lugar_id = self.request.query_params.get('lugar')
         tipo = self.request.query_params.get('tipo')
 
@@ -122,36 +309,148 @@ class FavoritoViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class EventoViewSet(viewsets.ModelViewSet):
+class EventoViewSet(ExpansionViewMixin, GetCondicionalMixin, CacheRespuestaMixin, ExportacionMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Eventos.
     """
-    queryset = Evento.objects.all().order_by('fechaEvento')
+    queryset = Evento.objects.select_related('lugar').order_by('fechaEvento')
     serializer_class = EventoSerializer
+    serializer_compacto_class = EventoCompactoSerializer
+    cursor_ordering = ('fechaEvento', 'id')
+    recurso_version = 'eventos'
+    expansiones = {'lugar': EXPANSION_LUGAR}
 
-class RutaViewSet(viewsets.ModelViewSet):
+class RutaViewSet(ExpansionViewMixin, GetCondicionalMixin, CacheRespuestaMixin, ExportacionMixin, CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Rutas.
     """
-    queryset = Ruta.objects.all().order_by('-fechaCreacion')
+    # tiempo_total_estimado se anota en la base de datos (con_tiempo_total)
+    queryset = Ruta.objects.select_related('usuario').prefetch_related(
+        'categorias'
+    ).con_tiempo_total().order_by('-fechaCreacion')
     serializer_class = RutaSerializer
+    serializer_compacto_class = RutaCompactoSerializer
+    recurso_version = 'rutas'
+    # ?expand=lugares,resenas,usuario: la pantalla de detalle en una petición
+    expansiones = {
+        'lugares': Expansion(
+            ParadaSerializer, source='paradas_expandidas', many=True,
+            prefetch=[Prefetch(
+                'ruta_lugar_set',
+                queryset=Ruta_Lugar.objects.select_related(
+                    'lugar__ubicacion__canton__provincia'
+                ).prefetch_related('lugar__categorias').order_by('orden', 'id'),
+                to_attr='paradas_expandidas',
+            )],
+            recursos=['ruta-lugares', 'lugares'],
+        ),
+        'resenas': Expansion(
+            ResenaSerializer, source='resenas_expandidas', many=True,
+            prefetch=[Prefetch(
+                'resenas',
+                queryset=Resena.objects.select_related('usuario', 'lugar').order_by('-fechaCreacion'),
+                to_attr='resenas_expandidas',
+            )],
+            recursos=['resenas'],
+        ),
+        'usuario': EXPANSION_USUARIO,
+    }
+    # ?orden=guardados: más guardadas primero (contador indexado)
+    ordenes = {'guardados': ('-num_guardados', '-id')}
+
+    @property
+    def cursor_ordering(self):
+        return parse_orden(self.request.query_params.get('orden'), self.ordenes, ('-fechaCreacion', '-id'))
 
     def get_queryset(self):
-        from django.db.models import Count
-        return Ruta.objects.annotate(
-            num_guardados=Count('ruta_guardada')
-        ).order_by('-fechaCreacion')
+        queryset = super().get_queryset()
+        # Búsqueda en bloque: /api/rutas/?ids=1,2,3
+        ids = self.request.query_params.get('ids')
+        if ids:
+            queryset = queryset.filter(id__in=parse_ids(ids))
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def geometria(self, request, pk=None):
+        """
+        Trazado de la ruta sobre la red vial local (polyline codificada,
+        precisión 5) con distancia y tiempo de cada tramo.
+        Ej: /api/rutas/1/geometria/?perfil=walking|driving
+        Normalmente ya está en caché: la cola de tareas la precalcula cuando
+        cambian las paradas (metricas.calentar_geometria). Mientras se compila
+        la red vial responde 503 con Retry-After.
+        """
+        perfil = request.query_params.get('perfil', ruteo.PERFIL_POR_DEFECTO)
+        if perfil not in ruteo.PERFILES:
+            raise ValidationError({'perfil': f'Perfil inválido: {perfil}'})
+        ruta = get_object_or_404(Ruta.objects.only('id'), pk=pk)
+        try:
+            datos = geometria_ruta(ruta.id, perfil)
+        except ruteo.GrafoEnConstruccion as e:
+            return Response({'error': str(e)}, status=503, headers={'Retry-After': str(e.reintentar_en)})
+        except ruteo.RedVialNoDisponible as e:
+            return Response({'error': str(e)}, status=503)
+        return Response(datos)
+
+    @action(detail=True, methods=['post'])
+    def optimizar(self, request, pk=None):
+        """
+        Reordena las paradas para minimizar la distancia recorrida
+        (vecino más cercano + 2-opt/Or-opt) y guarda el nuevo orden.
+        Body opcional: {"inicio": <id lugar>, "fin": <id lugar>} para fijar extremos.
+        """
+        ruta = get_object_or_404(Ruta.objects.only('id', 'usuario_id'), pk=pk)
+        self.comprobar_propietario(ruta)
+        paradas = list(
+            Ruta_Lugar.objects.filter(ruta=ruta).select_related('lugar').order_by('orden', 'id')
+        )
+        lugar_ids = [p.lugar_id for p in paradas]
+
+        extremos = {}
+        for campo in ('inicio', 'fin'):
+            valor = request.data.get(campo)
+            if valor in (None, ''):
+                extremos[campo] = None
+                continue
+            try:
+                extremos[campo] = lugar_ids.index(int(valor))
+            except (TypeError, ValueError):
+                raise ValidationError({campo: 'Debe ser el ID de un lugar de la ruta.'})
+        if extremos['inicio'] is not None and extremos['inicio'] == extremos['fin'] and len(paradas) > 1:
+            raise ValidationError({'fin': 'El inicio y el fin deben ser lugares distintos.'})
+
+        d = matriz_distancias([(float(p.lugar.latitud), float(p.lugar.longitud)) for p in paradas])
+        antes = longitud(list(range(len(paradas))), d)
+        orden = optimizar_orden(d, extremos['inicio'], extremos['fin'])
+
+        with transaction.atomic():
+            for posicion, indice in enumerate(orden):
+                paradas[indice].orden = posicion
+            Ruta_Lugar.objects.bulk_update(paradas, ['orden'])
+            # bulk_update no dispara señales
+            tocar('ruta-lugares')
+            registrar('ruta-lugares', [p.id for p in paradas])
+            recalcular_rutas([ruta.id])
+            encolar_geometria(ruta.id)
+
+        nuevas = Ruta_Lugar.objects.filter(ruta=ruta).select_related('ruta', 'lugar').order_by('orden', 'id')
+        return Response({
+            'distancia_antes_km': round(antes, 3),
+            'distancia_despues_km': round(longitud(orden, d), 3),
+            'paradas': Ruta_LugarSerializer(nuevas, many=True).data,
+        })
 
-class Ruta_GuardadaViewSet(viewsets.ModelViewSet):
+class Ruta_GuardadaViewSet(CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite ver y editar Rutas Guardadas por usuarios.
     """
-    queryset = Ruta_Guardada.objects.all()
+    queryset = Ruta_Guardada.objects.select_related('usuario', 'ruta')
     serializer_class = Ruta_GuardadaSerializer
+    cursor_ordering = ('orden', 'id')
 
     def get_queryset(self):
-        queryset = Ruta_Guardada.objects.all()
-        usuario_id = self.request.query_params.get('usuario')
+        queryset = super().get_queryset()
+        usuario_id = parametro_usuario(self.request)
         ruta_id = self.request.query_params.get('ruta')
 
         if usuario_id:
@@ -161,22 +460,148 @@ class Ruta_GuardadaViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class Ruta_LugarViewSet(viewsets.ModelViewSet):
+class Ruta_LugarViewSet(ExpansionViewMixin, CacheRespuestaMixin, CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint que gestiona los lugares dentro de una ruta.
     Permite filtrar por 'ruta' (ID de la ruta) para obtener los puntos ordenados.
     Ej: /api/ruta-lugares/?ruta=1
+    Solo el autor de la ruta crea, reordena o borra sus paradas.
     """
-    queryset = Ruta_Lugar.objects.all()
+    queryset = Ruta_Lugar.objects.select_related('ruta', 'lugar')
     serializer_class = Ruta_LugarSerializer
+    cursor_ordering = ('orden', 'id')
+    recurso_version = 'ruta-lugares'
+    expansiones = {'lugar': EXPANSION_LUGAR}
 
     def get_queryset(self):
-        queryset = Ruta_Lugar.objects.all()
+        queryset = super().get_queryset()
         ruta_id = self.request.query_params.get('ruta')
         if ruta_id is not None:
             queryset = queryset.filter(ruta__id=ruta_id).order_by('orden')
         return queryset
 
+    # Las paradas son de la ruta: su autor es el de la ruta
+    def autor_de(self, instance):
+        return instance.ruta.usuario_id
+
+    def autor_de_datos(self, datos):
+        ruta = datos.get('ruta')
+        return ruta.usuario_id if ruta is not None else None
+
+def cache_stats(request):
+    """
+    Aciertos y fallos de la caché de respuestas por recurso, para dimensionarla.
+    """
+    return JsonResponse(estadisticas_cache())
+
+# Resultados de /api/buscar/
+BUSQUEDA_LIMITE = 20
+BUSQUEDA_MAX_LIMITE = 100
+
+class BusquedaViewSet(viewsets.ViewSet):
+    """
+    Búsqueda de texto completo en lugares, rutas y eventos, sin distinguir
+    tildes ni mayúsculas y ordenada por relevancia (BM25).
+    Parámetros: ?q=texto, ?tipo=lugar,ruta,evento (por defecto todos),
+    ?limit=20 (máx. 100).
+    Ej: /api/buscar/?q=jardin botanico
+    """
+    def list(self, request):
+        params = request.query_params
+        texto = params.get('q', '').strip()
+        if not texto:
+            raise ValidationError({'q': 'Este parámetro es obligatorio.'})
+        tipos = [t for t in params.get('tipo', '').split(',') if t]
+        invalidos = [t for t in tipos if t not in busqueda.TIPOS]
+        if invalidos:
+            raise ValidationError({'tipo': f"Debe ser uno de: {', '.join(busqueda.TIPOS)}."})
+        try:
+            limite = int(params.get('limit', BUSQUEDA_LIMITE))
+        except ValueError:
+            raise ValidationError({'limit': 'Debe ser un número entero.'})
+        if not 1 <= limite <= BUSQUEDA_MAX_LIMITE:
+            raise ValidationError({'limit': f'Debe estar entre 1 y {BUSQUEDA_MAX_LIMITE}.'})
+        if not busqueda.disponible():
+            return Response({'error': 'La búsqueda no está disponible con esta base de datos.'}, status=503)
+
+        encontrados = busqueda.buscar(texto, tipos, limite)
+
+        # Una consulta por tipo con los querysets (y precargas) de cada ViewSet
+        fuentes = {
+            'lugar': (LugarViewSet.queryset, LugarSerializer),
+            'ruta': (RutaViewSet.queryset, RutaSerializer),
+            'evento': (EventoViewSet.queryset, EventoSerializer),
+        }
+        objetos = {}
+        for tipo, (queryset, _) in fuentes.items():
+            ids = [pk for t, pk, _ in encontrados if t == tipo]
+            if ids:
+                objetos[tipo] = queryset.in_bulk(ids)
+
+        resultados = []
+        for tipo, pk, score in encontrados:
+            objeto = objetos.get(tipo, {}).get(pk)
+            if objeto is None:
+                continue
+            resultados.append({
+                'tipo': tipo,
+                'id': pk,
+                'score': round(score, 4),
+                'objeto': fuentes[tipo][1](objeto).data,
+            })
+        return Response({'count': len(resultados), 'results': resultados})
+
+# Entradas del registro de cambios por respuesta de /api/sync/
+SYNC_LIMITE = 1000
+SYNC_MAX_LIMITE = 5000
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Sincronización incremental del catálogo para clientes sin conexión.
+    ?since=<token> devuelve solo lo creado, modificado o borrado después de
+    ese token (sin token o 0: todo); los recursos sin cambios no aparecen.
+    Si "mas" es true, hay que repetir la petición con el nuevo token.
+    ?limit=1000 (máx. 5000) entradas por respuesta.
+    Ej: /api/sync/?since=1532
+    -> {"token": 1540, "mas": false,
+        "cambios": {"lugares": [...], ...}, "borrados": {"rutas": [7], ...}}
+    """
+    def list(self, request):
+        params = request.query_params
+        try:
+            token = int(params.get('since') or 0)
+        except ValueError:
+            raise ValidationError({'since': 'Debe ser un token devuelto por /api/sync/.'})
+        if token < 0:
+            raise ValidationError({'since': 'Debe ser un token devuelto por /api/sync/.'})
+        try:
+            limite = int(params.get('limit', SYNC_LIMITE))
+        except ValueError:
+            raise ValidationError({'limit': 'Debe ser un número entero.'})
+        if not 1 <= limite <= SYNC_MAX_LIMITE:
+            raise ValidationError({'limit': f'Debe estar entre 1 y {SYNC_MAX_LIMITE}.'})
+
+        cambios, nuevo_token, mas = cambios_desde(token, limite)
+
+        # Una consulta por recurso cambiado con los querysets de cada ViewSet
+        fuentes = {
+            'categorias': (CategoriaViewSet.queryset, CategoriaSerializer),
+            'lugares': (LugarViewSet.queryset, LugarSerializer),
+            'rutas': (RutaViewSet.queryset, RutaSerializer),
+            'ruta-lugares': (Ruta_LugarViewSet.queryset, Ruta_LugarSerializer),
+            'eventos': (EventoViewSet.queryset, EventoSerializer),
+        }
+        datos = {}
+        borrados = {}
+        for recurso, (ids, ids_borrados) in cambios.items():
+            queryset, serializer_class = fuentes[recurso]
+            if ids:
+                # Una fila borrada tras registrar su cambio ya tiene su lápida más adelante
+                datos[recurso] = serializer_class(queryset.filter(id__in=ids).order_by('id'), many=True).data
+            if ids_borrados:
+                borrados[recurso] = ids_borrados
+        return Response({'token': nuevo_token, 'mas': mas, 'cambios': datos, 'borrados': borrados})
+
 # --- AJAX VIEWS FOR ADMIN ---
 def load_cantones(request):
     provincia_id = request.GET.get('provincia')
@@ -190,18 +615,32 @@ def load_parroquias(request):
 
 # --- NUEVAS VISTAS (Social) ---
 
-class PublicacionViewSet(viewsets.ModelViewSet):
+# Comentarios incluidos por publicación en /api/publicaciones/feed/
+FEED_COMENTARIOS = 3
+FEED_MAX_COMENTARIOS = 20
+
+class PublicacionViewSet(CacheRespuestaMixin, CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
     """
     API endpoint para el Feed Social (Reels/Fotos).
     Filtrar por: ?lugar=1
     """
-    queryset = Publicacion.objects.filter(es_visible=True).order_by('-fecha')
+    # es_propietario se resuelve con una subconsulta EXISTS en la misma
+    # consulta en lugar de una consulta por publicación.
+    queryset = Publicacion.objects.filter(es_visible=True).select_related(
+        'usuario', 'lugar'
+    ).annotate(
+        es_propietario=Exists(AdministradorLugar.objects.filter(
+            usuario=OuterRef('usuario'), lugar=OuterRef('lugar')
+        ))
+    ).order_by('-fecha')
     serializer_class = PublicacionSerializer
+    cursor_ordering = ('-fecha', '-id')
+    recurso_version = 'publicaciones'
 
     def get_queryset(self):
-        queryset = Publicacion.objects.filter(es_visible=True).order_by('-fecha')
+        queryset = super().get_queryset()
         lugar_id = self.request.query_params.get('lugar')
-        usuario_id = self.request.query_params.get('usuario')
+        usuario_id = parametro_usuario(self.request)
         tipo = self.request.query_params.get('tipo')
 
         if lugar_id:
@@ -213,7 +652,58 @@ class PublicacionViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def get_serializer_class(self):
+        if self.action == 'feed':
+            return FeedPublicacionSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Feed social: cada publicación incluye num_comentarios y sus
+        últimos ?comentarios=N (por defecto 3, máx. 20) con el avatar del
+        autor. Acepta los mismos filtros que el listado y usa la misma
+        paginación por cursor sobre fecha.
+        Siempre son dos consultas por página: publicaciones (con conteo y
+        es_propietario) y comentarios de todas ellas, sin importar el tamaño.
+        Ej: /api/publicaciones/feed/?page_size=20&comentarios=2
+        """
+        return self.respuesta_cacheada(self._generar_feed, request)
+
+    def _generar_feed(self, request):
+        try:
+            limite = int(request.query_params.get('comentarios', FEED_COMENTARIOS))
+        except ValueError:
+            raise ValidationError({'comentarios': 'Debe ser un número entero.'})
+        if not 0 <= limite <= FEED_MAX_COMENTARIOS:
+            raise ValidationError({'comentarios': f'Debe estar entre 0 y {FEED_MAX_COMENTARIOS}.'})
+
+        queryset = self.get_queryset().annotate(num_comentarios=Count('comentarios'))
+        if limite:
+            # Los N más recientes de cada publicación con ROW_NUMBER()
+            ultimos = Comentario.objects.select_related('usuario').annotate(
+                posicion=Window(
+                    RowNumber(),
+                    partition_by=F('publicacion_id'),
+                    order_by=(F('fecha_creacion').desc(), F('id').desc()),
+                )
+            ).filter(posicion__lte=limite).order_by('fecha_creacion', 'id')
+            queryset = queryset.prefetch_related(
+                Prefetch('comentarios', queryset=ultimos, to_attr='ultimos_comentarios')
+            )
+
+        page = self.paginate_queryset(queryset)
+        publicaciones = page if page is not None else list(queryset)
+        if not limite:
+            for publicacion in publicaciones:
+                publicacion.ultimos_comentarios = []
+        serializer = self.get_serializer(publicaciones, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
+        self.comprobar_autor(serializer)
         # Lógica de asignación de tipo automática
         data = self.request.data
         usuario_id = data.get('usuario')
@@ -236,24 +726,26 @@ class PublicacionViewSet(viewsets.ModelViewSet):
 
         serializer.save()
 
-class AdministradorLugarViewSet(viewsets.ModelViewSet):
+class AdministradorLugarViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """
     Para verificar permisos.
     Ej: ?usuario=ID -> Devuelve lista de lugares que administra.
     """
-    queryset = AdministradorLugar.objects.all()
+    queryset = AdministradorLugar.objects.select_related('lugar')
     serializer_class = AdministradorLugarSerializer
+    cursor_ordering = ('-fecha_asignacion', '-id')
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        usuario_id = self.request.query_params.get('usuario')
+        usuario_id = parametro_usuario(self.request)
         if usuario_id:
             queryset = queryset.filter(usuario__id=usuario_id)
         return queryset
 
-class ComentarioViewSet(viewsets.ModelViewSet):
-    queryset = Comentario.objects.all().order_by('fecha_creacion')
+class ComentarioViewSet(CamposDinamicosViewMixin, AutorDelTokenMixin, viewsets.ModelViewSet):
+    queryset = Comentario.objects.select_related('usuario').order_by('fecha_creacion')
     serializer_class = ComentarioSerializer
+    cursor_ordering = ('fecha_creacion', 'id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -2,6 +2,8 @@
 ASGI config for rutas project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn rutas.asgi:application``; the
+async read endpoints live under /api/async/ (app1/asincrono.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Antes que las sesiones: también se leen de la réplica elegida
+    'app1.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,13 +82,55 @@ WSGI_APPLICATION = 'rutas.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite con varios procesos (gunicorn, `trabajador`): WAL deja leer mientras
+# otro escribe; busy_timeout espera al bloqueo en vez de fallar con
+# "database is locked"; IMMEDIATE toma el bloqueo de escritura al empezar la
+# transacción (una transacción que lee y luego escribe no puede esperar al
+# bloqueo: falla al instante). Comparar con `manage.py benchmark_sqlite`.
+# journal_mode queda guardado en el propio archivo: lo cambia una sola vez la
+# migración 0015_sqlite_wal, no cada conexión (abrir el db.sqlite3 del
+# repositorio no debe reescribir su cabecera).
+SQLITE_JOURNAL_MODE = 'WAL'
+# Por conexión (init_command)
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',  # Con WAL no corrompe; solo el último commit puede perderse si se va la luz
+    'busy_timeout': 5000,  # ms
+    'cache_size': -20000,  # KiB por conexión
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {nombre}={valor}' for nombre, valor in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Conexiones persistentes: abrir una y aplicar los PRAGMA en cada petición cuesta
+        'CONN_MAX_AGE': int(os.environ.get('RUTAS_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplicas de lectura (app1/replicas.py): RUTAS_DB_REPLICAS=ruta1,ruta2
+# (archivos SQLite copiados de 'default', ver `manage.py copiar_replicas`).
+# Se llaman replica1, replica2, ...
+DATABASE_REPLICAS = []
+for _numero, _nombre in enumerate(filter(None, os.environ.get('RUTAS_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{_numero}'] = {
+        **DATABASES['default'],
+        'NAME': _nombre.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_numero}')
+DATABASE_ROUTERS = ['app1.replicas.ReplicasRouter']
+# Segundos que un cliente lee del primario después de escribir. Para los
+# clientes con token la marca va en la caché 'default': con réplicas hace
+# falta RUTAS_CACHE=file o redis (comprobación app1.E001)
+REPLICA_PEGAJOSO_SEG = int(os.environ.get('RUTAS_REPLICA_PEGAJOSO_SEG', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,11 +172,86 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Los archivos subidos llevan el hash del contenido en el nombre (app1/medios.py)
+STORAGES = {
+    'default': {'BACKEND': 'app1.medios.AlmacenamientoConHuella'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Quién envía los bytes de /media/: '' (Django), 'x-sendfile' (Apache
+# mod_xsendfile, lighttpd) o 'x-accel-redirect' (nginx). Con nginx,
+# MEDIA_ACCEL_PREFIX es una location `internal` con alias a MEDIA_ROOT.
+MEDIA_SENDFILE = os.environ.get('RUTAS_MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('RUTAS_MEDIA_ACCEL_PREFIX', '/media-interna/')
+
+# Extracto OSM (XML) de la provincia para el ruteo offline (app1/ruteo.py).
+# Se compila con: python manage.py construir_grafo
+RUTEO_OSM_PATH = BASE_DIR / 'data' / 'loja.osm'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# --- DJANGO REST FRAMEWORK ---
+# Todos los listados se paginan por cursor; el orden lo fija cada ViewSet
+# con `cursor_ordering` (ver app1/pagination.py).
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'app1.pagination.OrdenCursorPagination',
+    'PAGE_SIZE': 50,
+    # Token firmado de /api/usuarios/login/ (app1/autenticacion.py); la
+    # sesión queda para la API navegable del admin
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'app1.autenticacion.TokenFirmadoAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+}
+
+# Vigencia de los tokens (segundos)
+TOKEN_ACCESO_SEG = int(os.environ.get('RUTAS_TOKEN_ACCESO_SEG', 15 * 60))
+TOKEN_REFRESCO_SEG = int(os.environ.get('RUTAS_TOKEN_REFRESCO_SEG', 30 * 24 * 3600))
+
+# --- CACHÉ ---
+# 'default': stats de usuario, geometrías, matrices del optimizador.
+# 'respuestas': respuestas GET de la API (app1/cache_respuestas.py).
+# Backend con RUTAS_CACHE: 'locmem' (por defecto), 'file' (RUTAS_CACHE_DIR)
+# o 'redis' (RUTAS_REDIS_URL; requiere el paquete redis).
+RUTAS_CACHE = os.environ.get('RUTAS_CACHE', 'locmem')
+
+
+def _cache(nombre, **extra):
+    if RUTAS_CACHE == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('RUTAS_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': nombre,
+            **extra,
+        }
+    if RUTAS_CACHE == 'file':
+        backend = 'django.core.cache.backends.filebased.FileBasedCache'
+        location = str(Path(os.environ.get('RUTAS_CACHE_DIR', BASE_DIR / 'cache')) / nombre)
+    else:
+        backend = 'django.core.cache.backends.locmem.LocMemCache'
+        location = nombre
+    return {'BACKEND': backend, 'LOCATION': location, 'OPTIONS': {'MAX_ENTRIES': 5000}, **extra}
+
+
+CACHES = {
+    'default': _cache('default'),
+    # Las entradas viejas no se borran (cambia la versión en la clave): expiran
+    'respuestas': _cache('respuestas', TIMEOUT=10 * 60),
+}
+
+# --- TAREAS EN SEGUNDO PLANO ---
+# Cola en la base de datos (app1/tareas.py); se ejecuta con
+# `python manage.py trabajador --procesos N`. Una tarea en curso más tiempo
+# que el arriendo se da por abandonada y otro proceso puede reclamarla.
+TAREAS_ARRIENDO_SEG = int(os.environ.get('RUTAS_TAREAS_ARRIENDO_SEG', 300))
+# Hay un `trabajador` en marcha. Sin él, marcar un favorito sube el sello del
+# catálogo al momento en vez de encolarlo (app1/contadores.py); el resto de
+# tareas quedan pendientes hasta que arranque uno.
+TAREAS_TRABAJADOR = os.environ.get('RUTAS_TAREAS_TRABAJADOR', '0') == '1'
+
 # --- JAZZMIN SETTINGS ---
 JAZZMIN_SETTINGS = {
     "site_title": "Rutas Turísticas Loja",
@@ -1,12 +1,11 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from app1.medios import servir_medio
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('app1.urls')),
-]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # En producción el proxy envía los bytes (MEDIA_SENDFILE), ver app1/medios.py
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<ruta>.+)$', servir_medio, name='media'),
+]
\ No newline at end of file
@@ -14,7 +14,7 @@ def verify():
     print("--- Verificando Rutas ---")
     response = c.get('/api/rutas/')
     if response.status_code == 200:
-        data = response.json()
+        data = response.json()['results']
         print(f"Status: {response.status_code}")
         print(f"Rutas encontradas: {len(data)}")
         if len(data) > 0:
@@ -24,7 +24,7 @@ def verify():
             print(f"\n--- Verificando Puntos de Ruta {ruta_id} ---")
             response_pts = c.get(f'/api/ruta-lugares/?ruta={ruta_id}')
             if response_pts.status_code == 200:
-                pts = response_pts.json()
+                pts = response_pts.json()['results']
                 print(f"Puntos encontrados: {len(pts)}")
                 for p in pts:
                     print(f" - Orden {p['orden']}: {p['lugar_nombre']}")